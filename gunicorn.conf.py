@@ -0,0 +1,26 @@
+# Gunicorn settings, picked up automatically by `gunicorn mBAB.wsgi` (see Procfile)
+import os
+
+# Load the app, and warm the search structures, once in the master process;
+# workers fork from it and share those pages copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+
+def when_ready(server):
+    """Build search indexes before the first worker is forked."""
+    if not preload_app:
+        return
+    from searchapp.warmup import warm_up
+
+    # PRELOAD_VERSIONS=ESV,KJV limits warm-up to some versions; empty means all installed
+    names = [name for name in os.getenv("PRELOAD_VERSIONS", "").split(",") if name]
+    warmed = warm_up(names or None)
+    server.log.info("Preloaded search indexes for %s", ", ".join(warmed) or "no versions")
+
+
+def post_fork(server, worker):
+    """Watch the databases from each worker and hot-swap rebuilt indexes."""
+    if os.getenv("INDEX_WATCH", "True") == "True":
+        from searchapp.indexwatch import start_watcher
+
+        start_watcher()
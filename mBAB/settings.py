@@ -100,6 +100,14 @@ DATABASES = {
     }
 }
 
+# Bible version databases ({Version}Bible_Database.db) and their search indexes
+BIBLE_DATABASE_DIR = Path(os.getenv("BIBLE_DATABASE_DIR", BASE_DIR / "databases"))
+
+# Search result cache shared by every worker on the host. Empty uses a local
+# SQLite file under BIBLE_DATABASE_DIR/cache; "redis://host:port/db" uses Redis
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
 
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -173,78 +173,143 @@ books = [
     )
 ]
 
-sql_select = "SELECT * FROM bible WHERE "
+sql_select = "SELECT Book, Chapter, Versecount, verse FROM bible WHERE "
 sql_order = "ORDER BY Book, Chapter, Versecount"
 
 import re
 
-def parse_verse_reference(query):
-    """
-    Parse a query string to see if it matches a verse reference pattern.
-    Supports:
-      - Book Chapter:Verse (e.g., "John 3:16")
-      - Book Chapter:Verse-Verse (e.g., "John 3:16-21")
-      - Book Chapter (e.g., "John 3") -> Returns all verses in chapter
-    
-    Returns:
-        None if no match.
-        Dict with keys: book_id, chapter, start_verse, end_verse (optional)
-    """
-    # Normalize query: remove extra spaces
-    query = query.strip()
-    
-    # Regex for "Book Chapter:Verse[-Verse]" or "Book Chapter"
-    # We need to handle book names with spaces (e.g. "1 John")
-    # Strategy: Try to match the end of the string first for the numbers
-    
-    # Pattern 1: Chapter:Verse-Verse or Chapter:Verse
-    # Group 1: Book Name
-    # Group 2: Chapter
-    # Group 3: Start Verse
-    # Group 4: End Verse (optional)
-    match = re.search(r"^(.+?)\s+(\d+):(\d+)(?:-(\d+))?$", query)
-    
-    if match:
-        book_name = match.group(1).strip()
-        chapter = int(match.group(2))
-        start_verse = int(match.group(3))
-        end_verse = int(match.group(4)) if match.group(4) else start_verse
-        
-        book_id = get_book_id(book_name)
-        if book_id is not None:
-            return {
-                "book_id": book_id,
-                "chapter": chapter,
-                "start_verse": start_verse,
-                "end_verse": end_verse
-            }
+# Standard abbreviations the unique-prefix rule in get_book_id misses: not a
+# prefix of the name (Mt, Jn, 1 Kgs), or a prefix shared by two books
+# (Phil is Philippians, not Philemon; Jud is Jude, not Judges). Keys are
+# lowercase with spaces and periods removed.
+book_aliases = {
+    "Genesis": ["gn"],
+    "Leviticus": ["lv"],
+    "Numbers": ["nm", "nb"],
+    "Deuteronomy": ["dt"],
+    "Joshua": ["jsh"],
+    "Judges": ["jdg", "jg"],
+    "Ruth": ["rth"],
+    "1 Samuel": ["1sm"],
+    "2 Samuel": ["2sm"],
+    "1 Kings": ["1kgs", "1kg"],
+    "2 Kings": ["2kgs", "2kg"],
+    "Psalms": ["pss", "pslm"],
+    "Proverbs": ["prv"],
+    "Ecclesiastes": ["qoh"],
+    "Song of Solomon": ["sos", "ss", "songofsongs", "cant"],
+    "Ezekiel": ["ezk"],
+    "Daniel": ["dn"],
+    "Joel": ["jl"],
+    "Jonah": ["jnh"],
+    "Zephaniah": ["zp"],
+    "Haggai": ["hg"],
+    "Zechariah": ["zc"],
+    "Matthew": ["mt"],
+    "Mark": ["mk", "mrk"],
+    "Luke": ["lk"],
+    "John": ["jn", "jhn"],
+    "Romans": ["rm"],
+    "Philippians": ["phil", "php", "pp"],
+    "1 Timothy": ["1tm"],
+    "2 Timothy": ["2tm"],
+    "Philemon": ["phlm", "phm"],
+    "James": ["jas", "jm"],
+    "1 Peter": ["1pt"],
+    "2 Peter": ["2pt"],
+    "1 John": ["1jn", "1jhn"],
+    "2 John": ["2jn", "2jhn"],
+    "3 John": ["3jn", "3jhn"],
+    "Jude": ["jud", "jd"],
+    "Revelation": ["rv"],
+}
+
+_ALIAS_IDS = {alias: book["id"] for book in books for alias in book_aliases.get(book["text"], [])}
 
-    # Pattern 2: Chapter only (e.g. "John 3")
-    match = re.search(r"^(.+?)\s+(\d+)$", query)
-    if match:
-        book_name = match.group(1).strip()
-        chapter = int(match.group(2))
-        
-        book_id = get_book_id(book_name)
-        if book_id is not None:
-             return {
-                "book_id": book_id,
-                "chapter": chapter,
-                "start_verse": None, # Indicates whole chapter
-                "end_verse": None
-            }
-            
-    return None
 
 def get_book_id(name):
-    """Case-insensitive lookup for book ID."""
+    """
+    Case-insensitive lookup for book ID.
+
+    Full names match exactly; then the standard abbreviations in
+    book_aliases ("Mt", "Jn", "Phil"); otherwise a prefix that matches
+    exactly one book is accepted as an abbreviation ("Rom", "1 Cor", "Ps").
+    """
     name_lower = name.lower()
-    # Handle common abbreviations if needed, for now just exact match or standard abbreviations could be added
-    # Let's try to match against the 'text' field in books list
     for book in books:
         if book["text"].lower() == name_lower:
             return book["id"]
-    
-    # Optional: Add simple abbreviation mapping here if desired
-    # For now, we rely on full name or exact match from the books list
-    return None
+
+    key = re.sub(r"[\s.]+", "", name_lower)
+    if key in _ALIAS_IDS:
+        return _ALIAS_IDS[key]
+    if len(key) < 2:
+        return None
+    matches = [book["id"] for book in books if book["text"].lower().replace(" ", "").startswith(key)]
+    return matches[0] if len(matches) == 1 else None
+
+
+# One passage segment: [Book] Chapter[:Verse][-[Chapter:]Verse | -Chapter]
+_SEGMENT_RE = re.compile(
+    r"^(?:(?P<book>.*?[A-Za-z.])\s*)?(?P<c1>\d+)(?::(?P<v1>\d+))?"
+    r"(?:\s*[-\u2013]\s*(?P<c2>\d+)(?::(?P<v2>\d+))?)?$"
+)
+
+# Chapters and verses are packed into 16 bits of a verse key (see corpus.pack_refs)
+REFERENCE_NUMBER_LIMIT = 1 << 16
+
+
+def parse_passage_reference(query):
+    """
+    Parse a list of passages separated by semicolons.
+
+    Each segment is a verse, verse range, chapter, chapter range or a range
+    across chapters; a segment without a book continues the previous one:
+      - "John 3:16-4:2" (cross-chapter range)
+      - "Rom 8:28; Eph 2:8-9; Ps 23" (list)
+      - "Genesis 1-2; 3:1-5" (chapter range, then Genesis 3:1-5)
+
+    Returns:
+        None unless every segment parses and no chapter or verse number
+        reaches REFERENCE_NUMBER_LIMIT. Otherwise a list of dicts with
+        keys book_id, start_chapter, start_verse, end_chapter, end_verse;
+        start_verse/end_verse are None when the range starts/ends with a
+        whole chapter.
+    """
+    segments = []
+    book_id = None
+    for part in query.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        match = _SEGMENT_RE.match(part)
+        if not match:
+            return None
+        if match.group("book"):
+            book_id = get_book_id(match.group("book").strip())
+        if book_id is None:
+            return None
+
+        c1, v1, c2, v2 = (
+            int(value) if value else None for value in match.group("c1", "v1", "c2", "v2")
+        )
+        if c2 is None:
+            # "3" or "3:16"
+            c2, v2 = c1, v1
+        elif v1 is not None and v2 is None:
+            # "3:16-21": the number after the dash is a verse
+            c2, v2 = c1, c2
+        if any(value is not None and value >= REFERENCE_NUMBER_LIMIT for value in (c1, v1, c2, v2)):
+            return None
+        if (c2, v2 if v2 is not None else float("inf")) < (c1, v1 or 0):
+            return None
+        segments.append(
+            {
+                "book_id": book_id,
+                "start_chapter": c1,
+                "start_verse": v1,
+                "end_chapter": c2,
+                "end_verse": v2,
+            }
+        )
+    return segments or None
@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .bibledata import books
+from .corpus import PathCache, index_dir, publish_index
+from .textindex import TextIndex, source_hash
+
+CHAPTERS_FILE = "concordance_chapters.npy"
+OFFSETS_FILE = "concordance_offsets.npy"
+CELLS_FILE = "concordance_cells.npy"
+COUNTS_FILE = "concordance_counts.npy"
+WORDS_FILE = "concordance_words.npy"
+VOCAB_FILE = "concordance_vocab.json"
+
+# Builds live in "concordance-<content hash>" directories under the version's index directory
+CONCORDANCE_PREFIX = "concordance-"
+
+# Keyed by the version's index directory
+_loaded = PathCache()
+
+
+def concordance_path(version_name, digest):
+    """Directory of the concordance built from a database content hash."""
+    return os.path.join(index_dir(version_name), f"{CONCORDANCE_PREFIX}{digest[:16]}")
+
+
+def build_concordance(version_name):
+    """
+    Build the term x chapter occurrence matrix for a version and save it.
+
+    The matrix is stored in CSR layout: row t of the matrix is
+    cells[offsets[t]:offsets[t + 1]] (chapter ids, ascending) with the matching
+    occurrence counts, alongside the (Book, Chapter) of every chapter id and the
+    number of words in each chapter. The files are written to a scratch
+    directory and renamed into place (see publish_index), so processes
+    mapping an older build are never handed truncated files.
+
+    Returns:
+        The directory the matrix was written to.
+    """
+    directory = concordance_path(version_name, source_hash(version_name))
+    index = TextIndex.from_database(version_name)
+
+    chapters, verse_chapter = np.unique(index.refs[:, :2], axis=0, return_inverse=True)
+    verse_chapter = verse_chapter.reshape(-1)
+    occ_terms = np.repeat(np.arange(len(index.vocab), dtype=np.int64), np.diff(index.offsets))
+    occ_chapters = verse_chapter[index.occ_verses]
+
+    keys, counts = np.unique(occ_terms * len(chapters) + occ_chapters, return_counts=True)
+    offsets = np.zeros(len(index.vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // len(chapters), minlength=len(index.vocab)), out=offsets[1:])
+
+    scratch = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    np.save(os.path.join(scratch, CHAPTERS_FILE), chapters.astype(np.int16))
+    np.save(os.path.join(scratch, OFFSETS_FILE), offsets)
+    np.save(os.path.join(scratch, CELLS_FILE), (keys % len(chapters)).astype(np.int32))
+    np.save(os.path.join(scratch, COUNTS_FILE), counts.astype(np.int32))
+    np.save(
+        os.path.join(scratch, WORDS_FILE),
+        np.bincount(occ_chapters, minlength=len(chapters)).astype(np.int32),
+    )
+    with open(os.path.join(scratch, VOCAB_FILE), "w", encoding="utf-8") as f:
+        json.dump(index.vocab, f)
+    publish_index(scratch, directory, CONCORDANCE_PREFIX)
+    return directory
+
+
+class Concordance:
+    """Memory-mapped term x chapter count matrix written by build_concordance."""
+
+    def __init__(self, directory):
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        self.directory = directory
+        self.chapters = load(CHAPTERS_FILE)
+        self.offsets = load(OFFSETS_FILE)
+        self.cells = load(CELLS_FILE)
+        self.counts = load(COUNTS_FILE)
+        self.chapter_words = load(WORDS_FILE)
+        with open(os.path.join(directory, VOCAB_FILE), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        self.term_ids = {term: i for i, term in enumerate(self.vocab)}
+        self.chapter_books = np.asarray(self.chapters[:, 0], dtype=np.int64)
+        self.chapter_freq = np.diff(self.offsets)
+        self.total_words = int(self.chapter_words.sum())
+        self._cell_terms = None
+
+    def row(self, term):
+        """Return the (chapter ids, counts) of a term; both empty for unknown terms."""
+        term_id = self.term_ids.get(term.lower())
+        if term_id is None:
+            return self.cells[:0], self.counts[:0]
+        lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.cells[lo:hi], self.counts[lo:hi]
+
+    def distribution(self, term):
+        """
+        Frequency distribution of a term over books and chapters.
+
+        Returns:
+            A dict with the total occurrences, the rate per 10,000 words,
+            counts per book (books without hits left out) and per chapter.
+        """
+        chapter_ids, counts = self.row(term)
+        per_book = np.bincount(
+            self.chapter_books[chapter_ids], weights=counts, minlength=len(books)
+        ).astype(np.int64)
+        total = int(counts.sum())
+        return {
+            "total": total,
+            "per_10k_words": round(total * 10000 / self.total_words, 3) if self.total_words else 0.0,
+            "books": {
+                books[book_id]["text"]: int(per_book[book_id])
+                for book_id in np.flatnonzero(per_book).tolist()
+            },
+            "chapters": [
+                {
+                    "book": books[int(self.chapters[chapter_id, 0])]["text"],
+                    "chapter": int(self.chapters[chapter_id, 1]),
+                    "count": count,
+                }
+                for chapter_id, count in zip(chapter_ids.tolist(), counts.tolist())
+            ],
+        }
+
+    def cooccurring(self, term, limit=10):
+        """
+        Terms that share the most chapters with `term`, relative to how many
+        chapters each appears in (Dice coefficient over chapter sets).
+
+        Returns:
+            A list of {"term", "chapters", "score"} dicts, best first.
+        """
+        term_id = self.term_ids.get(term.lower())
+        if term_id is None:
+            return []
+        if self._cell_terms is None:
+            self._cell_terms = np.repeat(
+                np.arange(len(self.vocab), dtype=np.int32), self.chapter_freq
+            )
+        chapter_ids, _ = self.row(term)
+        in_chapters = np.zeros(len(self.chapters), dtype=bool)
+        in_chapters[chapter_ids] = True
+        shared = np.bincount(
+            self._cell_terms[in_chapters[self.cells]], minlength=len(self.vocab)
+        )
+        shared[term_id] = 0
+        scores = 2 * shared / (len(chapter_ids) + self.chapter_freq)
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [
+            {"term": self.vocab[i], "chapters": int(shared[i]), "score": round(float(scores[i]), 4)}
+            for i in best.tolist()
+            if shared[i]
+        ]
+
+
+def load_concordance(version_name):
+    """
+    Return the cached Concordance for a version, or None if none was built
+    from the database's current contents. A rebuilt matrix is picked up on
+    the next call.
+    """
+    try:
+        directory = concordance_path(version_name, source_hash(version_name))
+    except FileNotFoundError:
+        return None
+    return _loaded.load(directory, Concordance, VOCAB_FILE, key=index_dir(version_name))
@@ -0,0 +1,209 @@
+import os
+import re
+import shutil
+import sqlite3
+
+import numpy as np
+from django.conf import settings
+
+# Words are runs of letters/digits/underscores, same as the \w+ terms in tokenize_expr
+WORD_RE = re.compile(r"\w+")
+
+# `bible` column names keyed by (path, mtime), so a rebuilt file is re-read
+_columns = {}
+
+
+class PathCache(dict):
+    """
+    Per-version structures loaded by this process, keyed by their directory or
+    database path, so a settings override (e.g. a test's BIBLE_DATABASE_DIR)
+    gets its own entry.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # What each entry was loaded from: (path, stamp of its required file)
+        self.sources = {}
+
+    def load(self, path, factory, required_file=None, key=None):
+        """
+        Return the entry for `path`, creating it with `factory(path)` on first use.
+
+        With `required_file`, nothing is cached (and None is returned) until
+        that file exists under `path`, and the entry is reloaded when a rebuild
+        replaces the file. With `key`, the entry is stored under `key` instead
+        and reloaded when `path` changes (e.g. a build for newer contents).
+        """
+        key = path if key is None else key
+        stamp = None
+        if required_file is not None:
+            try:
+                stat = os.stat(os.path.join(path, required_file))
+            except FileNotFoundError:
+                return None
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+        source = (path, stamp)
+        if key not in self or self.sources.get(key, source) != source:
+            self[key] = factory(path)
+            self.sources[key] = source
+        return self[key]
+
+
+def database_dir():
+    """Return the directory holding the `{Version}Bible_Database.db` files."""
+    return str(getattr(settings, "BIBLE_DATABASE_DIR", "databases"))
+
+
+def database_path(version_name):
+    """Return the SQLite database path for a short version name (e.g. "ESV")."""
+    return os.path.join(database_dir(), f"{version_name}Bible_Database.db")
+
+
+def index_dir(version_name):
+    """Return the directory where prebuilt search indexes for a version live."""
+    return os.path.join(database_dir(), "index", version_name)
+
+
+def publish_index(scratch, directory, prefix):
+    """
+    Move a fully written `scratch` directory into place as `directory`, then
+    remove every other build in the same parent whose name starts with `prefix`.
+
+    Saved files are never rewritten in place: a process that memory-maps an
+    older build keeps reading its unlinked pages until it reloads, where
+    truncating the file under it would kill it with SIGBUS.
+    """
+    parent = os.path.dirname(directory)
+    try:
+        os.rename(directory, f"{directory}.old-{os.getpid()}")
+    except FileNotFoundError:
+        pass
+    os.rename(scratch, directory)
+    for name in os.listdir(parent):
+        stale = os.path.join(parent, name)
+        if name.startswith(prefix) and ".tmp-" not in name and stale != directory:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def table_columns(version_name):
+    """Return the column names of a version's `bible` table (empty if the file is missing)."""
+    path = database_path(version_name)
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return ()
+    if key not in _columns:
+        db = sqlite3.connect(path)
+        try:
+            _columns[key] = tuple(row[1] for row in db.execute("PRAGMA table_info(bible)"))
+        finally:
+            db.close()
+    return _columns[key]
+
+
+def source_stamp(path):
+    """Return [size, mtime_ns] of a file, used to notice when a database changes."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def pack_refs(refs):
+    """Pack (Book, Chapter, Versecount) rows into int64 keys that sort in canonical order."""
+    refs = np.asarray(refs, dtype=np.int64).reshape(-1, 3)
+    return (refs[:, 0] << 32) | (refs[:, 1] << 16) | refs[:, 2]
+
+
+def passage_key_ranges(segments):
+    """
+    Turn parse_passage_reference segments into half-open [lo, hi) ranges of
+    pack_refs keys, sorted with overlapping and adjacent ranges merged.
+    """
+    ranges = []
+    for segment in segments:
+        book = segment["book_id"] << 32
+        lo = book | (segment["start_chapter"] << 16) | (segment["start_verse"] or 0)
+        if segment["end_verse"] is None:
+            hi = book + ((segment["end_chapter"] + 1) << 16)
+        else:
+            # Added, not OR-ed, so the last verse or chapter carries into the next key
+            hi = book + (segment["end_chapter"] << 16) + segment["end_verse"] + 1
+        ranges.append((lo, hi))
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    """Sort half-open (lo, hi) ranges and merge those that overlap or touch."""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def tokenize(text):
+    """Split verse text into lowercase word tokens."""
+    return WORD_RE.findall(text.lower())
+
+
+def load_verses(version_name):
+    """
+    Read every verse of a version in canonical order.
+
+    Returns:
+        A tuple (refs, texts) where refs is a list of (Book, Chapter, Versecount)
+        tuples and texts is the matching list of verse strings.
+    """
+    db = sqlite3.connect(database_path(version_name))
+    try:
+        cur = db.execute(
+            "SELECT Book, Chapter, Versecount, verse FROM bible "
+            "ORDER BY Book, Chapter, Versecount"
+        )
+        refs = []
+        texts = []
+        for book, chapter, verse_num, verse in cur:
+            refs.append((book, chapter, verse_num))
+            texts.append(verse or "")
+    finally:
+        db.close()
+    return refs, texts
+
+
+def fetch_verses(version_name, refs):
+    """
+    Fetch verse rows for a list of (Book, Chapter, Versecount) references.
+
+    Rows are returned as dicts in the order of `refs`; unknown references are skipped.
+    """
+    if not refs:
+        return []
+    placeholders = ", ".join("(?, ?, ?)" for _ in refs)
+    values = [int(part) for ref in refs for part in ref]
+    db = sqlite3.connect(database_path(version_name))
+    try:
+        cur = db.execute(
+            "SELECT Book, Chapter, Versecount, verse FROM bible "
+            f"WHERE (Book, Chapter, Versecount) IN (VALUES {placeholders})",
+            values,
+        )
+        found = {
+            (book, chapter, verse_num): verse
+            for book, chapter, verse_num, verse in cur
+        }
+    finally:
+        db.close()
+    rows = []
+    for ref in refs:
+        key = tuple(int(part) for part in ref)
+        if key in found:
+            rows.append(
+                {
+                    "Book": key[0],
+                    "Chapter": key[1],
+                    "Versecount": key[2],
+                    "verse": found[key],
+                }
+            )
+    return rows
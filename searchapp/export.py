@@ -0,0 +1,112 @@
+import csv
+import importlib.util
+import io
+import json
+
+# Columns of every exported row, in order
+EXPORT_COLUMNS = ("version", "Book", "Chapter", "Versecount", "verse")
+
+# Rows encoded per yielded chunk (and per Parquet row group)
+EXPORT_CHUNK = 5000
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available():
+    """True if pyarrow is installed, without importing it."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def chunked(rows, size=EXPORT_CHUNK):
+    """Group an iterable of rows into lists of at most `size`."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_chunks(rows):
+    """Encode (version, Book, Chapter, Versecount, verse) tuples as CSV text chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: no rows matched
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(rows):
+    """Encode export rows as newline-delimited JSON objects."""
+    for chunk in chunked(rows):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in chunk
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in pieces (see parquet_chunks)."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(rows):
+    """
+    Encode export rows as a Parquet file, one row group per chunk.
+
+    Each row group's bytes are yielded as soon as it is written and the
+    footer comes last, so only one chunk is held in memory. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("version", pa.string()),
+            ("Book", pa.int16()),
+            ("Chapter", pa.int16()),
+            ("Versecount", pa.int16()),
+            ("verse", pa.string()),
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in chunked(rows):
+        arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
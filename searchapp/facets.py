@@ -0,0 +1,72 @@
+import numpy as np
+
+from .bibledata import book_sections, books, testaments
+
+# Set bits per byte value, for popcounts over packed bitsets
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def facets_from_book_counts(book_counts):
+    """
+    Roll per-book hit counts up into the same shape as FacetIndex.counts.
+
+    Args:
+        book_counts: mapping of book id to number of hits.
+    """
+    facets = {"books": {}, "sections": {}, "testaments": {}}
+    for book in books:
+        if book_counts.get(book["id"]):
+            facets["books"][book["text"]] = book_counts[book["id"]]
+    for name, book_ids in book_sections.items():
+        facets["sections"][name] = sum(book_counts.get(i, 0) for i in book_ids)
+    for testament in testaments:
+        facets["testaments"][testament] = sum(
+            book_counts.get(book["id"], 0) for book in books if book["testament"] == testament
+        )
+    return facets
+
+
+class FacetIndex:
+    """
+    Packed verse bitsets for every facet (book, section, testament) of a version.
+
+    Row f of `bits` has bit i set when verse row i belongs to facet f, so the
+    hit counts of all facets come from one AND plus popcount over the matrix.
+    """
+
+    def __init__(self, refs):
+        verse_books = np.asarray(refs)[:, 0]
+        self.labels = (
+            [("books", book["text"]) for book in books]
+            + [("sections", name) for name in book_sections]
+            + [("testaments", name) for name in testaments]
+        )
+        membership = np.zeros((len(self.labels), len(verse_books)), dtype=bool)
+        for book in books:
+            membership[book["id"]] = verse_books == book["id"]
+        offset = len(books)
+        for i, book_ids in enumerate(book_sections.values()):
+            membership[offset + i] = np.isin(verse_books, book_ids)
+        offset += len(book_sections)
+        for i, testament in enumerate(testaments):
+            book_ids = [book["id"] for book in books if book["testament"] == testament]
+            membership[offset + i] = np.isin(verse_books, book_ids)
+        self.size = len(verse_books)
+        self.bits = np.packbits(membership, axis=1)
+
+    def counts(self, verse_ids):
+        """
+        Count hits per facet for a set of verse rows.
+
+        Returns:
+            {"books": {name: n, ...}, "sections": {...}, "testaments": {...}};
+            books without hits are left out.
+        """
+        hits = np.zeros(self.size, dtype=bool)
+        hits[verse_ids] = True
+        totals = POPCOUNT[self.bits & np.packbits(hits)].sum(axis=1)
+        facets = {"books": {}, "sections": {}, "testaments": {}}
+        for (kind, name), total in zip(self.labels, totals.tolist()):
+            if total or kind != "books":
+                facets[kind][name] = total
+        return facets
@@ -0,0 +1,91 @@
+import numpy as np
+
+# Largest edit distance considered, and the word prefix the delete index covers
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+# Words this short only get distance-1 suggestions
+SHORT_WORD = 4
+
+
+def deletes(word, distance):
+    """Return `word` plus every string reachable by deleting up to `distance` characters."""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit=MAX_DISTANCE):
+    """
+    Optimal-string-alignment distance (Levenshtein plus adjacent transpositions).
+
+    Returns `limit + 1` as soon as the distance is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return row[-1]
+
+
+class SymmetricDeleteIndex:
+    """
+    Symmetric-delete spelling index over a vocabulary (the SymSpell scheme).
+
+    Every deletion variant (up to MAX_DISTANCE) of each term's first
+    PREFIX_LENGTH characters is hashed and stored as parallel sorted int64/int32
+    arrays, so a lookup is a handful of binary searches followed by an exact
+    distance check on the few candidates that share a variant.
+    """
+
+    def __init__(self, vocab, doc_freq):
+        self.vocab = vocab
+        self.doc_freq = doc_freq
+        hashes = []
+        term_ids = []
+        for term_id, term in enumerate(vocab):
+            for variant in deletes(term[:PREFIX_LENGTH], MAX_DISTANCE):
+                hashes.append(hash(variant))
+                term_ids.append(term_id)
+        hashes = np.array(hashes, dtype=np.int64)
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[order]
+        self.term_ids = np.array(term_ids, dtype=np.int32)[order]
+
+    def lookup(self, word, limit=3):
+        """
+        Return up to `limit` vocabulary terms closest to `word`, nearest and
+        most frequent first.
+        """
+        word = word.lower()
+        max_distance = 1 if len(word) <= SHORT_WORD else MAX_DISTANCE
+        keys = np.array(
+            [hash(v) for v in deletes(word[:PREFIX_LENGTH], max_distance)], dtype=np.int64
+        )
+        lo = np.searchsorted(self.hashes, keys, side="left")
+        hi = np.searchsorted(self.hashes, keys, side="right")
+        candidates = set()
+        for start, stop in zip(lo, hi):
+            candidates.update(self.term_ids[start:stop].tolist())
+
+        scored = []
+        for term_id in candidates:
+            term = self.vocab[term_id]
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -int(self.doc_freq[term_id]), term))
+        scored.sort()
+        return [term for _, _, term in scored[:limit]]
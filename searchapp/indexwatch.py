@@ -0,0 +1,83 @@
+import sys
+import threading
+
+from .corpus import database_path, source_stamp
+from .textindex import _loaded, load_or_build_text_index
+from .warmup import installed_versions
+
+# Seconds between checks of the database files
+WATCH_INTERVAL = 5.0
+
+_watcher = None
+
+
+class IndexWatcher(threading.Thread):
+    """
+    Background thread that rebuilds text indexes when their databases change.
+
+    Every `interval` seconds the database of each installed version is
+    stat()ed. When a file changes (setup.sh re-run, optimize_databases) or a
+    new version appears, its index is loaded from disk or rebuilt, warmed,
+    and swapped into the cache with a single dict assignment. Searches that
+    already hold the old index finish on it; later ones get the new one.
+    """
+
+    def __init__(self, interval=WATCH_INTERVAL):
+        super().__init__(name="index-watcher", daemon=True)
+        self.interval = interval
+        self.stamps = None
+        self._stopped = threading.Event()
+
+    def check(self):
+        """
+        Rebuild and swap in the index of every version whose database changed
+        since the previous check. The first check only records the files.
+
+        Returns:
+            The names of the versions whose index was swapped.
+        """
+        stamps = {}
+        for name in installed_versions():
+            try:
+                stamps[name] = source_stamp(database_path(name))
+            except FileNotFoundError:
+                continue
+        if self.stamps is None:
+            self.stamps = stamps
+            return []
+
+        swapped = []
+        for name, stamp in stamps.items():
+            if self.stamps.get(name) == stamp:
+                continue
+            index = load_or_build_text_index(name)
+            index.warm()
+            _loaded[database_path(name)] = index
+            # Recorded only after a successful swap, so a failed rebuild is retried
+            self.stamps[name] = stamp
+            swapped.append(name)
+        return swapped
+
+    def run(self):
+        self.check()
+        while not self._stopped.wait(self.interval):
+            try:
+                swapped = self.check()
+            except Exception as e:
+                # Keep serving the current indexes; retry on the next tick
+                sys.stderr.write(f"Index watcher: rebuild failed: {e}\n")
+                continue
+            if swapped:
+                sys.stderr.write(f"Index watcher: reloaded {', '.join(swapped)}\n")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_watcher(interval=WATCH_INTERVAL):
+    """Start the process-wide index watcher (once per process) and return it."""
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        _watcher = IndexWatcher(interval)
+        _watcher.start()
+    return _watcher
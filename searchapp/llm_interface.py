@@ -1,22 +1,33 @@
 import re
-import os
-import sys
-import sqlite3
+import importlib
+import importlib.util
 from django.conf import settings
 
-# Attempt to import clients
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+from .resultcache import cache_key, get_or_compute
 
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None
 # Global cache for local model to avoid reloading
 LOCAL_LLM = None
 
+# LLM SDK client classes, imported on first use (the SDKs are slow to import
+# and most requests never reach an LLM)
+_sdk_classes = {}
+
+
+def sdk_installed(module_name):
+    """True if an LLM SDK package is installed, without importing it."""
+    return importlib.util.find_spec(module_name) is not None
+
+
+def load_sdk_class(module_name, class_name):
+    """Import and return an SDK client class (e.g. openai.OpenAI), or None if not installed."""
+    key = (module_name, class_name)
+    if key not in _sdk_classes:
+        try:
+            _sdk_classes[key] = getattr(importlib.import_module(module_name), class_name)
+        except ImportError:
+            _sdk_classes[key] = None
+    return _sdk_classes[key]
+
 def get_llm_client():
     """
     Get the configured LLM client. 
@@ -28,7 +39,7 @@ def get_llm_client():
     import urllib.error
     
     # 1. Ollama (Localhost) - Check if actually running first
-    if OpenAI:
+    if sdk_installed("openai"):
         try:
             # Quick ping to Ollama server
             req = urllib.request.Request(
@@ -38,7 +49,7 @@ def get_llm_client():
             req.add_header("Connection", "close")
             with urllib.request.urlopen(req, timeout=1) as resp:
                 if resp.status == 200:
-                    return OpenAI(
+                    return load_sdk_class("openai", "OpenAI")(
                         base_url="http://localhost:11434/v1",
                         api_key="ollama"  # required but unused
                     ), "ollama"
@@ -48,18 +59,21 @@ def get_llm_client():
 
     # 2. Cloud Fallbacks
     # Groq (Preferred Cloud - fast and free tier)
-    if Groq and getattr(settings, 'GROQ_API_KEY', ''):
+    if getattr(settings, 'GROQ_API_KEY', '') and sdk_installed("groq"):
+        Groq = load_sdk_class("groq", "Groq")
         return Groq(api_key=settings.GROQ_API_KEY), "groq"
 
     # DeepSeek (Secondary Cloud)
     deepseek_key = getattr(settings, 'DEEPSEEK_API_KEY', '')
-    if OpenAI and deepseek_key:
+    if deepseek_key and sdk_installed("openai"):
+        OpenAI = load_sdk_class("openai", "OpenAI")
         return OpenAI(
             api_key=deepseek_key, 
             base_url="https://api.deepseek.com"
         ), "deepseek"
     
-    if OpenAI and getattr(settings, 'OPENAI_API_KEY', ''):
+    if getattr(settings, 'OPENAI_API_KEY', '') and sdk_installed("openai"):
+        OpenAI = load_sdk_class("openai", "OpenAI")
         return OpenAI(api_key=settings.OPENAI_API_KEY), "openai"
     
     return None, None
@@ -80,6 +94,10 @@ def detect_intent(query):
     # 1. Check for standard Boolean operators
     if re.search(r"\+|,\(|\)", query):
         return "STANDARD"
+
+    # 1b. Quoted phrases, NEAR/n proximity operators and * wildcards
+    if re.search(r'"|\*|\bNEAR/\d+', query, flags=re.IGNORECASE):
+        return "STANDARD"
         
     # 2. Check for Verse References
     if re.search(r"^\d*\s*[a-zA-Z]+\s+\d+(:\d+)?(-\d+)?$", query):
@@ -174,21 +192,24 @@ def generate_search_expression(query, version_name="ESV"):
         
     return expression, None
 
-def validate_and_sanitize_sql(sql):
+def cached_search_expression(query, version_name="ESV"):
     """
-    Basic safety check to prevent destructive queries.
+    generate_search_expression through the shared result cache.
+
+    The model runs at temperature 0, so a query's expression is stored once
+    for every worker; failures are not cached and are retried next time.
     """
-    if not sql:
-        return False
-    
-    forbidden = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER", "TRUNCATE", ";"]
-    sql_upper = sql.upper()
-    
-    for word in forbidden:
-        if word in sql_upper:
-            return False
-            
-    return True
+    result = {}
+
+    def compute():
+        result["value"] = generate_search_expression(query, version_name)
+        expression, error = result["value"]
+        return expression.encode("utf-8") if expression and not error else None
+
+    data, hit = get_or_compute(cache_key("llm", query.strip(), version_name), compute)
+    if hit:
+        return data.decode("utf-8"), None
+    return result["value"]
 
 def explain_verse(reference, text):
     """
@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from searchapp.concordance import build_concordance
+from searchapp.corpus import database_path
+from searchapp.warmup import installed_versions
+
+
+class Command(BaseCommand):
+    help = "Build the per-chapter term count matrix used by /concordance."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "versions",
+            nargs="*",
+            help="Short version names (e.g. ESV KJV). Defaults to every installed version.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["versions"] or installed_versions()
+        if not names:
+            raise CommandError("No Bible databases found. Run setup.sh first.")
+        for name in names:
+            if not os.path.exists(database_path(name)):
+                raise CommandError(f"Missing database for {name}: {database_path(name)}")
+            directory = build_concordance(name)
+            self.stdout.write(self.style.SUCCESS(f"{name}: concordance written to {directory}"))
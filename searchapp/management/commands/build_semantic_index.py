@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from searchapp.corpus import database_path
+from searchapp.semantic import (
+    DEFAULT_DIMS,
+    DEFAULT_NEIGHBORS,
+    build_semantic_index,
+    load_semantic_index,
+)
+from searchapp.warmup import installed_versions
+
+
+class Command(BaseCommand):
+    help = "Build the offline LSA (TF-IDF + truncated SVD) index used by mode=semantic and /related."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "versions",
+            nargs="*",
+            help="Short version names (e.g. ESV KJV). Defaults to every installed version.",
+        )
+        parser.add_argument(
+            "--dims",
+            type=int,
+            default=DEFAULT_DIMS,
+            help=f"Number of latent dimensions (default {DEFAULT_DIMS}).",
+        )
+        parser.add_argument(
+            "--neighbors",
+            type=int,
+            default=DEFAULT_NEIGHBORS,
+            help=f"Related verses precomputed per verse (default {DEFAULT_NEIGHBORS}; 0 skips the table).",
+        )
+
+    def handle(self, *args, **options):
+        names = options["versions"] or installed_versions()
+        if not names:
+            raise CommandError("No Bible databases found. Run setup.sh first.")
+        for name in names:
+            if not os.path.exists(database_path(name)):
+                raise CommandError(f"Missing database for {name}: {database_path(name)}")
+            directory = build_semantic_index(name, dims=options["dims"], neighbors=options["neighbors"])
+            self.stdout.write(self.style.SUCCESS(f"{name}: semantic index written to {directory}"))
+            if options["neighbors"] > 0:
+                neighbors = load_semantic_index(name).neighbors
+                self.stdout.write(
+                    self.style.SUCCESS(f"{name}: related-verse table {neighbors.shape[0]}x{neighbors.shape[1]}")
+                )
@@ -0,0 +1,66 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from searchapp.corpus import database_path
+from searchapp.export import ENCODERS, parquet_available
+from searchapp.planner import MalformedExpression
+from searchapp.querycost import QueryTooExpensive
+from searchapp.sandbox import SandboxError
+from searchapp.views import export_rows
+from searchapp.warmup import installed_versions
+
+
+class Command(BaseCommand):
+    help = "Export every match of a search as CSV, NDJSON or Parquet, streamed from the databases."
+
+    def add_arguments(self, parser):
+        parser.add_argument("expression", help="Search expression, e.g. \"faith + works\".")
+        parser.add_argument(
+            "--versions",
+            default="",
+            help="Comma-separated short version names. Defaults to every installed version.",
+        )
+        parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+        parser.add_argument(
+            "--output",
+            "-o",
+            default="-",
+            help="Output file (default: stdout; required for Parquet).",
+        )
+        parser.add_argument("--case", action="store_true", help="Case-sensitive search.")
+        parser.add_argument("--stem", action="store_true", help="Match every word form.")
+
+    def handle(self, *args, **options):
+        names = [name for name in options["versions"].split(",") if name] or installed_versions()
+        if not names:
+            raise CommandError("No Bible databases found. Run setup.sh first.")
+        for name in names:
+            if not os.path.exists(database_path(name)):
+                raise CommandError(f"Missing database for {name}: {database_path(name)}")
+        fmt = options["format"]
+        if fmt == "parquet":
+            if not parquet_available():
+                raise CommandError("Parquet export needs pyarrow (`pip install pyarrow`).")
+            if options["output"] == "-":
+                raise CommandError("Parquet export needs --output FILE.")
+
+        try:
+            streams = [
+                export_rows(options["expression"], name, options["case"], options["stem"])
+                for name in names
+            ]
+        except (SandboxError, QueryTooExpensive, MalformedExpression) as e:
+            raise CommandError(str(e))
+        rows = (row for stream in streams for row in stream)
+        chunks = ENCODERS[fmt](rows)
+
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        mode = "wb" if fmt == "parquet" else "w"
+        with open(options["output"], mode, **({} if fmt == "parquet" else {"encoding": "utf-8", "newline": ""})) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}"))
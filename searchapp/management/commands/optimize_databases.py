@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from searchapp.corpus import database_path
+from searchapp.optimize import (
+    DEFAULT_PAGE_SIZE,
+    SCHEMA_VERSION,
+    OptimizeError,
+    optimize_database,
+    read_meta,
+)
+from searchapp.warmup import installed_versions
+
+
+class Command(BaseCommand):
+    help = "Rewrite version databases into a clustered WITHOUT ROWID layout with a normalized text column."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "versions",
+            nargs="*",
+            help="Short version names (e.g. ESV KJV). Defaults to every installed version.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=DEFAULT_PAGE_SIZE,
+            help=f"SQLite page size in bytes (default {DEFAULT_PAGE_SIZE}).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild databases that are already optimized.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["versions"] or installed_versions()
+        if not names:
+            raise CommandError("No Bible databases found. Run setup.sh first.")
+        for name in names:
+            path = database_path(name)
+            if not os.path.exists(path):
+                raise CommandError(f"Missing database for {name}: {path}")
+            if not options["force"] and read_meta(path).get("schema_version") == str(SCHEMA_VERSION):
+                self.stdout.write(f"{name}: already optimized, skipping (use --force to rebuild)")
+                continue
+            try:
+                digest = optimize_database(path, page_size=options["page_size"])
+            except OptimizeError as e:
+                raise CommandError(str(e)) from e
+            self.stdout.write(self.style.SUCCESS(f"{name}: optimized ({digest[:12]})"))
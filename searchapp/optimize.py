@@ -0,0 +1,114 @@
+import hashlib
+import os
+import sqlite3
+
+# Bumped whenever the optimized layout changes
+SCHEMA_VERSION = 1
+
+# Verses are short and read in chapter-sized runs, so larger pages mean fewer
+# B-tree pages per chapter read
+DEFAULT_PAGE_SIZE = 8192
+
+META_TABLE = "corpus_meta"
+
+_CREATE_BIBLE = """
+CREATE TABLE bible (
+    Book INTEGER NOT NULL,
+    Chapter INTEGER NOT NULL,
+    Versecount INTEGER NOT NULL,
+    verse TEXT,
+    verse_lower TEXT,
+    PRIMARY KEY (Book, Chapter, Versecount)
+) WITHOUT ROWID
+"""
+
+_CREATE_META = f"CREATE TABLE {META_TABLE} (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID"
+
+
+class OptimizeError(Exception):
+    """Raised when a database cannot be rewritten into the optimized layout."""
+
+
+def normalize_text(text):
+    """Return the normalized form stored in `verse_lower` (case-folded verse text)."""
+    return text.lower() if text is not None else None
+
+
+def content_hash(db):
+    """
+    SHA-256 of every verse of an open database, in canonical order.
+
+    Only (Book, Chapter, Versecount, verse) are hashed, so the hash of an
+    optimized database equals the hash of the file it was built from.
+    """
+    digest = hashlib.sha256()
+    cur = db.execute("SELECT Book, Chapter, Versecount, verse FROM bible ORDER BY Book, Chapter, Versecount")
+    for book, chapter, verse_num, verse in cur:
+        digest.update(f"{book}\t{chapter}\t{verse_num}\t{verse or ''}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_meta(path):
+    """Return the corpus_meta entries of a database as a dict (empty if not optimized)."""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(db.execute(f"SELECT key, value FROM {META_TABLE}"))
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        db.close()
+
+
+def optimize_database(path, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Rewrite a version database in place into the optimized read-only layout.
+
+    The `bible` table becomes a WITHOUT ROWID table clustered on
+    (Book, Chapter, Versecount), so reference and chapter lookups are single
+    B-tree range reads, with an extra `verse_lower` column for
+    case-insensitive matching. Statistics are gathered with ANALYZE, the file
+    is VACUUMed at `page_size`, and the content hash and schema version are
+    recorded in `corpus_meta`. The new file replaces the old one atomically.
+
+    Returns:
+        The content hash of the database.
+    """
+    tmp_path = f"{path}.optimize-tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.execute(f"PRAGMA page_size = {int(page_size)}")
+        db.execute("PRAGMA journal_mode = OFF")
+        db.create_function("normalize_text", 1, normalize_text, deterministic=True)
+        db.execute("ATTACH DATABASE ? AS source", (path,))
+        db.execute(_CREATE_BIBLE)
+        db.execute(_CREATE_META)
+        try:
+            db.execute(
+                "INSERT INTO bible (Book, Chapter, Versecount, verse, verse_lower) "
+                "SELECT Book, Chapter, Versecount, verse, normalize_text(verse) "
+                "FROM source.bible ORDER BY Book, Chapter, Versecount"
+            )
+        except sqlite3.IntegrityError as e:
+            raise OptimizeError(f"{path}: duplicate verse references ({e})") from e
+        db.commit()
+        db.execute("DETACH DATABASE source")
+
+        digest = content_hash(db)
+        db.executemany(
+            f"INSERT INTO {META_TABLE} (key, value) VALUES (?, ?)",
+            [("content_hash", digest), ("schema_version", str(SCHEMA_VERSION))],
+        )
+        db.commit()
+        db.execute("ANALYZE")
+        db.commit()
+        db.execute("VACUUM")
+    except BaseException:
+        db.close()
+        os.remove(tmp_path)
+        raise
+    db.close()
+    os.replace(tmp_path, path)
+    return digest
@@ -0,0 +1,200 @@
+import re
+
+from .querycost import term_selectivity
+from .textindex import is_near
+
+# Optimized plans kept per text index (oldest dropped first)
+MAX_PLANS = 1024
+
+
+class MalformedExpression(Exception):
+    """Raised when a search expression has an operator without operands or a stray ")"."""
+
+
+def parse_postfix(postfix_tokens):
+    """
+    Build an expression tree from postfix tokens.
+
+    Nodes are tuples, so equal subtrees compare and hash equal:
+    ("term", token), ("and", children), ("or", children) and
+    ("near", distance, left, right). Stray "(" tokens are skipped and extra
+    operands are ignored, as build_sql_from_postfix does.
+
+    Raises:
+        IndexError for an operator without operands, e.g. "love +".
+    """
+    stack = []
+    for token in postfix_tokens:
+        if token == "(":
+            continue
+        if token in ("+", ",") or is_near(token):
+            right = stack.pop()
+            left = stack.pop()
+            if is_near(token):
+                stack.append(("near", int(token[5:]), left, right))
+            else:
+                stack.append(("and" if token == "+" else "or", (left, right)))
+        else:
+            stack.append(("term", token))
+    return stack[0] if stack else None
+
+
+def normalize(node, case_sensitive=False):
+    """
+    Flatten nested AND/OR nodes, drop duplicate operands and absorbed
+    subexpressions ("a + (a, b)" is "a"), collapse single-operand nodes and
+    sort AND/OR operands.
+
+    Without case sensitivity, words and phrases differing only in case are
+    duplicates.
+    """
+    kind = node[0]
+    if kind == "term":
+        return ("term", node[1] if case_sensitive else node[1].lower())
+    if kind == "near":
+        return ("near", node[1], normalize(node[2], case_sensitive), normalize(node[3], case_sensitive))
+
+    children = []
+    for child in node[1]:
+        child = normalize(child, case_sensitive)
+        for operand in child[1] if child[0] == kind else (child,):
+            if operand not in children:
+                children.append(operand)
+    # Absorption: an OR inside an AND (or AND inside an OR) that repeats one
+    # of its siblings is implied by that sibling
+    dual = "or" if kind == "and" else "and"
+    children = [
+        child
+        for child in children
+        if not (child[0] == dual and any(operand in children for operand in child[1]))
+    ]
+    # AND and OR are commutative: sort operands so equivalent expressions
+    # share one plan
+    return children[0] if len(children) == 1 else (kind, tuple(sorted(children)))
+
+
+def order(node, index):
+    """
+    Reorder AND/OR operands so SQLite's short-circuit evaluation does the
+    least work: the cheapest test most likely to decide the outcome goes
+    first (rare terms first in an AND, common terms first in an OR).
+
+    Returns:
+        (node, selectivity, cost) with the estimated fraction of verses
+        matched and REGEXP passes per verse, as in querycost.estimate_cost.
+    """
+    kind = node[0]
+    if kind == "term":
+        return node, term_selectivity(node[1], index), 1.0
+    if kind == "near":
+        left, left_sel, left_cost = order(node[2], index)
+        right, right_sel, right_cost = order(node[3], index)
+        return ("near", node[1], left, right), left_sel * right_sel, left_cost + left_sel * right_cost
+
+    planned = [order(child, index) for child in node[1]]
+    if kind == "and":
+        # Rank by cost per verse ruled out
+        planned.sort(key=lambda item: item[2] / max(1.0 - item[1], 1e-9))
+    else:
+        # Rank by cost per verse ruled in
+        planned.sort(key=lambda item: item[2] / max(item[1], 1e-9))
+    selectivity, cost = planned[0][1], planned[0][2]
+    for _, child_sel, child_cost in planned[1:]:
+        if kind == "and":
+            cost += selectivity * child_cost
+            selectivity *= child_sel
+        else:
+            cost += (1 - selectivity) * child_cost
+            selectivity += child_sel - selectivity * child_sel
+    return (kind, tuple(child for child, _, _ in planned)), selectivity, cost
+
+
+def to_tokens(node, spellings=None):
+    """
+    Write a tree back out as postfix tokens, operands in tree order.
+
+    `spellings` maps normalized terms back to how they were written, so
+    wildcard and stem expansions stay keyed by the user's spelling.
+    """
+    spellings = spellings or {}
+    kind = node[0]
+    if kind == "term":
+        return [spellings.get(node[1], node[1])]
+    if kind == "near":
+        return to_tokens(node[2], spellings) + to_tokens(node[3], spellings) + [f"NEAR/{node[1]}"]
+    op = "+" if kind == "and" else ","
+    tokens = to_tokens(node[1][0], spellings)
+    for child in node[1][1:]:
+        tokens += to_tokens(child, spellings) + [op]
+    return tokens
+
+
+def tree_from_json(value):
+    """Rebuild a tree stored as JSON (nested lists) into nested tuples."""
+    if isinstance(value, list):
+        return tuple(tree_from_json(item) for item in value)
+    return value
+
+
+def refinement(previous, current):
+    """
+    The extra AND operands that narrow normalized tree `previous` to `current`.
+
+    Returns:
+        A tree matching exactly the verses of `current` among those of
+        `previous`, or None unless `current` is `previous` AND at least one
+        more operand.
+    """
+    previous_operands = previous[1] if previous[0] == "and" else (previous,)
+    current_operands = current[1] if current[0] == "and" else (current,)
+    extra = [operand for operand in current_operands if operand not in previous_operands]
+    if not extra or len(current_operands) - len(extra) != len(previous_operands):
+        return None
+    return extra[0] if len(extra) == 1 else ("and", tuple(extra))
+
+
+def matcher(node, case_sensitive=False):
+    """
+    A Python predicate over verse text equivalent to build_sql_from_postfix's
+    WHERE clause for a tree of plain words.
+    """
+    if node[0] == "term":
+        regex = re.compile(rf"\b{re.escape(node[1])}\b", 0 if case_sensitive else re.IGNORECASE)
+        return lambda text: regex.search(text) is not None
+    parts = [matcher(child, case_sensitive) for child in node[1]]
+    combine = all if node[0] == "and" else any
+    return lambda text: combine(part(text) for part in parts)
+
+
+def spellings(tokens, case_sensitive=False):
+    """Map normalized terms to their first spelling in `tokens` (see to_tokens)."""
+    found = {}
+    if not case_sensitive:
+        for token in tokens:
+            found.setdefault(token.lower(), token)
+    return found
+
+
+def plan_postfix(postfix_tokens, index, case_sensitive=False):
+    """
+    Optimize a postfix expression for execution against one version.
+
+    The expression is parsed, normalized and its operands ordered by the
+    selectivities of `index` (the version's TextIndex). Plans are memoized on
+    the index by normalized expression, so rebuilding the index drops them.
+
+    Returns:
+        A new list of postfix tokens matching the same verses.
+    """
+    tree = parse_postfix(postfix_tokens)
+    if tree is None:
+        return []
+    tree = normalize(tree, case_sensitive)
+    key = (tree, case_sensitive)
+    plans = index.plans
+    if key not in plans:
+        if len(plans) >= MAX_PLANS:
+            del plans[next(iter(plans))]
+        plans[key] = order(tree, index)[0]
+
+    return to_tokens(plans[key], spellings(postfix_tokens, case_sensitive))
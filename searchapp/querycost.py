@@ -0,0 +1,80 @@
+from .textindex import is_near, is_phrase, is_wildcard, phrase_words
+
+# Expressions with more search terms than this are rejected outright
+MAX_TERMS = 64
+
+# Estimated REGEXP passes over the corpus above which a keyword expression is
+# answered from the text index instead of SQL
+MAX_SCAN_PASSES = 4.0
+
+# Wall-clock seconds a SQL search may run before it stops with partial results
+SEARCH_TIMEOUT = 2.0
+
+
+class QueryTooExpensive(Exception):
+    """Raised when a search expression is too large to run."""
+
+
+def term_selectivity(token, index):
+    """Estimated fraction of verses containing a search term (word, wildcard or phrase)."""
+    if not len(index):
+        return 0.0
+    if is_phrase(token):
+        # A phrase is at most as common as its rarest word
+        words = phrase_words(token)
+        return min((term_selectivity(word, index) for word in words), default=0.0)
+    if is_wildcard(token):
+        terms, _ = index.expand(token)
+        term_ids = [index.term_ids[term] for term in terms]
+        return min(1.0, float(index.doc_freq[term_ids].sum()) / len(index))
+    term_id = index.term_ids.get(token.lower())
+    return 0.0 if term_id is None else float(index.doc_freq[term_id]) / len(index)
+
+
+def count_terms(postfix_tokens):
+    """Number of search terms (operands) in a postfix expression."""
+    return sum(1 for token in postfix_tokens if not (token in ("+", ",") or is_near(token)))
+
+
+def estimate_cost(postfix_tokens, index):
+    """
+    Estimate the cost of a postfix expression from the index's document frequencies.
+
+    Operand selectivities are combined assuming independence. The scan cost
+    follows SQLite's short-circuit evaluation: the right side of an AND is only
+    tested on rows the left side matched, the right side of an OR only on rows
+    it did not.
+
+    Returns:
+        A dict with "terms" (operand count), "selectivity" (expected fraction of
+        verses matched) and "scan_passes" (expected REGEXP evaluations per verse).
+    """
+    stack = []
+    terms = 0
+    for token in postfix_tokens:
+        if token in ("+", ",") or is_near(token):
+            right_sel, right_cost = stack.pop()
+            left_sel, left_cost = stack.pop()
+            if token == ",":
+                stack.append(
+                    (left_sel + right_sel - left_sel * right_sel, left_cost + (1 - left_sel) * right_cost)
+                )
+            else:
+                stack.append((left_sel * right_sel, left_cost + left_sel * right_cost))
+        else:
+            terms += 1
+            stack.append((term_selectivity(token, index), 1.0))
+    selectivity, scan_passes = stack[0] if stack else (0.0, 0.0)
+    return {
+        "terms": terms,
+        "selectivity": round(selectivity, 6),
+        "scan_passes": round(scan_passes, 3),
+    }
+
+
+def check_cost(cost):
+    """Raise QueryTooExpensive if an estimated cost is over the hard limits."""
+    if cost["terms"] > MAX_TERMS:
+        raise QueryTooExpensive(
+            f"Search has {cost['terms']} terms; at most {MAX_TERMS} are allowed."
+        )
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .corpus import database_dir
+
+# Seconds an entry lives, and how long a computing worker holds a key's lock
+DEFAULT_TTL = 24 * 3600
+LOCK_TTL = 10.0
+LOCK_POLL = 0.02
+
+# Entries are read far more often than written; refresh an entry's last-access
+# time (used for eviction) at most this often
+TOUCH_INTERVAL = 60.0
+
+# Entry format: header, JSON metadata, then packed int64 verse keys
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"MBR1"
+
+_stores = {}
+
+
+class LocalStore:
+    """
+    Redis-style key/value store in a local SQLite file shared by all workers.
+
+    Implements the subset of the redis-py client API the cache needs (get,
+    set with ex/px/nx, delete), so a real Redis client can replace it. Old
+    entries are evicted least-recently-used first once the stored values
+    exceed `max_bytes`; triggers keep the running total in the `usage` table,
+    so checking it costs one row read instead of a table scan.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = self._db()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL"
+            ") WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        # Seeded from the entries of a file written before the table existed
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER)")
+            db.execute("INSERT OR IGNORE INTO usage SELECT 0, COALESCE(SUM(LENGTH(value)), 0) FROM entries")
+            db.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+                "UPDATE usage SET bytes = bytes + COALESCE(LENGTH(NEW.value), 0); END"
+            )
+            db.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF value ON entries BEGIN "
+                "UPDATE usage SET bytes = bytes + COALESCE(LENGTH(NEW.value), 0) - COALESCE(LENGTH(OLD.value), 0); END"
+            )
+            db.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+                "UPDATE usage SET bytes = bytes - COALESCE(LENGTH(OLD.value), 0); END"
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _db(self):
+        # One connection per thread and per process (never reused across fork)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key):
+        now = time.time()
+        row = self._db().execute(
+            "SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        if now - row[2] > TOUCH_INTERVAL:
+            self._db().execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        now = time.time()
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        expires = now + ttl if ttl is not None else None
+        db = self._db()
+        if nx:
+            # Only if missing or expired, atomically
+            cur = db.execute(
+                "INSERT INTO entries (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "expires = excluded.expires, accessed = excluded.accessed "
+                "WHERE entries.expires IS NOT NULL AND entries.expires <= ?",
+                (key, value, expires, now, now),
+            )
+            return cur.rowcount > 0
+        # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete
+        # would not fire the usage trigger
+        db.execute(
+            "INSERT INTO entries (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+            "expires = excluded.expires, accessed = excluded.accessed",
+            (key, value, expires, now),
+        )
+        self._evict()
+        return True
+
+    def delete(self, *keys):
+        cur = self._db().execute(
+            f"DELETE FROM entries WHERE key IN ({', '.join('?' for _ in keys)})", keys
+        )
+        return cur.rowcount
+
+    def _evict(self):
+        db = self._db()
+        (total,) = db.execute("SELECT bytes FROM usage").fetchone()
+        if total <= self.max_bytes:
+            return
+        db.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        (total,) = db.execute("SELECT bytes FROM usage").fetchone()
+        # Drop least recently used entries until a tenth below the limit
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in db.execute("SELECT key, LENGTH(value) FROM entries ORDER BY accessed"):
+            if freed >= excess:
+                break
+            doomed.append(key)
+            freed += size
+        db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in doomed])
+
+
+class NullStore:
+    """
+    Store that keeps nothing, used when the LocalStore file cannot be created
+    (e.g. a read-only database directory): every lookup misses, so searches
+    still run, uncached.
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        return True
+
+    def delete(self, *keys):
+        return 0
+
+
+def get_store():
+    """Return the shared result store configured by RESULT_CACHE_URL."""
+    url = getattr(settings, "RESULT_CACHE_URL", "")
+    max_bytes = getattr(settings, "RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    key = url or os.path.join(database_dir(), "cache", "results.sqlite3")
+    if key not in _stores:
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            import redis
+
+            _stores[key] = redis.Redis.from_url(url)
+        else:
+            try:
+                _stores[key] = LocalStore(key, max_bytes)
+            except (OSError, sqlite3.Error) as e:
+                sys.stderr.write(f"Result cache disabled: cannot open {key}: {e}\n")
+                _stores[key] = NullStore()
+    return _stores[key]
+
+
+def cache_key(namespace, *parts):
+    """Build a fixed-length cache key from arbitrary parts."""
+    digest = hashlib.sha1(json.dumps(parts, separators=(",", ":")).encode("utf-8")).hexdigest()
+    return f"mbab:{namespace}:{digest}"
+
+
+def pack_entry(meta, keys=None):
+    """Serialize JSON-compatible metadata plus an optional int64 key array."""
+    body = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    keys = np.asarray(keys if keys is not None else [], dtype="<i8")
+    return _HEADER.pack(_MAGIC, len(body)) + body + keys.tobytes()
+
+
+def unpack_entry(data):
+    """Inverse of pack_entry; returns (meta, keys) or None for foreign data."""
+    if data is None or len(data) < _HEADER.size:
+        return None
+    magic, size = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        return None
+    body_end = _HEADER.size + size
+    meta = json.loads(bytes(data[_HEADER.size:body_end]))
+    return meta, np.frombuffer(data, dtype="<i8", offset=body_end)
+
+
+def get_or_compute(key, compute, ttl=DEFAULT_TTL, store=None):
+    """
+    Return the cached bytes for `key`, computing and storing them on a miss.
+
+    Only one worker computes a missing key at a time: the others wait for
+    its result (up to LOCK_TTL) instead of all recomputing the same search.
+    `compute` returns bytes to cache, or None for results that must not be
+    cached; either way the computing caller gets its own result back.
+
+    Returns:
+        A tuple (value, hit).
+    """
+    store = store or get_store()
+    value = store.get(key)
+    if value is not None:
+        return value, True
+    lock = f"{key}:lock"
+    locked = store.set(lock, b"1", px=int(LOCK_TTL * 1000), nx=True)
+    if not locked:
+        deadline = time.monotonic() + LOCK_TTL
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = store.get(key)
+            if value is not None:
+                return value, True
+            if store.get(lock) is None:
+                break
+    try:
+        value = compute()
+        if value is not None:
+            store.set(key, value, ex=ttl)
+    finally:
+        # A caller that gave up waiting must not release another worker's lock
+        if locked:
+            store.delete(lock)
+    return value, False
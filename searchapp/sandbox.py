@@ -0,0 +1,154 @@
+import sqlite3
+import time
+
+from .corpus import database_path
+
+# Budgets for user-written SQL: rows returned, wall-clock seconds, and SQLite
+# VM instructions (checked every PROGRESS_STEP instructions)
+MAX_ROWS = 1000
+TIMEOUT = 0.5
+INSTRUCTION_BUDGET = 20_000_000
+PROGRESS_STEP = 10_000
+
+# Longest string or blob a statement may build, in bytes (verses are far shorter)
+MAX_VALUE_LENGTH = 100_000
+
+# The only table user SQL may read
+ALLOWED_TABLE = "bible"
+RESULT_COLUMNS = ("Book", "Chapter", "Versecount", "verse")
+
+# SQL functions that reach outside the database
+FORBIDDEN_FUNCTIONS = {"load_extension", "readfile", "writefile", "edit", "fts3_tokenizer"}
+
+_SCHEMA = "CREATE TABLE bible (Book INTEGER, Chapter INTEGER, Versecount INTEGER, verse TEXT)"
+
+
+class SandboxError(Exception):
+    """Raised when user SQL is rejected or exceeds its budget."""
+
+
+def is_raw_sql(expression):
+    """Return True if a search expression is a user-written SELECT statement."""
+    return expression.strip().upper().startswith("SELECT ")
+
+
+def _authorizer(action, arg1, arg2, db_name, trigger):
+    if action == sqlite3.SQLITE_SELECT:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_READ:
+        return sqlite3.SQLITE_OK if arg1 == ALLOWED_TABLE else sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION:
+        return sqlite3.SQLITE_DENY if arg2.lower() in FORBIDDEN_FUNCTIONS else sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def _connect(path, regexp=None, case_sensitive=False):
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    # zeroblob(), printf() and friends could otherwise fill memory within the time budget
+    db.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, MAX_VALUE_LENGTH)
+    db.execute("PRAGMA query_only = ON")
+    if case_sensitive:
+        db.execute("PRAGMA case_sensitive_like = true")
+    db.create_function("REGEXP", 2, regexp or (lambda pattern, item: False))
+    # Installed last: from here on only SELECTs over `bible` compile
+    db.set_authorizer(_authorizer)
+    return db
+
+
+def is_interrupted(error):
+    """True if a sqlite3 error was raised by a deadline installed with install_deadline."""
+    return isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error)
+
+
+def install_deadline(db, timeout, instruction_budget=None):
+    """
+    Interrupt statements on `db` that run past `timeout` seconds from now, or
+    past `instruction_budget` SQLite VM instructions.
+
+    The progress handler runs every PROGRESS_STEP instructions; an interrupted
+    statement raises sqlite3.OperationalError("interrupted").
+    """
+    deadline = time.monotonic() + timeout
+    steps = [0]
+
+    def progress():
+        steps[0] += PROGRESS_STEP
+        # A non-zero return aborts the statement with "interrupted"
+        over_budget = instruction_budget is not None and steps[0] > instruction_budget
+        return over_budget or time.monotonic() > deadline
+
+    db.set_progress_handler(progress, PROGRESS_STEP)
+
+
+def check_sql(sql):
+    """
+    Check that `sql` is a single SELECT over `bible`, without running it.
+
+    The statement is prepared against an empty in-memory copy of the schema
+    under the same authorizer used at query time.
+
+    Returns:
+        None if the statement is allowed, otherwise the reason it is not.
+    """
+    if not sql or not is_raw_sql(sql):
+        return "Only SELECT statements are allowed."
+    db = sqlite3.connect(":memory:")
+    try:
+        db.execute(_SCHEMA)
+        db.create_function("REGEXP", 2, lambda pattern, item: False)
+        db.set_authorizer(_authorizer)
+        db.execute(f"EXPLAIN {sql}")
+    except sqlite3.ProgrammingError:
+        return "Only a single statement is allowed."
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        db.close()
+    return None
+
+
+def run_readonly_query(
+    version_name,
+    sql,
+    regexp=None,
+    case_sensitive=False,
+    max_rows=MAX_ROWS,
+    timeout=TIMEOUT,
+    instruction_budget=INSTRUCTION_BUDGET,
+):
+    """
+    Run user-written SQL against a read-only connection with hard budgets.
+
+    Args:
+        version_name: short name of the Bible version (e.g., "ESV").
+        sql: a single SELECT statement over the `bible` table.
+        regexp: two-argument callable backing the REGEXP operator.
+        case_sensitive: whether LIKE is case-sensitive.
+        max_rows: rows returned before the result is cut off.
+        timeout: wall-clock seconds before the query is interrupted.
+        instruction_budget: SQLite VM instructions before the query is interrupted.
+
+    Returns:
+        A tuple (rows, truncated) where rows are dicts keyed by column name.
+
+    Raises:
+        SandboxError: if the statement is not allowed or runs out of budget.
+    """
+    reason = check_sql(sql)
+    if reason:
+        raise SandboxError(reason)
+
+    db = _connect(database_path(version_name), regexp, case_sensitive)
+    try:
+        install_deadline(db, timeout, instruction_budget)
+        cur = db.execute(sql)
+        columns = [col[0] for col in cur.description]
+        fetched = cur.fetchmany(max_rows + 1)
+    except sqlite3.DatabaseError as e:
+        if is_interrupted(e):
+            raise SandboxError("Query exceeded its time budget.") from e
+        raise SandboxError(str(e)) from e
+    finally:
+        db.close()
+    rows = [dict(zip(columns, row)) for row in fetched[:max_rows]]
+    return rows, len(fetched) > max_rows
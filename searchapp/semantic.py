@@ -0,0 +1,290 @@
+import json
+import math
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+
+from .corpus import PathCache, fetch_verses, index_dir, load_verses, pack_refs, publish_index, tokenize
+from .textindex import source_hash
+
+# Default LSA dimensionality and randomized-SVD tuning
+DEFAULT_DIMS = 128
+OVERSAMPLE = 10
+POWER_ITERATIONS = 2
+
+VERSES_FILE = "semantic_verses.npy"
+TERMS_FILE = "semantic_terms.npy"
+REFS_FILE = "semantic_refs.npy"
+META_FILE = "semantic_meta.json"
+NEIGHBORS_FILE = "related_neighbors.npy"
+
+# Builds live in "semantic-<content hash>" directories under the version's index directory
+SEMANTIC_PREFIX = "semantic-"
+
+# Related-verse table: neighbors kept per verse and rows scored per matmul block
+DEFAULT_NEIGHBORS = 10
+NEIGHBOR_BLOCK = 512
+
+# Keyed by the version's index directory
+_loaded = PathCache()
+
+
+def _sparse_dot(rows, cols, vals, dense, n_out):
+    """Multiply a COO sparse matrix (rows, cols, vals) by a dense matrix."""
+    out = np.empty((n_out, dense.shape[1]), dtype=np.float64)
+    for j in range(dense.shape[1]):
+        out[:, j] = np.bincount(rows, weights=vals * dense[cols, j], minlength=n_out)
+    return out
+
+
+def tfidf_matrix(texts):
+    """
+    Build a row-normalized TF-IDF matrix for a list of verse texts.
+
+    Returns:
+        A tuple (rows, cols, vals, vocab, idf) where (rows, cols, vals) is the
+        sparse verse x term matrix in COO form, vocab is the sorted term list and
+        idf the matching float64 array.
+    """
+    counts = [Counter(tokenize(text)) for text in texts]
+    doc_freq = Counter()
+    for verse_counts in counts:
+        doc_freq.update(verse_counts.keys())
+    vocab = sorted(doc_freq)
+    term_ids = {term: i for i, term in enumerate(vocab)}
+    n_verses = len(texts)
+    idf = np.array(
+        [math.log((1 + n_verses) / (1 + doc_freq[term])) + 1 for term in vocab]
+    )
+
+    rows, cols, vals = [], [], []
+    for row, verse_counts in enumerate(counts):
+        for term, count in verse_counts.items():
+            rows.append(row)
+            cols.append(term_ids[term])
+            vals.append(1 + math.log(count))
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    vals = np.array(vals) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=n_verses))
+    vals /= np.where(norms > 0, norms, 1)[rows]
+    return rows, cols, vals, vocab, idf
+
+
+def truncated_svd(rows, cols, vals, shape, dims, seed=0):
+    """
+    Randomized truncated SVD (Halko et al.) of a sparse COO matrix.
+
+    Returns:
+        A tuple (U, S, Vt) holding the top `dims` singular triplets.
+    """
+    n_rows, n_cols = shape
+    width = min(dims + OVERSAMPLE, n_rows, n_cols)
+    rng = np.random.default_rng(seed)
+
+    sample = _sparse_dot(rows, cols, vals, rng.standard_normal((n_cols, width)), n_rows)
+    for _ in range(POWER_ITERATIONS):
+        basis, _ = np.linalg.qr(sample)
+        back, _ = np.linalg.qr(_sparse_dot(cols, rows, vals, basis, n_cols))
+        sample = _sparse_dot(rows, cols, vals, back, n_rows)
+    basis, _ = np.linalg.qr(sample)
+
+    small = _sparse_dot(cols, rows, vals, basis, n_cols).T
+    u_small, singular, vt = np.linalg.svd(small, full_matrices=False)
+    dims = min(dims, width)
+    return basis @ u_small[:, :dims], singular[:dims], vt[:dims]
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def semantic_index_path(version_name, digest):
+    """Directory of the LSA index built from a database content hash."""
+    return os.path.join(index_dir(version_name), f"{SEMANTIC_PREFIX}{digest[:16]}")
+
+
+def build_semantic_index(version_name, dims=DEFAULT_DIMS, neighbors=DEFAULT_NEIGHBORS, block=NEIGHBOR_BLOCK):
+    """
+    Build the offline LSA index (TF-IDF + truncated SVD) for one version,
+    with the table of its `neighbors` most similar verses per verse (none
+    when 0).
+
+    Writes verse vectors, term vectors and verse references as .npy files so
+    they can be memory-mapped by every worker. The index is written to a
+    scratch directory and renamed into place (see publish_index), so
+    processes mapping an older build are never handed truncated files.
+
+    Returns:
+        The directory the index was written to.
+    """
+    directory = semantic_index_path(version_name, source_hash(version_name))
+    refs, texts = load_verses(version_name)
+    rows, cols, vals, vocab, idf = tfidf_matrix(texts)
+    u, singular, vt = truncated_svd(rows, cols, vals, (len(texts), len(vocab)), dims)
+    verse_vectors = _normalize_rows(u * singular).astype(np.float32)
+
+    scratch = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    np.save(os.path.join(scratch, VERSES_FILE), verse_vectors)
+    np.save(os.path.join(scratch, TERMS_FILE), vt.T.astype(np.float32))
+    np.save(os.path.join(scratch, REFS_FILE), np.array(refs, dtype=np.int16))
+    if neighbors > 0:
+        np.save(os.path.join(scratch, NEIGHBORS_FILE), build_neighbor_table(verse_vectors, neighbors, block))
+    with open(os.path.join(scratch, META_FILE), "w") as f:
+        json.dump(
+            {
+                "version": version_name,
+                "dims": int(singular.shape[0]),
+                "vocab": vocab,
+                "idf": idf.tolist(),
+            },
+            f,
+        )
+    publish_index(scratch, directory, SEMANTIC_PREFIX)
+    return directory
+
+
+def build_neighbor_table(vectors, k=DEFAULT_NEIGHBORS, block=NEIGHBOR_BLOCK):
+    """
+    Find the k most similar verses for every row of the LSA verse vectors.
+
+    Similarities are computed block by block (`block` verses against the whole
+    corpus per matrix multiplication) so peak memory stays at block x verses.
+
+    Returns:
+        The int32 neighbor table of shape (verses, k).
+    """
+    n_verses = vectors.shape[0]
+    k = min(k, n_verses - 1)
+    neighbors = np.empty((n_verses, max(k, 0)), dtype=np.int32)
+    if k > 0:
+        corpus = np.ascontiguousarray(vectors)
+        for start in range(0, n_verses, block):
+            stop = min(start + block, n_verses)
+            sims = corpus[start:stop] @ corpus.T
+            sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(sims, best, axis=1), axis=1, kind="stable")
+            neighbors[start:stop] = np.take_along_axis(best, order, axis=1)
+    return neighbors
+
+
+class SemanticIndex:
+    """Memory-mapped LSA vectors for one version."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.version = meta["version"]
+        self.term_ids = {term: i for i, term in enumerate(meta["vocab"])}
+        self.idf = np.array(meta["idf"], dtype=np.float32)
+        self.verse_vectors = np.load(os.path.join(directory, VERSES_FILE), mmap_mode="r")
+        self.term_vectors = np.load(os.path.join(directory, TERMS_FILE), mmap_mode="r")
+        self.refs = np.load(os.path.join(directory, REFS_FILE), mmap_mode="r")
+        # Refs are in canonical order, so packed keys are sorted for searchsorted
+        self.ref_keys = pack_refs(self.refs)
+        neighbors_path = os.path.join(directory, NEIGHBORS_FILE)
+        self.neighbors = (
+            np.load(neighbors_path, mmap_mode="r") if os.path.exists(neighbors_path) else None
+        )
+
+    def row_for(self, book_id, chapter, verse):
+        """Return the row index of a verse reference, or None if it is not indexed."""
+        key = pack_refs(np.array([[book_id, chapter, verse]]))[0]
+        row = int(np.searchsorted(self.ref_keys, key))
+        if row < len(self.ref_keys) and self.ref_keys[row] == key:
+            return row
+        return None
+
+    def query_vector(self, query):
+        """Fold a free-text query into the LSA space; None if no term is known."""
+        counts = Counter(t for t in tokenize(query) if t in self.term_ids)
+        if not counts:
+            return None
+        ids = np.array([self.term_ids[t] for t in counts])
+        weights = np.array([1 + math.log(c) for c in counts.values()], dtype=np.float32)
+        vector = (weights * self.idf[ids]) @ self.term_vectors[ids]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def top_k(self, vector, limit, book_ids=None):
+        """Return (row indices, scores) of the `limit` best-scoring verses."""
+        scores = self.verse_vectors @ vector
+        if book_ids is not None:
+            allowed = np.isin(self.refs[:, 0], np.fromiter(book_ids, dtype=np.int16))
+            scores = np.where(allowed, scores, -np.inf)
+        limit = min(limit, scores.shape[0])
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        best = best[np.isfinite(scores[best])]
+        return best, scores[best]
+
+
+def load_semantic_index(version_name):
+    """
+    Return the cached SemanticIndex for a version, or None if none was built
+    from the database's current contents. A rebuilt index is picked up on the
+    next call.
+    """
+    try:
+        directory = semantic_index_path(version_name, source_hash(version_name))
+    except FileNotFoundError:
+        return None
+    return _loaded.load(directory, SemanticIndex, META_FILE, key=index_dir(version_name))
+
+
+def semantic_search(query, version_name, limit=100, book_ids=None):
+    """
+    Rank verses by LSA cosine similarity to a free-text query.
+
+    Args:
+        query: natural-language query.
+        version_name: short name of the Bible version (e.g., "ESV").
+        limit: maximum number of verses to return.
+        book_ids: optional iterable of book ids to restrict results to.
+
+    Returns:
+        A list of result rows (dicts) ordered by descending similarity, each
+        with an extra "score" key, or None if the index has not been built.
+    """
+    index = load_semantic_index(version_name)
+    if index is None:
+        return None
+    vector = index.query_vector(query)
+    if vector is None:
+        return []
+    best, scores = index.top_k(vector, limit, book_ids)
+    refs = [tuple(int(part) for part in index.refs[i]) for i in best]
+    score_by_ref = dict(zip(refs, scores))
+    rows = fetch_verses(version_name, refs)
+    for row in rows:
+        ref = (row["Book"], row["Chapter"], row["Versecount"])
+        row["score"] = round(float(score_by_ref[ref]), 4)
+    return rows
+
+
+def related_verses(version_name, book_id, chapter, verse, limit=DEFAULT_NEIGHBORS):
+    """
+    Look up the precomputed nearest neighbors of a verse.
+
+    Returns:
+        A list of result rows (dicts) ordered by similarity, an empty list if the
+        reference is unknown, or None if the neighbor table has not been built.
+    """
+    index = load_semantic_index(version_name)
+    if index is None or index.neighbors is None:
+        return None
+    row = index.row_for(book_id, chapter, verse)
+    if row is None:
+        return []
+    refs = [tuple(int(part) for part in index.refs[i]) for i in index.neighbors[row][:limit]]
+    return fetch_verses(version_name, refs)
@@ -0,0 +1,84 @@
+import re
+
+# Shortest stem a suffix may be stripped down to
+MIN_STEM = 3
+
+# Inflectional suffixes, longest first. Archaic verb endings (-eth, -est,
+# -edst) sit alongside the modern ones so KJV/YLT/GEN forms conflate with
+# their modern spellings: forgiveth, forgivest, forgiven, forgiving -> forgiv.
+SUFFIXES = ("edst", "ings", "eth", "est", "ing", "ed", "en", "es", "s", "e")
+
+# Archaic and superlative endings. They only ever end a word, and many nouns
+# and adjectives merely end like them (forest, priest, Nazareth), so they are
+# stripped from the whole word only, and only when the stem is attested
+FINAL_SUFFIXES = ("edst", "eth", "est")
+
+# Endings under which a stripped stem must occur in the vocabulary for a final
+# suffix to come off: lov -> love, believ -> believed, sinn -> sinned
+ATTESTING_ENDINGS = ("", "e", "s", "es", "ed", "en", "ing")
+
+# Words ending in -est whose remainder happens to be a word of its own
+NOT_INFLECTED = frozenset(
+    {"forest", "priest", "honest", "earnest", "interest", "manifest", "harvest", "digest", "yeast"}
+)
+
+# Irregular archaic forms that no suffix rule reaches
+IRREGULAR = {
+    "hath": "have",
+    "hast": "have",
+    "doth": "do",
+    "dost": "do",
+    "saith": "say",
+    "spake": "speak",
+    "wilt": "will",
+    "shalt": "shall",
+}
+
+_DOUBLE_CONSONANT = re.compile(r"([bdfgmnprt])\1$")
+
+
+def _attested(word, stem, vocabulary):
+    if word in NOT_INFLECTED:
+        return False
+    if vocabulary is None:
+        return True
+    stems = (stem, stem[:-1]) if _DOUBLE_CONSONANT.search(stem) else (stem,)
+    return any(base + ending in vocabulary for base in stems for ending in ATTESTING_ENDINGS)
+
+
+def _strip_once(word, vocabulary=None, whole_word=True):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            # A plain -s is kept after s/u/i/a: bless, Jesus, this, alas
+            if suffix == "s" and word[-2] in "suia":
+                return word
+            stem = word[: -len(suffix)]
+            if suffix in FINAL_SUFFIXES and not (whole_word and _attested(word, stem, vocabulary)):
+                return word
+            # running -> runn -> run, sinneth -> sinn -> sin
+            if suffix != "e" and _DOUBLE_CONSONANT.search(stem):
+                stem = stem[:-1]
+            return stem
+    return word
+
+
+def stem(word, vocabulary=None):
+    """
+    Reduce an English (including Early Modern English) word to its stem.
+
+    A deliberately light suffix stripper: only inflections are removed, at most
+    twice (heavens -> heaven -> heav), never below MIN_STEM characters.
+
+    Args:
+        vocabulary: the lowercase words of the text being indexed. When given,
+            -eth/-est/-edst are only stripped if the stem occurs there
+            (see ATTESTING_ENDINGS), so forest, priest and honest keep theirs.
+    """
+    word = word.lower()
+    word = IRREGULAR.get(word, word)
+    for whole_word in (True, False):
+        stripped = _strip_once(word, vocabulary, whole_word)
+        if stripped == word:
+            break
+        word = stripped
+    return word
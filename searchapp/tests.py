@@ -12,6 +12,23 @@ class SearchLogicTests(TestCase):
         tokens = tokenize_expr(expr)
         self.assertEqual(tokens, ["(", "love", "+", "hope", ")", ",", "faith"])
 
+    def test_tokenize_phrase_and_near(self):
+        expr = '"in the beginning" + God near/3 earth'
+        tokens = tokenize_expr(expr)
+        self.assertEqual(tokens, ['"in the beginning"', "+", "God", "NEAR/3", "earth"])
+        # Boolean keywords inside a phrase are kept as words
+        self.assertEqual(tokenize_expr('"faith and works"'), ['"faith and works"'])
+
+    def test_tokenize_wildcards(self):
+        self.assertEqual(tokenize_expr("lov* + l*ght"), ["lov*", "+", "l*ght"])
+        # A bare * is dropped instead of matching everything
+        self.assertEqual(tokenize_expr("* , grace"), [",", "grace"])
+
+    def test_postfix_near_binds_tightest(self):
+        # A + B NEAR/2 C -> A B C NEAR/2 +
+        tokens = ["A", "+", "B", "NEAR/2", "C"]
+        self.assertEqual(to_postfix(tokens), ["A", "B", "C", "NEAR/2", "+"])
+
     def test_postfix_precedence(self):
         # A + B , C -> A B + C ,
         tokens = ["A", "+", "B", ",", "C"]
@@ -54,28 +71,95 @@ class SearchLogicTests(TestCase):
         self.assertTrue(regexp_check(r"\bgrace\b", "State of grace"))
 
     def test_parse_reference(self):
-        from searchapp.bibledata import parse_verse_reference
-        
-        # Test Book Chapter:Verse
-        ref = parse_verse_reference("John 3:16")
-        self.assertIsNotNone(ref)
-        self.assertEqual(ref["book_id"], 42) # John is 43rd book, index 42
-        self.assertEqual(ref["chapter"], 3)
-        self.assertEqual(ref["start_verse"], 16)
-        self.assertEqual(ref["end_verse"], 16)
-
-        # Test Book Chapter:Verse-Verse
-        ref = parse_verse_reference("John 3:16-21")
-        self.assertIsNotNone(ref)
-        self.assertEqual(ref["start_verse"], 16)
-        self.assertEqual(ref["end_verse"], 21)
-
-        # Test Book Chapter
-        ref = parse_verse_reference("John 3")
-        self.assertIsNotNone(ref)
-        self.assertEqual(ref["chapter"], 3)
+        from searchapp.bibledata import parse_passage_reference
+
+        # Book Chapter:Verse
+        (ref,) = parse_passage_reference("John 3:16")
+        self.assertEqual(ref["book_id"], 42)  # John is 43rd book, index 42
+        self.assertEqual((ref["start_chapter"], ref["start_verse"]), (3, 16))
+        self.assertEqual((ref["end_chapter"], ref["end_verse"]), (3, 16))
+
+        # Book Chapter:Verse-Verse
+        (ref,) = parse_passage_reference("John 3:16-21")
+        self.assertEqual((ref["start_verse"], ref["end_verse"]), (16, 21))
+
+        # Book Chapter
+        (ref,) = parse_passage_reference("John 3")
+        self.assertEqual((ref["start_chapter"], ref["end_chapter"]), (3, 3))
         self.assertIsNone(ref["start_verse"])
-        
-        # Test Invalid
-        ref = parse_verse_reference("NotABook 1:1")
-        self.assertIsNone(ref)
+
+        # Invalid
+        self.assertIsNone(parse_passage_reference("NotABook 1:1"))
+
+    def test_standard_abbreviations(self):
+        from searchapp.bibledata import get_book_id, parse_passage_reference
+
+        for query, book_id in [("Phil 4:13", 49), ("Jn 3:16", 42), ("Mt 5", 39), ("Jud 1", 64), ("1 Kgs 8", 10)]:
+            self.assertEqual(parse_passage_reference(query)[0]["book_id"], book_id, query)
+        self.assertEqual(get_book_id("Philem"), 56)
+        self.assertEqual(get_book_id("Judg."), 6)
+        self.assertEqual(get_book_id("1 Jn"), 61)
+        self.assertEqual(get_book_id("Song of Songs"), 21)
+
+    def test_parse_passage_reference(self):
+        from searchapp.bibledata import parse_passage_reference
+
+        segments = parse_passage_reference("John 3:16-4:2; Rom 8:28; Eph 2:8-9; Ps 23; 24:1")
+        self.assertEqual(
+            [tuple(seg.values()) for seg in segments],
+            [
+                (42, 3, 16, 4, 2),
+                (44, 8, 28, 8, 28),
+                (48, 2, 8, 2, 9),
+                (18, 23, None, 23, None),
+                (18, 24, 1, 24, 1),
+            ],
+        )
+        # Chapter range, then a segment continuing the same book
+        segments = parse_passage_reference("1 Cor 13-14; 15:1-4")
+        self.assertEqual(segments[0]["book_id"], 45)
+        self.assertEqual((segments[0]["start_chapter"], segments[0]["end_chapter"]), (13, 14))
+        self.assertEqual(segments[1]["book_id"], 45)
+
+        # Backwards ranges, ambiguous abbreviations and keywords are not references
+        self.assertIsNone(parse_passage_reference("John 4:2-3:16"))
+        self.assertIsNone(parse_passage_reference("Jo 3"))
+        self.assertIsNone(parse_passage_reference("faith + works"))
+        self.assertIsNone(parse_passage_reference("John 3:16; grace"))
+
+    def test_numbers_outside_a_verse_key_are_not_references(self):
+        from searchapp.bibledata import parse_passage_reference
+        from searchapp.corpus import pack_refs, passage_key_ranges
+
+        for query in ["Genesis 1:65537", "Job 65559", "Genesis 1:1-65536", "Ps 65536:1"]:
+            self.assertIsNone(parse_passage_reference(query), query)
+        # The largest numbers still end their range at the next chapter or book
+        ranges = passage_key_ranges(parse_passage_reference("Exodus 65535; Genesis 3:65535"))
+        self.assertEqual(ranges, [(int(pack_refs([0, 3, 65535])[0]), 4 << 16), (int(pack_refs([1, 65535, 0])[0]), 2 << 32)])
+
+
+class StemmingTests(TestCase):
+    def test_archaic_and_modern_forms_share_a_stem(self):
+        from searchapp.stemming import stem
+
+        forms = ["forgive", "forgiven", "forgiveth", "forgivest", "forgiving"]
+        self.assertEqual({stem(w) for w in forms}, {"forgiv"})
+        self.assertEqual(stem("sinneth"), stem("sins"))
+        self.assertEqual(stem("hath"), stem("have"))
+
+    def test_short_and_protected_words_are_kept(self):
+        from searchapp.stemming import stem
+
+        for word in ["is", "was", "bless", "Jesus", "this"]:
+            self.assertEqual(stem(word), word.lower())
+
+    def test_words_merely_ending_in_est_or_eth_are_kept(self):
+        from searchapp.stemming import stem
+
+        for word in ["forest", "priest", "honest", "earnest", "interest", "manifest", "harvested"]:
+            self.assertNotIn(stem(word), {"for", "pri", "hon", "earn", "inter", "manif", "harv"}, word)
+        # With a vocabulary, -est/-eth only come off when the stem occurs there
+        vocabulary = {"nazareth", "goodliest", "loveth", "love"}
+        self.assertEqual(stem("Nazareth", vocabulary), "nazareth")
+        self.assertEqual(stem("goodliest", vocabulary), "goodliest")
+        self.assertEqual(stem("loveth", vocabulary), "lov")
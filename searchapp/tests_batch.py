@@ -0,0 +1,69 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from searchapp.bibledata import books
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.textindex import TextIndex
+from searchapp.views import MAX_BATCH, sort_rows, sql_row_gen
+
+
+class BatchSearchTests(BibleDatabaseMixin, TestCase):
+    def post(self, **body):
+        return self.client.post("/ajax/batch/", json.dumps({"version": "KJV", **body}), content_type="application/json")
+
+    def refs(self, verses):
+        return [(verse["Book"], verse["Chapter"], verse["Versecount"]) for verse in verses]
+
+    def test_results_match_single_searches(self):
+        expressions = ["love + God", "darkness, light", '"God is love"', "lov*", "faith NEAR/3 works"]
+        results = self.post(expressions=expressions, text=True).json()["results"]
+        self.assertEqual([result["expression"] for result in results], expressions)
+        for expression, result in zip(expressions, results):
+            expected = sort_rows(sql_row_gen(f"key:{expression}", "KJV"))
+            self.assertEqual(
+                self.refs(result["verses"]),
+                [(books[row["Book"]]["text"], row["Chapter"], row["Versecount"]) for row in expected],
+            )
+            self.assertEqual(result["total"], len(expected))
+            self.assertEqual([verse["verse"] for verse in result["verses"]], [row["verse"] for row in expected])
+
+    def test_shared_terms_are_looked_up_once(self):
+        with patch.object(TextIndex, "term_spans", autospec=True, side_effect=TextIndex.term_spans) as lookup:
+            self.post(expressions=["God + love", "God, light", "love + world", "God"])
+        self.assertEqual(sorted(call.args[1] for call in lookup.call_args_list), ["God", "light", "love", "world"])
+
+    def test_references_books_and_errors(self):
+        results = self.post(
+            expressions=["John 3:16-4:1", "darkness", "SELECT * FROM bible", "love +"],
+            books="1",
+        ).json()["results"]
+        # Genesis only: the John passage is filtered out
+        self.assertEqual(results[0]["total"], 0)
+        self.assertEqual(self.refs(results[1]["verses"]), [("Genesis", 1, 2), ("Genesis", 1, 4)])
+        self.assertNotIn("verse", results[1]["verses"][0])
+        self.assertIn("error", results[2])
+        self.assertIn("error", results[3])
+
+        results = self.post(expressions=["John 3:16-4:1"]).json()["results"]
+        self.assertEqual(self.refs(results[0]["verses"]), [("John", 3, 16), ("John", 3, 17), ("John", 4, 1)])
+
+    def test_listed_verses_are_capped_per_response(self):
+        self.assertFalse(self.post(expressions=["God"]).json()["truncated"])
+        with patch("searchapp.views.MAX_BATCH_VERSES", 5):
+            data = self.post(expressions=["darkness", "God", "light"], text=True).json()
+        self.assertTrue(data["truncated"])
+        darkness, god, light = data["results"]
+        self.assertEqual((darkness["total"], len(darkness["verses"])), (3, 3))
+        self.assertNotIn("truncated", darkness)
+        self.assertEqual((god["total"], len(god["verses"]), god["truncated"]), (12, 2, True))
+        self.assertEqual((len(light["verses"]), light["truncated"]), (0, True))
+        self.assertGreater(light["total"], 0)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/ajax/batch/").status_code, 405)
+        self.assertEqual(self.client.post("/ajax/batch/", "nope", content_type="application/json").status_code, 400)
+        self.assertEqual(self.post(expressions="love").status_code, 400)
+        self.assertEqual(self.post(expressions=["love"], version="NOPE").status_code, 400)
+        self.assertEqual(self.post(expressions=["love"] * (MAX_BATCH + 1)).status_code, 400)
@@ -0,0 +1,73 @@
+import sqlite3
+
+import numpy as np
+from django.test import TestCase
+
+from searchapp.concordance import build_concordance, load_concordance
+from searchapp.corpus import database_path
+from searchapp.testutils import BibleDatabaseMixin
+
+
+class ConcordanceTests(BibleDatabaseMixin, TestCase):
+    bible_versions = ["KJV", "ESV"]
+
+    def setUp(self):
+        super().setUp()
+        for name in self.bible_versions:
+            build_concordance(name)
+
+    def test_matrix_matches_word_counts(self):
+        index = load_concordance("KJV")
+        self.assertIsInstance(index.counts, np.memmap)
+        stats = index.distribution("love")
+        self.assertEqual(stats["books"], {"Romans": 2, "1 John": 4})
+        self.assertEqual(stats["total"], 6)
+        self.assertEqual(
+            stats["chapters"],
+            [
+                {"book": "Romans", "chapter": 5, "count": 1},
+                {"book": "Romans", "chapter": 8, "count": 1},
+                {"book": "1 John", "chapter": 4, "count": 4},
+            ],
+        )
+        self.assertEqual(index.distribution("zzzz")["total"], 0)
+
+    def test_rebuild_is_picked_up_by_loaded_processes(self):
+        old = load_concordance("KJV")
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("INSERT INTO bible VALUES (42, 3, 18, 'A new commandment: love one another.')")
+        db.commit()
+        db.close()
+        self.assertIsNone(load_concordance("KJV"))
+        build_concordance("KJV")
+        new = load_concordance("KJV")
+        self.assertIsNot(new, old)
+        self.assertEqual(new.distribution("love")["books"], {"John": 1, "Romans": 2, "1 John": 4})
+        # The old build is unlinked, not truncated, so its mapping still reads it
+        self.assertEqual(old.distribution("love")["total"], 6)
+
+    def test_cooccurring_terms(self):
+        terms = load_concordance("KJV").cooccurring("darkness", limit=5)
+        self.assertTrue(terms)
+        self.assertNotIn("darkness", [item["term"] for item in terms])
+        scores = [item["score"] for item in terms]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertIn("light", [item["term"] for item in terms])
+
+    def test_concordance_view_compares_versions(self):
+        response = self.client.get("/concordance", {"term": "Love", "versions": "KJV,ESV"})
+        data = response.json()
+        self.assertEqual(data["term"], "love")
+        self.assertEqual(data["versions"]["KJV"]["total"], data["versions"]["ESV"]["total"])
+        self.assertEqual(
+            data["comparison"][0], {"book": "Romans", "counts": {"KJV": 2, "ESV": 2}}
+        )
+
+    def test_concordance_view_errors(self):
+        self.assertEqual(self.client.get("/concordance", {"term": "God is"}).status_code, 400)
+        response = self.client.get("/concordance", {"term": "God", "versions": "NASB"})
+        self.assertEqual(response.status_code, 503)
+        response = self.client.get("/concordance", {"term": "God", "version": "KJV", "limit": "x"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/concordance", {"term": "God", "version": "KJV", "limit": "-3"})
+        self.assertEqual(len(response.json()["versions"]["KJV"]["cooccurring"]), 1)
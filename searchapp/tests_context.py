@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from searchapp.textindex import get_text_index
+from searchapp.testutils import BibleDatabaseMixin
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class ContextWindowTests(BibleDatabaseMixin, TestCase):
+    def test_windows_are_clipped_to_chapters_and_merged(self):
+        index = get_text_index("KJV")
+        # Rows 0-3 are Genesis 1:1-4, 4-6 Psalms 23, 9-10 John 3, 11 John 4
+        self.assertEqual(index.context_windows([1, 3], 1).tolist(), [[0, 4]])
+        self.assertEqual(index.context_windows([4], 5).tolist(), [[4, 7]])
+        self.assertEqual(index.context_windows([11, 9], 1).tolist(), [[9, 11], [11, 12]])
+        self.assertEqual(index.context_windows([], 2).tolist(), [])
+
+    def test_search_ajax_returns_merged_context(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "darkness", "version": "KJV", "books": ALL_BOOKS, "context": "1"},
+        )
+        data = response.json()
+        self.assertEqual([row["context"] for row in data["results"]], [0, 0, 1])
+        genesis, john = data["context"]
+        self.assertEqual((genesis["Book"], genesis["Chapter"]), ("Genesis", 1))
+        self.assertEqual([verse["Versecount"] for verse in genesis["verses"]], [1, 2, 3, 4])
+        self.assertEqual([verse["hit"] for verse in genesis["verses"]], [False, True, False, True])
+        self.assertEqual([verse["Versecount"] for verse in john["verses"]], [1, 5])
+
+    def test_raw_rows_missing_from_index_get_no_context(self):
+        sql = (
+            "SELECT Book, 99 AS Chapter, Versecount, verse FROM bible WHERE Book = 0 "
+            "UNION ALL SELECT Book, Chapter, Versecount, verse FROM bible WHERE Book = 42 AND Chapter = 3"
+        )
+        data = self.client.get(
+            "/ajax/search/", {"search": sql, "version": "KJV", "books": ALL_BOOKS, "context": "1"}
+        ).json()
+        results = data["results"]
+        self.assertEqual([row["Chapter"] for row in results], [99, 99, 99, 99, 3, 3])
+        self.assertEqual([row.get("context") for row in results], [None, None, None, None, 0, 0])
+        self.assertEqual([verse["Versecount"] for verse in data["context"][0]["verses"]], [16, 17])
+
+    def test_context_only_covers_selected_books(self):
+        data = self.client.get(
+            "/ajax/search/",
+            {"search": "darkness", "version": "KJV", "books": "1", "context": "2"},
+        ).json()
+        self.assertEqual(len(data["context"]), 1)
+        self.assertEqual(data["context"][0]["Book"], "Genesis")
+
+    def test_default_and_invalid_context(self):
+        params = {"search": "darkness", "version": "KJV", "books": ALL_BOOKS}
+        data = self.client.get("/ajax/search/", params).json()
+        self.assertEqual(data["context"], [])
+        self.assertNotIn("context", data["results"][0])
+        for value in ("-1", "x", "11"):
+            response = self.client.get("/ajax/search/", {**params, "context": value})
+            self.assertEqual(response.status_code, 400)
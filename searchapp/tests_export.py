@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import os
+import unittest
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from searchapp.export import parquet_available
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import export_rows
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class ExportTests(BibleDatabaseMixin, TestCase):
+    bible_versions = ["KJV", "ASV"]
+
+    def get(self, **params):
+        response = self.client.get("/export", {"search": "key:darkness", "versions": "KJV,ASV", **params})
+        body = b"".join(response.streaming_content).decode("utf-8") if response.streaming else None
+        return response, body
+
+    def test_sql_and_index_plans_stream_rows(self):
+        rows = list(export_rows("key:darkness", "KJV"))
+        self.assertEqual(sorted(row[1:4] for row in rows), [(0, 1, 2), (0, 1, 4), (42, 1, 5)])
+        self.assertTrue(all(row[0] == "KJV" for row in rows))
+        # Phrases are answered from the text index
+        rows = list(export_rows('"God is love"', "KJV", book_ids=[61]))
+        self.assertEqual([row[1:4] for row in rows], [(61, 4, 8), (61, 4, 16)])
+        self.assertEqual(list(export_rows('"God is love"', "KJV", book_ids=[0])), [])
+
+    def test_csv_export_covers_every_version(self):
+        response, body = self.get(format="csv", books=ALL_BOOKS)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ["version", "Book", "Chapter", "Versecount", "verse"])
+        self.assertEqual(sorted({row[0] for row in rows[1:]}), ["ASV", "KJV"])
+        self.assertEqual(len(rows), 7)
+
+    def test_ndjson_export_and_book_filter(self):
+        _, body = self.get(format="ndjson", books="1")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["Book"], 0)
+        self.assertIn("darkness", rows[0]["verse"])
+
+    def test_empty_csv_has_header(self):
+        _, body = self.get(search="key:Zion")
+        self.assertEqual(body.strip(), "version,Book,Chapter,Versecount,verse")
+
+    def test_errors(self):
+        self.assertEqual(self.get(versions="NOPE")[0].status_code, 400)
+        self.assertEqual(self.get(format="xml")[0].status_code, 400)
+        self.assertEqual(self.get(search="SELECT * FROM bible")[0].status_code, 400)
+        self.assertEqual(self.get(versions="NASB")[0].status_code, 503)
+        if not parquet_available():
+            self.assertEqual(self.get(format="parquet")[0].status_code, 503)
+
+    @unittest.skipUnless(parquet_available(), "pyarrow is not installed")
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get("/export", {"search": "key:darkness", "versions": "KJV", "format": "parquet"})
+        body = b"".join(response.streaming_content)
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.num_rows, 3)
+
+    def test_management_command(self):
+        path = os.path.join(self.database_dir, "out.ndjson")
+        call_command("export_results", "key:darkness", versions="KJV", format="ndjson", output=path, stderr=io.StringIO())
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        out = io.StringIO()
+        call_command("export_results", "key:darkness", versions="ASV", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
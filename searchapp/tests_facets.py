@@ -0,0 +1,101 @@
+import numpy as np
+from django.test import TestCase
+
+from searchapp.facets import FacetIndex
+from searchapp.textindex import get_text_index
+from searchapp.testutils import BibleDatabaseMixin
+
+
+class FacetCountTests(BibleDatabaseMixin, TestCase):
+    def test_counts_per_book_section_and_testament(self):
+        refs = np.array([[0, 1, 1], [0, 1, 2], [42, 3, 16], [44, 8, 28], [61, 4, 8]])
+        facets = FacetIndex(refs).counts([0, 2, 3, 4])
+        self.assertEqual(facets["books"], {"Genesis": 1, "John": 1, "Romans": 1, "1 John": 1})
+        self.assertEqual(facets["sections"]["Law"], 1)
+        self.assertEqual(facets["sections"]["Gospels"], 1)
+        self.assertEqual(facets["sections"]["Pauline Epistles"], 1)
+        self.assertEqual(facets["sections"]["General Epistles"], 1)
+        self.assertEqual(facets["sections"]["Minor Prophets"], 0)
+        self.assertEqual(facets["testaments"], {"Old Testament": 1, "New Testament": 3})
+
+    def test_row_ids_round_trip(self):
+        index = get_text_index("KJV")
+        rows = index.rows([0, 7, 19])
+        self.assertEqual(index.row_ids(rows).tolist(), [0, 7, 19])
+        self.assertEqual(index.row_ids([{"Book": 5, "Chapter": 1, "Versecount": 1}]).tolist(), [])
+        missing = {"Book": 5, "Chapter": 1, "Versecount": 1}
+        self.assertEqual(index.row_ids([rows[0], missing, rows[2]], keep_missing=True).tolist(), [0, -1, 19])
+
+    def test_search_ajax_reports_facets_for_unselected_books(self):
+        # Only Genesis (book 0) selected
+        response = self.client.get(
+            "/ajax/search/", {"search": "light + God", "version": "KJV", "books": "1"}
+        )
+        data = response.json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(data["facets"]["books"], {"Genesis": 2})
+        response = self.client.get(
+            "/ajax/search/", {"search": "God + love", "version": "KJV", "books": "1"}
+        )
+        data = response.json()
+        self.assertEqual(data["results"], [])
+        self.assertEqual(data["facets"]["books"], {"Romans": 2, "1 John": 2})
+        self.assertEqual(data["facets"]["testaments"]["New Testament"], 4)
+
+
+class CountModeTests(BibleDatabaseMixin, TestCase):
+    bible_versions = ["KJV", "ESV"]
+    all_books = str(2**66 - 1)
+
+    def test_count_matches_search_rows(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "God + love", "version": "KJV", "books": self.all_books, "count": "1"},
+        )
+        data = response.json()
+        self.assertNotIn("results", data)
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(data["versions"]["KJV"]["facets"]["books"], {"Romans": 2, "1 John": 2})
+
+    def test_count_per_version_and_selected_books(self):
+        # Genesis and Psalms (books 0 and 18) selected
+        response = self.client.get(
+            "/ajax/search/",
+            {
+                "search": "LORD, light",
+                "versions": "KJV,ESV",
+                "books": str(1 | 1 << 18),
+                "count": "1",
+            },
+        )
+        data = response.json()
+        self.assertEqual(data["versions"]["KJV"]["total"], 3)
+        self.assertEqual(data["total"], 6)
+
+    def test_count_reference_uses_sql(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "John 3", "version": "KJV", "books": self.all_books, "count": "1"},
+        )
+        facets = response.json()["versions"]["KJV"]["facets"]
+        self.assertEqual(response.json()["total"], 2)
+        self.assertEqual(facets["sections"]["Gospels"], 2)
+
+    def test_count_raw_sql_like_a_search(self):
+        params = {"version": "KJV", "books": self.all_books}
+        for sql in [
+            "SELECT * FROM bible WHERE Book = 42",
+            "SELECT * FROM bible WHERE Book = 42; ",
+            "SELECT * FROM bible WHERE Book = 42 -- John",
+        ]:
+            results = self.client.get("/ajax/search/", {**params, "search": sql}).json()["results"]
+            response = self.client.get("/ajax/search/", {**params, "search": sql, "count": "1"})
+            self.assertEqual(response.status_code, 200, sql)
+            self.assertEqual((response.json()["total"], len(results)), (5, 5), sql)
+
+    def test_count_unknown_version(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "God", "versions": "KJV,XYZ", "books": self.all_books, "count": "1"},
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from searchapp import views
+from searchapp.planner import normalize, parse_postfix, refinement
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import sort_rows, sql_row_gen, to_postfix, tokenize_expr
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+def tree(expression):
+    return normalize(parse_postfix(to_postfix(tokenize_expr(expression))))
+
+
+class RefinementTests(BibleDatabaseMixin, TestCase):
+    bible_versions = ["KJV", "ASV"]
+
+    def search(self, expression, token="", **params):
+        params = {"search": expression, "version": "KJV", "books": ALL_BOOKS, "token": token, **params}
+        return self.client.get("/ajax/search/", params).json()
+
+    def refs(self, results):
+        return [(row["Book"], row["Chapter"], row["Versecount"]) for row in results]
+
+    def expected(self, expression):
+        return [
+            (views.books[row["Book"]]["text"], row["Chapter"], row["Versecount"])
+            for row in sort_rows(sql_row_gen(f"key:{expression}", "KJV"))
+        ]
+
+    def test_refinement_of_trees(self):
+        self.assertEqual(refinement(tree("love"), tree("love + God")), ("term", "god"))
+        self.assertEqual(
+            refinement(tree("God + love"), tree("world + love + God + light")),
+            ("and", (("term", "light"), ("term", "world"))),
+        )
+        self.assertEqual(
+            refinement(tree("love, light"), tree("(light, love) + God")), ("term", "god")
+        )
+        self.assertIsNone(refinement(tree("love + God"), tree("love")))
+        self.assertIsNone(refinement(tree("love"), tree("love, God")))
+        self.assertIsNone(refinement(tree("love"), tree("love")))
+        self.assertIsNone(refinement(tree("love + God"), tree("love + world")))
+
+    def test_added_term_filters_previous_hits(self):
+        first = self.search("God")
+        self.assertFalse(first["refined"])
+        with patch.object(views, "search_hits", side_effect=AssertionError("searched from scratch")):
+            second = self.search("God + love", first["token"])
+            third = self.search("God + love + world", second["token"])
+        self.assertTrue(second["refined"])
+        self.assertEqual(self.refs(second["results"]), self.expected("God + love"))
+        self.assertTrue(third["refined"])
+        self.assertEqual(self.refs(third["results"]), self.expected("God + love + world"))
+        self.assertNotEqual(second["token"], third["token"])
+        # Refined results are cached under their own expression
+        self.assertEqual(self.search("God + love")["token"], second["token"])
+
+    def test_index_plans_keep_expansions(self):
+        first = self.search("lov*")
+        with patch.object(views, "search_hits", side_effect=AssertionError("searched from scratch")):
+            second = self.search("lov* + God", first["token"])
+        self.assertTrue(second["refined"])
+        self.assertEqual(self.refs(second["results"]), self.expected("lov* + God"))
+        self.assertIn("love", second["expansions"]["lov*"]["terms"])
+        highlights = {part.get("highlight") for row in second["results"] for part in row["verse"]}
+        self.assertTrue({"love", "loved", "God"} <= highlights)
+
+    def test_other_searches_run_from_scratch(self):
+        token = self.search("God + love")["token"]
+        for expression, params in [
+            ("God", {}),
+            ("light", {}),
+            ("God + love + world", {"case": "True"}),
+            ("God + love + world", {"version": "ASV"}),
+            ("John 3:16", {}),
+        ]:
+            data = self.search(expression, token, **params)
+            self.assertFalse(data["refined"], expression)
+        self.assertEqual(self.refs(self.search("God", token)["results"]), self.expected("God"))
+        # Unknown or malformed tokens are ignored
+        data = self.search("God + love", "0" * 40)
+        self.assertFalse(data["refined"])
+        self.assertEqual(self.refs(data["results"]), self.expected("God + love"))
+        self.assertFalse(self.search("God + love", "../etc")["refined"])
+
+    def test_narrower_book_selection_reuses_results(self):
+        token = self.search("God")["token"]
+        with patch.object(views, "search_hits", side_effect=AssertionError("searched from scratch")):
+            data = self.search("God", token, books=str(1 << 42))
+        self.assertEqual({row["Book"] for row in data["results"]}, {"John"})
+        self.assertEqual(data["token"], token)
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+from unittest.mock import patch
+
+import numpy as np
+from django.test import TestCase
+
+from searchapp.corpus import database_path, index_dir
+from searchapp.indexwatch import IndexWatcher
+from searchapp.optimize import content_hash
+from searchapp.resultcache import NullStore, get_store
+from searchapp.textindex import (
+    get_text_index,
+    load_or_build_text_index,
+    source_hash,
+    text_index_path,
+)
+from searchapp.testutils import SAMPLE_VERSES, BibleDatabaseMixin
+from searchapp.views import sql_row_gen
+
+
+class PersistentIndexTests(BibleDatabaseMixin, TestCase):
+    def test_saved_index_is_reused_and_memory_mapped(self):
+        built = load_or_build_text_index("KJV")
+        directory = text_index_path("KJV", source_hash("KJV"))
+        self.assertTrue(os.path.isdir(directory))
+        loaded = load_or_build_text_index("KJV")
+        self.assertIsInstance(loaded.occ_verses, np.memmap)
+        self.assertEqual(loaded.vocab, built.vocab)
+        postfix = ["love", "God", "+"]
+        self.assertEqual(loaded.evaluate(postfix).tolist(), built.evaluate(postfix).tolist())
+        self.assertEqual(loaded.rows([7]), built.rows([7]))
+        self.assertEqual(loaded.suggest("lovve"), built.suggest("lovve"))
+
+    def test_changed_database_gets_new_index(self):
+        old_directory = text_index_path("KJV", source_hash("KJV"))
+        load_or_build_text_index("KJV")
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("UPDATE bible SET verse = 'Zion rejoiced' WHERE Book = 0 AND Chapter = 1 AND Versecount = 1")
+        db.commit()
+        db.close()
+        index = load_or_build_text_index("KJV")
+        self.assertIn("zion", index.term_ids)
+        self.assertFalse(os.path.exists(old_directory))
+        names = [name for name in os.listdir(index_dir("KJV")) if name.startswith("text-v")]
+        self.assertEqual(len(names), 1)
+
+
+class IndexWatcherTests(BibleDatabaseMixin, TestCase):
+    def test_watcher_swaps_in_rebuilt_index(self):
+        watcher = IndexWatcher(interval=60)
+        old = get_text_index("KJV")
+        self.assertEqual(watcher.check(), [])
+        self.assertEqual(watcher.check(), [])
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("UPDATE bible SET verse = 'Zion rejoiced' WHERE Book = 0 AND Chapter = 1 AND Versecount = 1")
+        db.commit()
+        db.close()
+        self.assertEqual(watcher.check(), ["KJV"])
+        new = get_text_index("KJV")
+        self.assertIsNot(new, old)
+        self.assertIsNotNone(new.facets)
+        self.assertEqual(len(sql_row_gen("Zion", "KJV")), 1)
+        # A search holding the old index still completes on it
+        self.assertEqual(old.rows(old.evaluate(["beginning"]))[0]["Versecount"], 1)
+
+
+class PassageReadTests(BibleDatabaseMixin, TestCase):
+    def test_chapter_reads_match_database(self):
+        load_or_build_text_index("KJV")
+        # The second call maps the saved copy
+        index = load_or_build_text_index("KJV")
+        self.assertIsInstance(index.text_offsets, np.memmap)
+        texts = {(b, c, v): text for b, c, v, text in SAMPLE_VERSES}
+        rows = index.rows(index.chapter_ids(42, 3))
+        self.assertEqual([row["Versecount"] for row in rows], [16, 17])
+        self.assertEqual(rows[0]["verse"], texts[(42, 3, 16)])
+        self.assertEqual(len(index.chapter_ids(5, 1)), 0)
+        self.assertEqual(len(index.chapter_ids(0, 400)), 0)
+        self.assertEqual(len(index.chapter_ids(0, 1 << 20)), 0)
+
+    def test_references_and_chapters_served_from_index(self):
+        rows = sql_row_gen("Psalms 23:1-2", "KJV")
+        self.assertEqual([row["Versecount"] for row in rows], [1, 2])
+        response = self.client.get("/chapter", {"book": "John", "chapter": "1", "version": "KJV"})
+        self.assertEqual([v["verse"] for v in response.json()["verses"]], [1, 5])
+
+    def test_passage_lists_match_database(self):
+        rows = sql_row_gen("John 1:5-3:16; Rom 8; Eph 2:8-9; Ps 23:2; 1 John 4", "KJV")
+        refs = [(row["Book"], row["Chapter"], row["Versecount"]) for row in rows]
+        self.assertEqual(
+            refs,
+            [(18, 23, 2), (42, 1, 5), (42, 3, 16), (44, 8, 28), (48, 2, 8), (48, 2, 9), (61, 4, 8), (61, 4, 16)],
+        )
+        db = sqlite3.connect(database_path("KJV"))
+        texts = dict(((b, c, v), text) for b, c, v, text in db.execute("SELECT * FROM bible"))
+        db.close()
+        self.assertEqual([row["verse"] for row in rows], [texts[ref] for ref in refs])
+
+    def test_changed_database_is_read_after_swap(self):
+        watcher = IndexWatcher(interval=60)
+        watcher.check()
+        self.assertNotEqual(sql_row_gen("Genesis 1:1", "KJV")[0]["verse"], "changed")
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("UPDATE bible SET verse = 'changed' WHERE Book = 0 AND Chapter = 1 AND Versecount = 1")
+        db.commit()
+        db.close()
+        watcher.check()
+        self.assertEqual(sql_row_gen("Genesis 1:1", "KJV")[0]["verse"], "changed")
+        response = self.client.get("/chapter", {"book": "Genesis", "chapter": "1", "version": "KJV"})
+        self.assertEqual(response.json()["verses"][0]["text"], "changed")
+
+
+class ReadOnlyIndexTests(BibleDatabaseMixin, TestCase):
+    def test_search_without_writable_index_or_cache(self):
+        # Files where the directories belong stand in for a read-only tree,
+        # since file modes do not stop root
+        for name in ["index", "cache"]:
+            open(os.path.join(self.database_dir, name), "w").close()
+        params = {"search": "darkness", "version": "KJV", "books": str(2**66 - 1)}
+        with patch("searchapp.textindex.content_hash", wraps=content_hash) as hashed:
+            for _ in range(3):
+                self.assertEqual(len(self.client.get("/ajax/search/", params).json()["results"]), 3)
+        self.assertEqual(hashed.call_count, 1)
+        self.assertIsInstance(get_store(), NullStore)
@@ -1,6 +1,6 @@
 from django.test import TestCase
 from unittest.mock import patch, MagicMock, ANY
-from searchapp.llm_interface import detect_intent, generate_search_expression, validate_and_sanitize_sql
+from searchapp.llm_interface import detect_intent, generate_search_expression
 
 class IntentClassificationTests(TestCase):
     def test_detect_intent(self):
@@ -16,6 +16,8 @@ class IntentClassificationTests(TestCase):
         # Explicit Syntax -> STANDARD
         self.assertEqual(detect_intent("John 3:16"), "STANDARD")
         self.assertEqual(detect_intent("hope + love"), "STANDARD")
+        self.assertEqual(detect_intent('"in the beginning"'), "STANDARD")
+        self.assertEqual(detect_intent("light NEAR/3 darkness"), "STANDARD")
         
         # Explicit Prefixes trigger LLM
         self.assertEqual(detect_intent("ask: what does the bible say about love?"), "LLM")
@@ -70,13 +72,3 @@ class LLMGenerationTests(TestCase):
         expr, error = generate_search_expression("verses about love and hope")
         
         self.assertEqual(expr, "love + hope")
-
-class SQLValidationTests(TestCase):
-    def test_safe_sql(self):
-        self.assertTrue(validate_and_sanitize_sql("SELECT * FROM bible"))
-        self.assertTrue(validate_and_sanitize_sql("SELECT * FROM bible WHERE verse LIKE '%test%'"))
-
-    def test_unsafe_sql(self):
-        self.assertFalse(validate_and_sanitize_sql("DROP TABLE bible"))
-        self.assertFalse(validate_and_sanitize_sql("DELETE FROM bible"))
-        self.assertFalse(validate_and_sanitize_sql("SELECT * FROM bible; DROP TABLE bible"))
@@ -0,0 +1,62 @@
+import sqlite3
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from searchapp.corpus import database_path
+from searchapp.optimize import content_hash, optimize_database, read_meta
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import compile_search, sql_row_gen
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class OptimizeDatabaseTests(BibleDatabaseMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = database_path("KJV")
+        db = sqlite3.connect(self.path)
+        self.original_hash = content_hash(db)
+        db.close()
+        call_command("optimize_databases", "KJV", page_size=4096, stdout=StringIO())
+        self.db = sqlite3.connect(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        super().tearDown()
+
+    def test_clustered_layout(self):
+        (schema,) = self.db.execute("SELECT sql FROM sqlite_master WHERE name = 'bible'").fetchone()
+        self.assertIn("WITHOUT ROWID", schema)
+        self.assertEqual(self.db.execute("PRAGMA page_size").fetchone()[0], 4096)
+        plan = " ".join(
+            row[-1]
+            for row in self.db.execute(
+                "EXPLAIN QUERY PLAN SELECT verse FROM bible WHERE Book = 42 AND Chapter = 3"
+            )
+        )
+        self.assertIn("PRIMARY KEY", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_normalized_column_and_hash(self):
+        row = self.db.execute(
+            "SELECT verse, verse_lower FROM bible WHERE Book = 18 AND Chapter = 23 AND Versecount = 1"
+        ).fetchone()
+        self.assertEqual(row[1], row[0].lower())
+        meta = read_meta(self.path)
+        self.assertEqual(meta["content_hash"], self.original_hash)
+        self.assertEqual(optimize_database(self.path), self.original_hash)
+
+    def test_searches_use_normalized_column(self):
+        self.assertIn("verse_lower", compile_search("lord + shepherd", "KJV")["where"])
+        self.assertNotIn("verse_lower", compile_search("LORD", "KJV", case_sensitive=True)["where"])
+        rows = sql_row_gen("lord + shepherd", "KJV")
+        self.assertEqual([(row["Book"], row["Chapter"], row["Versecount"]) for row in rows], [(18, 23, 1)])
+        self.assertEqual(set(rows[0]), {"Book", "Chapter", "Versecount", "verse"})
+        self.assertEqual(len(sql_row_gen("LORD", "KJV", case_sensitive=True)), 1)
+        self.assertEqual(sql_row_gen("lord", "KJV", case_sensitive=True), [])
+        response = self.client.get(
+            "/ajax/search/", {"search": "John 3:16-17", "version": "KJV", "books": ALL_BOOKS}
+        )
+        self.assertEqual(len(response.json()["results"]), 2)
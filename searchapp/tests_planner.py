@@ -0,0 +1,97 @@
+from django.test import TestCase
+
+from searchapp.planner import normalize, parse_postfix, plan_postfix
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.textindex import get_text_index
+from searchapp.views import (
+    build_sql_from_postfix,
+    compile_search,
+    open_bible_db,
+    sql_row_gen,
+    to_postfix,
+    tokenize_expr,
+)
+
+
+def postfix(expression):
+    return to_postfix(tokenize_expr(expression))
+
+
+def tree(expression, case_sensitive=False):
+    return normalize(parse_postfix(postfix(expression)), case_sensitive)
+
+
+class PlannerTests(BibleDatabaseMixin, TestCase):
+    def test_normalize_flattens_and_deduplicates(self):
+        self.assertEqual(tree("love, love"), ("term", "love"))
+        self.assertEqual(tree("God, god"), ("term", "god"))
+        self.assertEqual(
+            tree("God, god", case_sensitive=True), ("or", (("term", "God"), ("term", "god")))
+        )
+        self.assertEqual(
+            tree("(a + b) + (c + a)"),
+            ("and", (("term", "a"), ("term", "b"), ("term", "c"))),
+        )
+        # Absorption
+        self.assertEqual(tree("love + (love, light)"), ("term", "love"))
+        self.assertEqual(tree("love, (love + light)"), ("term", "love"))
+        self.assertIsNone(parse_postfix([]))
+        with self.assertRaises(IndexError):
+            parse_postfix(postfix("love +"))
+
+    def test_rare_terms_go_first(self):
+        index = get_text_index("KJV")
+        # "God" is in 12 of the 20 sample verses, "love" in 4, "darkness" in 3
+        self.assertEqual(plan_postfix(postfix("God + love"), index), ["love", "God", "+"])
+        self.assertEqual(
+            plan_postfix(postfix("God + (love + darkness)"), index),
+            ["darkness", "love", "+", "God", "+"],
+        )
+        # Common terms first in an OR: fewer verses left to test
+        self.assertEqual(plan_postfix(postfix("love, God"), index), ["God", "love", ","])
+        self.assertEqual(compile_search("God + love", "KJV")["values"], [r"\blove\b", r"\bGod\b"])
+
+    def test_plans_are_memoized_by_normalized_expression(self):
+        index = get_text_index("KJV")
+        index.plans.clear()
+        plan_postfix(postfix("God + love"), index)
+        plan_postfix(postfix("love + GOD + love"), index)
+        self.assertEqual(len(index.plans), 1)
+        # Each caller gets its own spelling back
+        self.assertEqual(plan_postfix(postfix("Lov* + God"), index), ["Lov*", "God", "+"])
+
+    def test_results_are_unchanged(self):
+        index = get_text_index("KJV")
+        db = open_bible_db("KJV")
+        expressions = [
+            "God + love",
+            "the + God + world",
+            "(God, light) + (darkness, love)",
+            "love, God, love",
+            "faith + (works, grace) + faith",
+            '"God is love" + God',
+            "lov* + God",
+            "God NEAR/3 love, darkness",
+        ]
+        try:
+            for expression in expressions:
+                written, planned = postfix(expression), plan_postfix(postfix(expression), index)
+                self.assertEqual(
+                    index.evaluate(planned).tolist(), index.evaluate(written).tolist(), expression
+                )
+                if all(token.isalnum() or token in "+," for token in written):
+                    queries = [
+                        db.execute(
+                            "SELECT Book, Chapter, Versecount FROM bible WHERE " + where + " ORDER BY 1, 2, 3",
+                            values,
+                        ).fetchall()
+                        for where, values in (build_sql_from_postfix(written), build_sql_from_postfix(planned))
+                    ]
+                    self.assertEqual(queries[0], queries[1], expression)
+        finally:
+            db.close()
+
+    def test_highlighting_keeps_written_words(self):
+        context = {}
+        sql_row_gen("Lov* + God", "KJV", highlight_context=context)
+        self.assertIn("love", context["words"])
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from searchapp import sandbox
+from searchapp.querycost import QueryTooExpensive, check_cost, estimate_cost
+from searchapp.textindex import get_text_index
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import compile_search, sql_row_gen, to_postfix, tokenize_expr
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+def postfix(expression):
+    return to_postfix(tokenize_expr(expression))
+
+
+class CostEstimateTests(BibleDatabaseMixin, TestCase):
+    def test_selectivity_and_short_circuit(self):
+        index = get_text_index("KJV")
+        # "love" is in 4 of the 20 sample verses, "God" in 12
+        cost = estimate_cost(postfix("love + God"), index)
+        self.assertEqual(cost["terms"], 2)
+        self.assertAlmostEqual(cost["selectivity"], 0.2 * 0.6)
+        self.assertAlmostEqual(cost["scan_passes"], 1.2)
+        cost = estimate_cost(postfix("love, God"), index)
+        self.assertAlmostEqual(cost["scan_passes"], 1.8)
+        self.assertEqual(estimate_cost(postfix("zzzz + God"), index)["scan_passes"], 1.0)
+
+    def test_long_or_list_is_sent_to_index(self):
+        # Distinct words: the planner would collapse repeats into one term
+        expression = ", ".join(f"zz{letter}" for letter in "abcdef")
+        plan = compile_search(expression, "KJV")
+        self.assertEqual(plan["kind"], "index")
+        self.assertEqual(compile_search("love + God", "KJV")["kind"], "sql")
+
+    def test_oversized_expression_is_rejected(self):
+        expression = ", ".join(["God"] * 65)
+        with self.assertRaises(QueryTooExpensive):
+            check_cost(estimate_cost(postfix(expression), get_text_index("KJV")))
+        response = self.client.get(
+            "/ajax/search/", {"search": expression, "version": "KJV", "books": ALL_BOOKS}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_deadline_returns_partial_results(self):
+        context = {}
+        with mock.patch("searchapp.views.SEARCH_TIMEOUT", 0.0), mock.patch.object(
+            sandbox, "PROGRESS_STEP", 1
+        ):
+            rows = sql_row_gen("God", "KJV", highlight_context=context)
+        self.assertTrue(context["partial"])
+        self.assertLess(len(rows), 12)
+        context = {}
+        self.assertEqual(len(sql_row_gen("God", "KJV", highlight_context=context)), 12)
+        self.assertNotIn("partial", context)
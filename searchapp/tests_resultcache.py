@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+from unittest.mock import patch
+
+import numpy as np
+from django.test import TestCase
+
+from searchapp.corpus import database_path
+from searchapp.llm_interface import cached_search_expression
+from searchapp.resultcache import (
+    LocalStore,
+    get_or_compute,
+    get_store,
+    pack_entry,
+    unpack_entry,
+)
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import hit_tuples, search_results, sort_rows, sql_row_gen
+
+
+def result_tuples(expression, version_name, **kwargs):
+    return list(hit_tuples(*search_results(expression, version_name, **kwargs)))
+
+
+class LocalStoreTests(BibleDatabaseMixin, TestCase):
+    def test_set_get_nx_and_expiry(self):
+        store = get_store()
+        self.assertIsInstance(store, LocalStore)
+        self.assertTrue(store.set("a", b"1"))
+        self.assertEqual(store.get("a"), b"1")
+        self.assertFalse(store.set("a", b"2", nx=True))
+        self.assertTrue(store.set("b", b"x", px=-1))
+        self.assertIsNone(store.get("b"))
+        self.assertTrue(store.set("b", b"y", nx=True))
+        self.assertEqual(store.delete("a", "b"), 2)
+        self.assertIsNone(store.get("a"))
+
+    def test_evicts_least_recently_used(self):
+        store = LocalStore(f"{self.database_dir}/small.sqlite3", max_bytes=3000)
+        for i in range(5):
+            store.set(f"k{i}", bytes(1000))
+        self.assertIsNone(store.get("k0"))
+        self.assertEqual(store.get("k4"), bytes(1000))
+
+    def test_usage_total_tracks_writes(self):
+        path = f"{self.database_dir}/usage.sqlite3"
+        store = LocalStore(path, max_bytes=10**6)
+        db = store._db()
+
+        def usage():
+            (tracked,) = db.execute("SELECT bytes FROM usage").fetchone()
+            (actual,) = db.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM entries").fetchone()
+            self.assertEqual(tracked, actual)
+            return tracked
+
+        store.set("a", bytes(100))
+        store.set("b", bytes(50), px=-1)
+        store.set("a", bytes(30))
+        store.set("b", bytes(20), nx=True)
+        self.assertEqual(usage(), 50)
+        store.delete("a")
+        self.assertEqual(usage(), 20)
+        # A file written before the usage table existed is seeded on open
+        db.execute("DROP TABLE usage")
+        for trigger in ("entries_insert", "entries_update", "entries_delete"):
+            db.execute(f"DROP TRIGGER {trigger}")
+        db = LocalStore(path, max_bytes=10**6)._db()
+        self.assertEqual(usage(), 20)
+
+    def test_entry_round_trip(self):
+        meta, keys = unpack_entry(pack_entry({"words": ["love"]}, [3, 1 << 40]))
+        self.assertEqual(meta, {"words": ["love"]})
+        self.assertEqual(keys.tolist(), [3, 1 << 40])
+        self.assertIsNone(unpack_entry(b"not an entry"))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            threading.Event().wait(0.1)
+            return b"value"
+
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute("shared", compute)[0]))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b"value"] * 4)
+
+    def test_waiter_never_releases_anothers_lock(self):
+        store = get_store()
+        store.set("slow:lock", b"1", px=10_000, nx=True)
+        with patch("searchapp.resultcache.LOCK_TTL", 0.05):
+            self.assertEqual(get_or_compute("slow", lambda: b"mine"), (b"mine", False))
+        self.assertEqual(store.get("slow:lock"), b"1")
+        # The lock's owner releases it
+        self.assertEqual(get_or_compute("other", lambda: b"x"), (b"x", False))
+        self.assertIsNone(store.get("other:lock"))
+
+
+class CachedSearchTests(BibleDatabaseMixin, TestCase):
+    def test_hit_matches_direct_search(self):
+        expected = list(hit_tuples(None, sort_rows(sql_row_gen("love + God", "KJV"))))
+        result_tuples("love + God", "KJV")
+        context = {}
+        with patch("searchapp.views.search_hits") as search:
+            rows = result_tuples("love + God", "KJV", highlight_context=context)
+        search.assert_not_called()
+        self.assertEqual(rows, expected)
+        self.assertEqual(context["words"], ["love", "God"])
+
+    def test_changed_database_misses(self):
+        result_tuples("Zion", "KJV")
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("UPDATE bible SET verse = 'Zion rejoiced' WHERE Book = 0 AND Chapter = 1 AND Versecount = 1")
+        db.commit()
+        db.close()
+        self.assertEqual(len(result_tuples("Zion", "KJV")), 1)
+
+    def test_partial_results_are_not_cached(self):
+        def partial_search(expression, version_name, case_sensitive, context, stem, autocorrect, index):
+            context["partial"] = True
+            return np.empty(0, dtype=np.int64)
+
+        with patch("searchapp.views.search_hits", side_effect=partial_search):
+            context = {}
+            self.assertEqual(result_tuples("God", "KJV", highlight_context=context), [])
+        self.assertTrue(context["partial"])
+        self.assertEqual(len(result_tuples("God", "KJV")), 12)
+
+    def test_ajax_serves_repeat_from_cache(self):
+        params = {"search": "darkness", "version": "KJV", "books": str(2**66 - 1)}
+        first = self.client.get("/ajax/search/", params).json()
+        with patch("searchapp.views.search_hits") as search:
+            second = self.client.get("/ajax/search/", params).json()
+        search.assert_not_called()
+        self.assertEqual(first, second)
+
+
+class CachedExpressionTests(BibleDatabaseMixin, TestCase):
+    def test_generated_expression_is_cached(self):
+        with patch("searchapp.llm_interface.generate_search_expression", return_value=("love", None)) as generate:
+            self.assertEqual(cached_search_expression("verses about love", "KJV"), ("love", None))
+            self.assertEqual(cached_search_expression("verses about love", "KJV"), ("love", None))
+        generate.assert_called_once()
+
+    def test_failures_are_not_cached(self):
+        with patch("searchapp.llm_interface.generate_search_expression", return_value=(None, "down")) as generate:
+            cached_search_expression("verses about love", "KJV")
+            cached_search_expression("verses about love", "KJV")
+        self.assertEqual(generate.call_count, 2)
@@ -0,0 +1,81 @@
+from django.test import TestCase
+
+from searchapp.sandbox import SandboxError, check_sql, run_readonly_query
+from searchapp.testutils import BibleDatabaseMixin
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class SandboxTests(BibleDatabaseMixin, TestCase):
+    def test_only_selects_on_bible(self):
+        self.assertIsNone(check_sql("SELECT * FROM bible WHERE Book = 42"))
+        self.assertIsNone(check_sql("SELECT * FROM bible WHERE verse LIKE '%test%'"))
+        self.assertIsNotNone(check_sql("DROP TABLE bible"))
+        self.assertIsNotNone(check_sql("DELETE FROM bible"))
+        self.assertIsNotNone(check_sql("SELECT * FROM bible; DROP TABLE bible"))
+        self.assertIsNotNone(check_sql("SELECT * FROM sqlite_master"))
+        self.assertIsNotNone(check_sql("SELECT load_extension('x')"))
+        self.assertIsNotNone(check_sql("SELECT 1; DELETE FROM bible"))
+        self.assertIsNotNone(
+            check_sql("SELECT * FROM (WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c)")
+        )
+
+    def test_row_cap(self):
+        rows, truncated = run_readonly_query("KJV", "SELECT * FROM bible", max_rows=5)
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(truncated)
+        rows, truncated = run_readonly_query("KJV", "SELECT * FROM bible WHERE Book = 42")
+        self.assertEqual(len(rows), 5)
+        self.assertFalse(truncated)
+
+    def test_runaway_query_is_interrupted(self):
+        cross_join = "SELECT count(*) FROM bible a, bible b, bible c, bible d, bible e"
+        with self.assertRaisesRegex(SandboxError, "budget"):
+            run_readonly_query("KJV", cross_join, instruction_budget=100_000)
+        with self.assertRaisesRegex(SandboxError, "budget"):
+            run_readonly_query("KJV", cross_join, timeout=0.0)
+
+    def test_search_ajax_raw_sql(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "SELECT * FROM bible WHERE verse REGEXP 'darkness'", "version": "KJV", "books": ALL_BOOKS},
+        )
+        data = response.json()
+        self.assertEqual([row["Book"] for row in data["results"]], ["Genesis", "Genesis", "John"])
+        self.assertFalse(data["truncated"])
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "SELECT * FROM bible; DROP TABLE bible", "version": "KJV", "books": ALL_BOOKS},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "SELECT Book FROM bible", "version": "KJV", "books": ALL_BOOKS},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_raw_sql_references_must_be_verse_numbers(self):
+        for sql in [
+            "SELECT 'x' AS Book, Chapter, Versecount, verse FROM bible",
+            "SELECT Book, NULL AS Chapter, Versecount, verse FROM bible",
+            "SELECT Book, Chapter, 1.5 AS Versecount, verse FROM bible",
+            "SELECT 99 AS Book, Chapter, Versecount, verse FROM bible",
+            "SELECT Book, -1 AS Chapter, Versecount, verse FROM bible",
+            "SELECT Book, Chapter, 1 << 40 AS Versecount, verse FROM bible",
+        ]:
+            response = self.client.get("/ajax/search/", {"search": sql, "version": "KJV", "books": ALL_BOOKS})
+            self.assertEqual(response.status_code, 400, sql)
+
+    def test_value_length_is_capped(self):
+        with self.assertRaisesRegex(SandboxError, "too big"):
+            run_readonly_query("KJV", "SELECT zeroblob(1000000000) FROM bible")
+        # printf() gives up with NULL instead
+        rows, _ = run_readonly_query("KJV", "SELECT printf('%.*c', 1000000000, 'x') AS s FROM bible LIMIT 1")
+        self.assertEqual(rows, [{"s": None}])
+
+    def test_count_raw_sql(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "SELECT * FROM bible WHERE Book = 61", "version": "KJV", "books": ALL_BOOKS, "count": "1"},
+        )
+        self.assertEqual(response.json()["total"], 3)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+
+import numpy as np
+from django.test import TestCase
+
+from searchapp.corpus import database_path, index_dir
+from searchapp.semantic import (
+    build_neighbor_table,
+    build_semantic_index,
+    load_semantic_index,
+    related_verses,
+    semantic_search,
+)
+from searchapp.testutils import BibleDatabaseMixin
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class SemanticIndexTests(BibleDatabaseMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        build_semantic_index("KJV", dims=8)
+
+    def test_index_is_memory_mapped_float32(self):
+        index = load_semantic_index("KJV")
+        self.assertIsInstance(index.verse_vectors, np.memmap)
+        self.assertEqual(index.verse_vectors.dtype, np.float32)
+        self.assertEqual(index.verse_vectors.shape[0], index.refs.shape[0])
+
+    def test_ranks_related_verses_first(self):
+        rows = semantic_search("God is love", "KJV", limit=3)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual((rows[0]["Book"], rows[0]["Chapter"]), (61, 4))
+        scores = [row["score"] for row in rows]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_book_filter_and_unknown_terms(self):
+        rows = semantic_search("light darkness", "KJV", limit=10, book_ids=[42])
+        self.assertTrue(rows)
+        self.assertTrue(all(row["Book"] == 42 for row in rows))
+        self.assertEqual(semantic_search("zzzz", "KJV"), [])
+
+    def test_rebuild_swaps_index_without_touching_mapped_files(self):
+        old = load_semantic_index("KJV")
+        build_semantic_index("KJV", dims=4)
+        new = load_semantic_index("KJV")
+        self.assertIsNot(new, old)
+        self.assertEqual(new.verse_vectors.shape[1], 4)
+        # The old mapping still reads its own, complete build
+        self.assertEqual(old.verse_vectors.shape[1], 8)
+        self.assertTrue(np.isfinite(np.asarray(old.verse_vectors)).all())
+        self.assertIs(load_semantic_index("KJV"), new)
+        builds = [name for name in os.listdir(index_dir("KJV")) if name.startswith("semantic-")]
+        self.assertEqual(builds, [os.path.basename(new.directory)])
+
+    def test_changed_database_needs_rebuild(self):
+        load_semantic_index("KJV")
+        db = sqlite3.connect(database_path("KJV"))
+        db.execute("INSERT INTO bible VALUES (0, 1, 5, 'And God called the light Day.')")
+        db.commit()
+        db.close()
+        self.assertIsNone(load_semantic_index("KJV"))
+        build_semantic_index("KJV", dims=8)
+        self.assertEqual(load_semantic_index("KJV").refs.shape[0], 21)
+
+    def test_search_ajax_semantic_mode(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "saved by grace through faith", "version": "KJV", "books": ALL_BOOKS, "mode": "semantic"},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual((results[0]["Book"], results[0]["Chapter"], results[0]["Versecount"]), ("Ephesians", 2, 8))
+        self.assertIn("score", results[0])
+
+    def test_search_ajax_semantic_limit(self):
+        params = {"search": "God is love", "version": "KJV", "books": ALL_BOOKS, "mode": "semantic"}
+        for limit, status, count in [("2", 200, 2), ("0", 200, 1), ("-5", 200, 1), ("x", 400, None)]:
+            response = self.client.get("/ajax/search/", {**params, "limit": limit})
+            self.assertEqual(response.status_code, status, limit)
+            if count is not None:
+                self.assertEqual(len(response.json()["results"]), count, limit)
+
+    def test_search_ajax_semantic_mode_without_index(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "love", "version": "ESV", "books": ALL_BOOKS, "mode": "semantic"},
+        )
+        self.assertEqual(response.status_code, 503)
+
+
+class RelatedVersesTests(BibleDatabaseMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        build_semantic_index("KJV", dims=8, neighbors=3)
+        self.neighbors = load_semantic_index("KJV").neighbors
+
+    def test_neighbor_table_is_compact_int32(self):
+        self.assertEqual(self.neighbors.dtype, np.int32)
+        self.assertEqual(self.neighbors.shape[1], 3)
+        # A verse is never its own neighbor
+        rows = np.arange(self.neighbors.shape[0])[:, None]
+        self.assertFalse((self.neighbors == rows).any())
+
+    def test_blocked_build_matches_single_block(self):
+        blocked = build_neighbor_table(load_semantic_index("KJV").verse_vectors, k=3, block=4)
+        np.testing.assert_array_equal(blocked, self.neighbors)
+
+    def test_related_verses_lookup(self):
+        rows = related_verses("KJV", 61, 4, 8, limit=2)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual((rows[0]["Book"], rows[0]["Chapter"], rows[0]["Versecount"]), (61, 4, 16))
+        self.assertEqual(related_verses("KJV", 61, 99, 1), [])
+
+    def test_related_endpoint(self):
+        response = self.client.get("/related", {"book": "1 John", "chapter": "4", "verse": "8", "version": "KJV", "limit": "1"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["related"][0]["Book"], "1 John")
+        self.assertEqual(data["related"][0]["Versecount"], 16)
+
+        response = self.client.get("/related", {"book": "Nope", "chapter": "1", "verse": "1", "version": "KJV"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_related_endpoint_validates_version_and_limit(self):
+        params = {"book": "1 John", "chapter": "4", "verse": "8", "version": "KJV"}
+        for bad in [{"limit": "x"}, {"version": "../KJV"}, {"version": "NOPE"}]:
+            self.assertEqual(self.client.get("/related", {**params, **bad}).status_code, 400, bad)
+        response = self.client.get("/related", {**params, "limit": "0"})
+        self.assertEqual(len(response.json()["related"]), 1)
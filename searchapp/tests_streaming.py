@@ -0,0 +1,140 @@
+from unittest.mock import patch
+
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import (
+    ROW_CHUNK,
+    highlighter,
+    hit_tuples,
+    page_chrome,
+    search_results,
+    select_books,
+    sort_rows,
+    split_highlights,
+    sql_row_gen,
+)
+
+ALL_BOOKS = str(2**66 - 1)
+
+
+class StreamingPageTests(BibleDatabaseMixin, TestCase):
+    def get_page(self, **params):
+        response = self.client.get("/", {"books": ALL_BOOKS, "version": "KJV", **params})
+        self.assertIsInstance(response, StreamingHttpResponse)
+        chunks = [chunk.decode("utf-8") for chunk in response.streaming_content]
+        return chunks, "".join(chunks)
+
+    def test_chrome_is_sent_before_the_search_runs(self):
+        response = self.client.get("/", {"keyword": "darkness", "books": ALL_BOOKS, "version": "KJV"})
+        with patch("searchapp.views.search_results", return_value=(None, [])) as search:
+            first = next(iter(response.streaming_content)).decode("utf-8")
+            search.assert_not_called()
+        self.assertIn('id="verseResults"', first)
+        self.assertIn('value="darkness"', first)
+
+    def test_rows_are_highlighted_and_filtered_by_book(self):
+        _, page = self.get_page(keyword="darkness")
+        self.assertEqual(page.count("data-ref="), 3)
+        self.assertIn(">darkness</span>", page)
+        self.assertIn("John", page)
+        # Genesis only (bit 0)
+        _, page = self.get_page(keyword="darkness", books="1")
+        self.assertEqual(page.count("data-ref="), 2)
+        self.assertTrue(page.rstrip().endswith("</html>"))
+
+    def test_mask_bits_past_the_last_book_are_ignored(self):
+        wide = str(2**70 - 1)
+        _, page = self.get_page(keyword="darkness", books=wide)
+        self.assertEqual(page.count("data-ref="), 3)
+        self.assertTrue(page.rstrip().endswith("</html>"))
+        params = {"search": "darkness", "version": "KJV", "books": wide}
+        self.assertEqual(len(self.client.get("/ajax/search/", params).json()["results"]), 3)
+        response = self.client.get("/ajax/search/", {**params, "count": "1"})
+        self.assertEqual(response.json()["total"], 3)
+
+    def test_raw_rows_without_verse_text(self):
+        sql = "SELECT Book, Chapter, Versecount, NULL AS verse FROM bible WHERE Book = 42"
+        _, page = self.get_page(keyword=sql)
+        self.assertEqual(page.count("data-ref="), 5)
+        self.assertTrue(page.rstrip().endswith("</html>"))
+
+    def test_rows_are_sent_in_chunks(self):
+        rows = [
+            {"Book": 0, "Chapter": 1, "Versecount": i, "verse": "God"} for i in range(1, ROW_CHUNK + 11)
+        ]
+        with patch("searchapp.views.search_results", return_value=(None, rows)):
+            chunks, page = self.get_page(keyword="God")
+        self.assertEqual([chunk.count("data-ref=") for chunk in chunks if "data-ref=" in chunk], [ROW_CHUNK, 10])
+
+    def test_no_matches_and_escaped_search_value(self):
+        _, page = self.get_page(keyword='Zion "<b>')
+        self.assertIn("No matches found.", page)
+        self.assertIn('value="Zion &quot;&lt;b&gt;"', page)
+        self.assertNotIn("mbab-search-value", page)
+
+    def test_malformed_expression_is_reported_on_the_page(self):
+        for keyword in ["love +", "love )"]:
+            _, page = self.get_page(keyword=keyword)
+            self.assertIn("Malformed search expression.</p>", page)
+            self.assertTrue(page.rstrip().endswith("</html>"))
+
+    def test_malformed_expression_is_rejected_by_search_ajax(self):
+        for keyword in ["love +", "love )", ", God"]:
+            for extra in [{}, {"count": "1"}]:
+                response = self.client.get(
+                    "/ajax/search/", {"search": keyword, "version": "KJV", "books": ALL_BOOKS, **extra}
+                )
+                self.assertEqual(response.status_code, 400, (keyword, extra))
+                self.assertEqual(response.json()["error"], "Malformed search expression.")
+        response = self.client.get("/export", {"search": "love +", "version": "KJV"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_chrome_is_rendered_once(self):
+        page_chrome.cache_clear()
+        self.get_page(keyword="God")
+        self.get_page(keyword="love")
+        self.assertEqual(page_chrome.cache_info().misses, 1)
+
+    def test_blank_page_shows_empty_state(self):
+        response = self.client.get("/")
+        self.assertContains(response, "Select books, enter keywords, and find truth.")
+        self.assertNotContains(response, "mbab-search-value")
+
+
+class ResultPipelineTests(BibleDatabaseMixin, TestCase):
+    def test_index_hits_match_database_rows(self):
+        for expression in ["darkness", "God + love", "lov*", "John 3:16-4:1"]:
+            index, hits = search_results(expression, "KJV")
+            self.assertIsNotNone(index)
+            expected = [
+                (row["Book"], row["Chapter"], row["Versecount"], row["verse"])
+                for row in sort_rows(sql_row_gen(expression, "KJV"))
+            ]
+            self.assertEqual(list(hit_tuples(index, hits)), expected, expression)
+            self.assertEqual(
+                list(hit_tuples(index, select_books(index, hits, [42]))),
+                [row for row in expected if row[0] == 42],
+            )
+
+    def test_raw_sql_rows_are_sorted(self):
+        index, hits = search_results(
+            "SELECT Book, Chapter, Versecount, verse FROM bible WHERE verse LIKE '%darkness%' ORDER BY Book DESC",
+            "KJV",
+        )
+        self.assertIsNone(index)
+        rows = hit_tuples(index, select_books(index, hits, [0, 42]))
+        self.assertEqual([row[:3] for row in rows], [(0, 1, 2), (0, 1, 4), (42, 1, 5)])
+
+    def test_split_highlights(self):
+        pattern = highlighter(["God", "love"])
+        self.assertEqual(
+            split_highlights("God is love", pattern),
+            [(True, "God"), (False, " is "), (True, "love")],
+        )
+        self.assertEqual(split_highlights("lovely", pattern), [(False, "lovely")])
+        self.assertEqual(split_highlights("god", highlighter(["God"], case_sensitive=True)), [(False, "god")])
+        self.assertEqual(split_highlights("God is love", None), [(False, "God is love")])
+        self.assertEqual(split_highlights(None, pattern), [])
+        self.assertEqual(split_highlights(7, pattern), [(False, "7")])
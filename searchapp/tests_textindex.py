@@ -0,0 +1,150 @@
+from django.test import TestCase
+
+from searchapp.textindex import TextIndex, get_text_index
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.views import sql_row_gen, to_postfix, tokenize_expr
+
+
+class PositionalIndexTests(BibleDatabaseMixin, TestCase):
+    def search(self, expr, case_sensitive=False):
+        index = get_text_index("KJV")
+        ids = index.evaluate(to_postfix(tokenize_expr(expr)), case_sensitive)
+        return [tuple(int(p) for p in index.refs[i]) for i in ids]
+
+    def test_phrase_of_common_words(self):
+        self.assertEqual(self.search('"in the beginning"'), [(0, 1, 1), (42, 1, 1)])
+        # All three words occur in Genesis 1:2 etc., but not as a phrase
+        self.assertEqual(self.search('"the beginning in"'), [])
+
+    def test_phrase_is_case_aware(self):
+        self.assertEqual(self.search('"The LORD"', case_sensitive=True), [(18, 23, 1)])
+        self.assertEqual(self.search('"The Lord"', case_sensitive=True), [])
+        self.assertEqual(self.search('"the lord"'), [(18, 23, 1), (42, 4, 1)])
+
+    def test_near_operator(self):
+        # "love ... God" within 2 words in either order
+        self.assertEqual(self.search("love NEAR/2 God"), [(44, 8, 28), (61, 4, 8), (61, 4, 16)])
+        self.assertEqual(self.search("love NEAR/1 God"), [(44, 8, 28)])
+        self.assertEqual(self.search("light NEAR/1 darkness"), [])
+        self.assertEqual(self.search("light NEAR/3 darkness"), [(0, 1, 4), (42, 1, 5)])
+
+    def test_phrase_combined_with_boolean_operators(self):
+        self.assertEqual(self.search('"the Word" + beginning'), [(42, 1, 1)])
+        self.assertEqual(self.search('"God is love" , "by grace"'), [(48, 2, 8), (61, 4, 8), (61, 4, 16)])
+        self.assertEqual(self.search('("good works", works) NEAR/5 faith'), [(58, 2, 17)])
+
+    def test_sql_row_gen_routes_phrases_to_index(self):
+        context = {}
+        rows = sql_row_gen('"only begotten Son"', "KJV", highlight_context=context)
+        self.assertEqual([(r["Book"], r["Chapter"], r["Versecount"]) for r in rows], [(42, 3, 16)])
+        self.assertEqual(context["words"], ["only", "begotten", "Son"])
+
+
+class WildcardExpansionTests(BibleDatabaseMixin, TestCase):
+    def test_prefix_expansion_uses_sorted_vocabulary(self):
+        index = get_text_index("KJV")
+        self.assertEqual(index.expand("lov*"), (["love", "loved", "loveth"], False))
+        self.assertEqual(index.expand("l*t"), (["lest", "let", "light"], False))
+        self.assertEqual(index.expand("zz*"), ([], False))
+
+    def test_expansion_cap_keeps_most_frequent_terms(self):
+        index = get_text_index("KJV")
+        terms, truncated = index.expand("th*", limit=2)
+        self.assertTrue(truncated)
+        self.assertEqual(terms, ["that", "the"])
+
+    def test_wildcard_search_is_one_lookup(self):
+        context = {}
+        rows = sql_row_gen("lov* + world", "KJV", highlight_context=context)
+        self.assertEqual([(r["Book"], r["Chapter"], r["Versecount"]) for r in rows], [(42, 3, 16)])
+        self.assertEqual(context["expansions"]["lov*"]["terms"], ["love", "loved", "loveth"])
+        self.assertEqual(context["words"], ["love", "loved", "loveth", "world"])
+
+    def test_wildcard_inside_phrase(self):
+        rows = sql_row_gen('"God so lov*"', "KJV")
+        self.assertEqual([(r["Book"], r["Chapter"], r["Versecount"]) for r in rows], [(42, 3, 16)])
+
+    def test_case_sensitive_wildcard(self):
+        self.assertEqual(len(sql_row_gen("Chr*", "KJV", case_sensitive=True)), 1)
+        self.assertEqual(sql_row_gen("chr*", "KJV", case_sensitive=True), [])
+
+
+class StemIndexTests(BibleDatabaseMixin, TestCase):
+    def test_stem_mode_matches_inflections(self):
+        context = {}
+        rows = sql_row_gen("love", "KJV", highlight_context=context, stem=True)
+        refs = [(r["Book"], r["Chapter"], r["Versecount"]) for r in rows]
+        # loved (John 3:16) and loveth (1 John 4:8) as well as love
+        self.assertEqual(refs, [(42, 3, 16), (44, 5, 8), (44, 8, 28), (61, 4, 8), (61, 4, 16)])
+        self.assertEqual(context["words"], ["love", "loved", "loveth"])
+        self.assertEqual(len(sql_row_gen("love", "KJV")), 4)
+
+    def test_stem_lookup_is_a_single_slice(self):
+        index = get_text_index("KJV")
+        spans = index.stem_spans("believed")
+        self.assertEqual(sorted(set(spans.verses.tolist())), [9, 19])
+        self.assertEqual(index.stem_terms[index.stem_ids["believ"]], ["believed", "believeth"])
+
+    def test_nouns_ending_like_inflections_keep_their_stem(self):
+        texts = [
+            "for the forest and the priest",
+            "an honest and earnest man",
+            "the interest is manifest",
+            "hone and earn",
+            "he walketh and walked and walkest",
+        ]
+        index = TextIndex([(0, 1, verse) for verse in range(1, 6)], texts)
+        for word in ["forest", "priest", "honest", "earnest", "interest", "manifest"]:
+            expansions = {}
+            index.stem_spans(word, expansions)
+            self.assertEqual(expansions[word]["terms"], [word])
+        expansions = {}
+        index.stem_spans("walk", expansions)
+        self.assertEqual(expansions["walk"]["terms"], ["walked", "walkest", "walketh"])
+
+    def test_stem_mode_in_phrases(self):
+        rows = sql_row_gen('"God so loveth"', "KJV", stem=True)
+        self.assertEqual([(r["Book"], r["Chapter"], r["Versecount"]) for r in rows], [(42, 3, 16)])
+
+
+class SpellingSuggestionTests(BibleDatabaseMixin, TestCase):
+    def test_edit_distance(self):
+        from searchapp.fuzzy import edit_distance
+
+        self.assertEqual(edit_distance("reconcilliation", "reconciliation"), 1)
+        self.assertEqual(edit_distance("beleive", "believe"), 1)  # transposition
+        self.assertEqual(edit_distance("grace", "peace"), 2)
+        self.assertEqual(edit_distance("grace", "darkness"), 3)
+
+    def test_suggest_within_two_edits(self):
+        index = get_text_index("KJV")
+        self.assertEqual(index.suggest("begoten"), ["begotten"])
+        self.assertEqual(index.suggest("Pharisess")[0], "Pharisees")
+        self.assertEqual(index.suggest("qqqqqqq"), [])
+
+    def test_did_you_mean_in_search_ajax(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "begoten + Son", "version": "KJV", "books": str(2**66 - 1)},
+        )
+        data = response.json()
+        self.assertEqual(data["results"], [])
+        self.assertEqual(data["suggestions"], {"begoten": ["begotten"]})
+        self.assertEqual(data["did_you_mean"], "begotten + Son")
+
+    def test_no_did_you_mean_without_a_suggestion(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "qqqqqqq", "version": "KJV", "books": str(2**66 - 1)},
+        )
+        data = response.json()
+        self.assertEqual(data["suggestions"], {"qqqqqqq": []})
+        self.assertIsNone(data["did_you_mean"])
+
+    def test_autocorrect(self):
+        response = self.client.get(
+            "/ajax/search/",
+            {"search": "begoten + Son", "version": "KJV", "books": str(2**66 - 1), "fuzzy": "True"},
+        )
+        results = response.json()["results"]
+        self.assertEqual([(r["Book"], r["Chapter"], r["Versecount"]) for r in results], [("John", 3, 16)])
@@ -0,0 +1,60 @@
+from django.test import TestCase
+
+from searchapp.testutils import BibleDatabaseMixin
+from searchapp.textindex import get_text_index
+from searchapp.typeahead import MAX_LIMIT, get_typeahead
+
+
+class TypeaheadTests(BibleDatabaseMixin, TestCase):
+    def suggest(self, text, limit=8):
+        return [(s["type"], s["value"]) for s in get_typeahead("KJV").suggest(text, limit)]
+
+    def test_book_names(self):
+        self.assertEqual(self.suggest("1 jo"), [("book", "1 John "), ("term", "1 john")])
+        books = [value for kind, value in self.suggest("jo", 25) if kind == "book"]
+        self.assertEqual(books, ["Joshua ", "Job ", "Joel ", "Jonah ", "John ", "1 John ", "2 John ", "3 John "])
+        # Names without their number, and abbreviations with a period
+        self.assertIn(("book", "1 Corinthians "), self.suggest("cor"))
+        self.assertIn(("book", "Psalms "), self.suggest("Ps."))
+
+    def test_chapters_and_verses_come_from_the_version(self):
+        # Sample data has John 1, 3 and 4
+        self.assertEqual(self.suggest("John "), [("chapter", "John 1"), ("chapter", "John 3"), ("chapter", "John 4")])
+        self.assertEqual(self.suggest("Joh 3"), [("chapter", "John 3")])
+        self.assertEqual(self.suggest("john 3:"), [("verse", "John 3:16"), ("verse", "John 3:17")])
+        self.assertEqual(self.suggest("John 3:17"), [("verse", "John 3:17")])
+        self.assertEqual(self.suggest("John 9"), [])
+        # Only the passage being typed is completed
+        self.assertEqual(self.suggest("Gen 1; Eph 2:"), [("verse", "Gen 1; Ephesians 2:8"), ("verse", "Gen 1; Ephesians 2:9")])
+
+    def test_terms_ranked_by_frequency(self):
+        suggestions = get_typeahead("KJV").suggest("love + g")
+        terms = [s for s in suggestions if s["type"] == "term"]
+        self.assertEqual(terms[0]["value"], "love + god")
+        counts = [s["count"] for s in terms]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertEqual(self.suggest("darkn"), [("term", "darkness")])
+        self.assertEqual(self.suggest("zzz"), [])
+
+    def test_rebuilt_with_text_index(self):
+        typeahead = get_typeahead("KJV")
+        self.assertIs(get_typeahead("KJV"), typeahead)
+        self.assertIs(typeahead.index, get_text_index("KJV"))
+
+    def test_endpoint(self):
+        response = self.client.get("/suggest", {"q": "darkn", "version": "KJV"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertEqual(
+            response.json()["suggestions"],
+            [{"type": "term", "value": "darkness", "label": "darkness", "count": 3}],
+        )
+        data = self.client.get("/suggest", {"q": "", "version": "KJV"}).json()
+        self.assertEqual(data["suggestions"], [])
+        data = self.client.get("/suggest", {"q": "g", "version": "KJV", "limit": "1000"}).json()
+        self.assertLessEqual(len(data["suggestions"]), MAX_LIMIT)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get("/suggest", {"q": "jo", "version": "NOPE"}).status_code, 400)
+        self.assertEqual(self.client.get("/suggest", {"q": "jo", "version": "KJV", "limit": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/suggest", {"q": "jo", "version": "NASB"}).status_code, 503)
@@ -0,0 +1,48 @@
+import io
+import sys
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from searchapp import llm_interface
+from searchapp.concordance import load_concordance
+from searchapp.textindex import get_text_index
+from searchapp.testutils import SAMPLE_VERSES, BibleDatabaseMixin
+from searchapp.warmup import installed_versions, warm_up
+
+
+class WarmupTests(BibleDatabaseMixin, TestCase):
+    bible_versions = ["KJV", "ESV"]
+
+    def test_warm_up_builds_lazy_indexes(self):
+        self.assertEqual(installed_versions(), ["ESV", "KJV"])
+        self.assertEqual(warm_up(["KJV"], freeze=False), ["KJV"])
+        index = get_text_index("KJV")
+        self.assertIsNotNone(index.stem_ids)
+        self.assertIsNotNone(index.spelling)
+        self.assertIsNotNone(index.facets)
+
+    def test_commands_default_to_installed_versions(self):
+        call_command("build_concordance", stdout=io.StringIO())
+        for name in ["ESV", "KJV"]:
+            self.assertIsNotNone(load_concordance(name), name)
+
+    def test_unknown_version_is_rejected(self):
+        response = self.client.get("/ajax/search/", {"search": "love", "version": "NOPE", "books": "1"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_text_is_packed(self):
+        index = get_text_index("KJV")
+        texts = [verse[3] for verse in sorted(SAMPLE_VERSES)]
+        self.assertIsInstance(index.text_blob, bytes)
+        self.assertEqual(len(index), len(texts))
+        self.assertEqual([index.text(i) for i in range(len(index))], texts)
+        self.assertEqual(index.rows([7])[0]["verse"], texts[7])
+
+
+class LazySDKImportTests(TestCase):
+    def test_sdk_classes_load_on_demand(self):
+        self.assertTrue(llm_interface.sdk_installed("json"))
+        self.assertFalse(llm_interface.sdk_installed("no_such_llm_sdk"))
+        self.assertIsNone(llm_interface.load_sdk_class("no_such_llm_sdk", "Client"))
+        self.assertIs(llm_interface.load_sdk_class("json", "JSONDecoder"), sys.modules["json"].JSONDecoder)
@@ -0,0 +1,65 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import override_settings
+
+# A handful of KJV verses: (Book, Chapter, Versecount, verse)
+SAMPLE_VERSES = [
+    (0, 1, 1, "In the beginning God created the heaven and the earth."),
+    (0, 1, 2, "And the earth was without form, and void; and darkness was upon the face of the deep. And the Spirit of God moved upon the face of the waters."),
+    (0, 1, 3, "And God said, Let there be light: and there was light."),
+    (0, 1, 4, "And God saw the light, that it was good: and God divided the light from the darkness."),
+    (18, 23, 1, "The LORD is my shepherd; I shall not want."),
+    (18, 23, 2, "He maketh me to lie down in green pastures: he leadeth me beside the still waters."),
+    (18, 23, 4, "Yea, though I walk through the valley of the shadow of death, I will fear no evil: for thou art with me; thy rod and thy staff they comfort me."),
+    (42, 1, 1, "In the beginning was the Word, and the Word was with God, and the Word was God."),
+    (42, 1, 5, "And the light shineth in darkness; and the darkness comprehended it not."),
+    (42, 3, 16, "For God so loved the world, that he gave his only begotten Son, that whosoever believeth in him should not perish, but have everlasting life."),
+    (42, 3, 17, "For God sent not his Son into the world to condemn the world; but that the world through him might be saved."),
+    (42, 4, 1, "When therefore the Lord knew how the Pharisees had heard that Jesus made and baptized more disciples than John,"),
+    (44, 5, 8, "But God commendeth his love toward us, in that, while we were yet sinners, Christ died for us."),
+    (44, 8, 28, "And we know that all things work together for good to them that love God, to them who are the called according to his purpose."),
+    (48, 2, 8, "For by grace are ye saved through faith; and that not of yourselves: it is the gift of God:"),
+    (48, 2, 9, "Not of works, lest any man should boast."),
+    (58, 2, 17, "Even so faith, if it hath not works, is dead, being alone."),
+    (61, 4, 8, "He that loveth not knoweth not God; for God is love."),
+    (61, 4, 16, "And we have known and believed the love that God hath to us. God is love; and he that dwelleth in love dwelleth in God, and God in him."),
+    (61, 1, 9, "If we confess our sins, he is faithful and just to forgive us our sins, and to cleanse us from all unrighteousness."),
+]
+
+
+def make_bible_database(directory, version_name, verses=SAMPLE_VERSES):
+    """Create `{version_name}Bible_Database.db` in `directory` with the given verses."""
+    path = os.path.join(directory, f"{version_name}Bible_Database.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE bible (Book INTEGER, Chapter INTEGER, Versecount INTEGER, verse TEXT)"
+    )
+    db.executemany("INSERT INTO bible VALUES (?, ?, ?, ?)", verses)
+    db.commit()
+    db.close()
+    return path
+
+
+class BibleDatabaseMixin:
+    """
+    TestCase mixin that points BIBLE_DATABASE_DIR at a temporary directory
+    holding sample databases for the versions listed in `bible_versions`.
+    """
+
+    bible_versions = ["KJV"]
+
+    def setUp(self):
+        super().setUp()
+        self.database_dir = tempfile.mkdtemp()
+        for version_name in self.bible_versions:
+            make_bible_database(self.database_dir, version_name)
+        self._settings = override_settings(BIBLE_DATABASE_DIR=self.database_dir)
+        self._settings.enable()
+
+    def tearDown(self):
+        self._settings.disable()
+        shutil.rmtree(self.database_dir, ignore_errors=True)
+        super().tearDown()
@@ -0,0 +1,641 @@
+import json
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+from bisect import bisect_left
+
+import numpy as np
+
+from .corpus import WORD_RE, PathCache, database_path, index_dir, load_verses, pack_refs, source_stamp
+from .facets import FacetIndex
+from .fuzzy import SymmetricDeleteIndex
+from .optimize import content_hash
+from .stemming import stem
+
+# Words inside a phrase may carry * wildcards
+PHRASE_WORD_RE = re.compile(r"[\w*]+")
+
+# Most vocabulary terms a single wildcard may expand to
+MAX_WILDCARD_TERMS = 200
+
+# Bumped whenever the saved TextIndex layout or tokenization changes, so
+# indexes written by older code are rebuilt instead of loaded
+TEXT_INDEX_VERSION = 1
+
+# Saved index files: arrays memory-mapped on load, the text blob, the word lists
+INDEX_ARRAYS = ("refs", "text_offsets", "occ_surfaces", "occ_verses", "occ_positions", "offsets", "doc_freq")
+TEXT_FILE = "text.bin"
+TERMS_FILE = "terms.json"
+
+# Content hash of each database, cached against its size and mtime
+SOURCE_FILE = "text_source.json"
+
+# The same cache in process memory, keyed by database path: (stamp, content hash)
+_source_hashes = {}
+
+# Keyed by database path; indexwatch swaps in rebuilt indexes
+_loaded = PathCache()
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def is_phrase(token):
+    """True for a quoted phrase token such as '"in the beginning"'."""
+    return len(token) >= 2 and token[0] == token[-1] == '"'
+
+
+def is_near(token):
+    """True for a proximity operator token such as 'NEAR/3'."""
+    return token.upper().startswith("NEAR/")
+
+
+def is_wildcard(token):
+    """True for a wildcard term such as 'lov*' or 'l*ve'."""
+    return "*" in token and WORD_RE.search(token) is not None and not is_phrase(token)
+
+
+def phrase_words(token):
+    """Return the words (possibly wildcards) of a quoted phrase token."""
+    return [w for w in PHRASE_WORD_RE.findall(token[1:-1]) if WORD_RE.search(w)]
+
+
+def needs_text_index(postfix_tokens):
+    """True if an expression uses phrases, NEAR/n or wildcards and so must run on the index."""
+    return any(is_phrase(t) or is_near(t) or is_wildcard(t) for t in postfix_tokens)
+
+
+class Spans:
+    """Token spans (verse row, first position, last position) sorted by verse then start."""
+
+    def __init__(self, verses=_EMPTY, starts=_EMPTY, ends=_EMPTY):
+        self.verses = verses
+        self.starts = starts
+        self.ends = ends
+        self._verse_ids = None
+
+    def verse_ids(self):
+        # Memoized: a shared operand (see TextIndex.evaluate) is reduced once
+        if self._verse_ids is None:
+            if not len(self.verses):
+                return _EMPTY
+            keep = np.ones(len(self.verses), dtype=bool)
+            keep[1:] = self.verses[1:] != self.verses[:-1]
+            self._verse_ids = self.verses[keep]
+        return self._verse_ids
+
+    def union(self, other):
+        verses = np.concatenate([self.verses, other.verses])
+        starts = np.concatenate([self.starts, other.starts])
+        ends = np.concatenate([self.ends, other.ends])
+        order = np.lexsort((ends, starts, verses))
+        return Spans(verses[order], starts[order], ends[order])
+
+    def restrict(self, verse_ids):
+        mask = np.isin(self.verses, verse_ids)
+        return Spans(self.verses[mask], self.starts[mask], self.ends[mask])
+
+
+class TextIndex:
+    """
+    In-memory positional inverted index over every verse of one version.
+
+    Occurrences are stored term-major in flat arrays (CSR layout): the slice
+    offsets[t]:offsets[t + 1] holds the verse row and token position of every
+    occurrence of term t, sorted by verse and position. Terms are lowercase;
+    the surface (original case) form of each occurrence is kept alongside so
+    case-sensitive lookups can filter without touching the text.
+    """
+
+    def __init__(self, refs, texts):
+        self.refs = np.array(refs, dtype=np.int16).reshape(-1, 3)
+        self.ref_keys = pack_refs(self.refs)
+
+        # Verse text packed into one UTF-8 buffer: a single object instead of one
+        # str per verse, so forked workers share its pages (see warmup.py)
+        encoded = [text.encode("utf-8") for text in texts]
+        self.text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=self.text_offsets[1:])
+        self.text_blob = b"".join(encoded)
+
+        surface_ids = {}
+        occ_surfaces, occ_verses, occ_positions = [], [], []
+        for row, text in enumerate(texts):
+            for position, word in enumerate(WORD_RE.findall(text)):
+                occ_surfaces.append(surface_ids.setdefault(word, len(surface_ids)))
+                occ_verses.append(row)
+                occ_positions.append(position)
+        surfaces = list(surface_ids)
+        self.surfaces = surfaces
+        self.surface_ids = surface_ids
+
+        # Lowercase vocabulary, kept sorted so term ids follow lexical order
+        self.vocab = sorted({word.lower() for word in surfaces})
+        self.term_ids = {term: i for i, term in enumerate(self.vocab)}
+        surface_terms = np.array(
+            [self.term_ids[word.lower()] for word in surfaces], dtype=np.int32
+        )
+
+        occ_surfaces = np.array(occ_surfaces, dtype=np.int32)
+        occ_verses = np.array(occ_verses, dtype=np.int32)
+        occ_positions = np.array(occ_positions, dtype=np.int32)
+        occ_terms = surface_terms[occ_surfaces] if len(occ_surfaces) else _EMPTY
+
+        order = np.lexsort((occ_positions, occ_verses, occ_terms))
+        occ_terms = occ_terms[order]
+        self.occ_surfaces = occ_surfaces[order]
+        self.occ_verses = occ_verses[order]
+        self.occ_positions = occ_positions[order]
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(occ_terms, minlength=len(self.vocab)), out=self.offsets[1:])
+
+        # Number of verses containing each term
+        first = np.ones(len(occ_terms), dtype=bool)
+        first[1:] = (occ_terms[1:] != occ_terms[:-1]) | (self.occ_verses[1:] != self.occ_verses[:-1])
+        self.doc_freq = np.bincount(occ_terms[first], minlength=len(self.vocab)).astype(np.int32)
+
+        # Stem, spelling and facet indexes, built on first use
+        self.stem_ids = None
+        self.spelling = None
+        self.facets = None
+        # Optimized search plans (see planner.plan_postfix)
+        self.plans = {}
+
+    @classmethod
+    def from_database(cls, version_name):
+        refs, texts = load_verses(version_name)
+        return cls(refs, texts)
+
+    def __len__(self):
+        return len(self.refs)
+
+    def save(self, directory):
+        """
+        Write the index to `directory` for TextIndex.load.
+
+        Files are written to a scratch directory that is then renamed into
+        place, so readers never see a partial index; if another process saved
+        the same index first, its copy is kept.
+        """
+        scratch = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(scratch)
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(scratch, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(scratch, TEXT_FILE), "wb") as f:
+            f.write(self.text_blob)
+        with open(os.path.join(scratch, TERMS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"vocab": self.vocab, "surfaces": self.surfaces}, f)
+        try:
+            os.rename(scratch, directory)
+        except OSError:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory):
+        """Open an index written by save(), memory-mapping its arrays and text."""
+        index = cls.__new__(cls)
+        for name in INDEX_ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            try:
+                array = np.load(path, mmap_mode="r")
+            except ValueError:
+                # Empty arrays cannot be mapped
+                array = np.load(path)
+            setattr(index, name, array)
+        index.ref_keys = pack_refs(index.refs)
+        with open(os.path.join(directory, TEXT_FILE), "rb") as f:
+            index.text_blob = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if index.text_offsets[-1] else b""
+            )
+        with open(os.path.join(directory, TERMS_FILE), encoding="utf-8") as f:
+            terms = json.load(f)
+        index.vocab = terms["vocab"]
+        index.surfaces = terms["surfaces"]
+        index.term_ids = {term: i for i, term in enumerate(index.vocab)}
+        index.surface_ids = {word: i for i, word in enumerate(index.surfaces)}
+        index.stem_ids = None
+        index.spelling = None
+        index.facets = None
+        index.plans = {}
+        return index
+
+    def warm(self):
+        """Build the lazily created stem, spelling and facet indexes now."""
+        if self.stem_ids is None:
+            self.build_stem_index()
+        if self.spelling is None:
+            self.spelling = SymmetricDeleteIndex(self.vocab, self.doc_freq)
+        if self.facets is None:
+            self.facets = FacetIndex(self.refs)
+
+    def text(self, row):
+        """Return the text of verse row `row`."""
+        return self.text_blob[self.text_offsets[row] : self.text_offsets[row + 1]].decode("utf-8")
+
+    def expand(self, pattern, limit=MAX_WILDCARD_TERMS):
+        """
+        Expand a wildcard pattern against the sorted vocabulary.
+
+        The literal prefix before the first * selects a contiguous vocabulary
+        range by binary search; any further wildcards are matched inside that
+        range. If more than `limit` terms match, the most frequent are kept.
+
+        Returns:
+            A tuple (terms, truncated) with the matching terms in lexical order.
+        """
+        pattern = pattern.lower()
+        prefix = pattern.split("*", 1)[0]
+        lo = bisect_left(self.vocab, prefix)
+        hi = bisect_left(self.vocab, prefix + "\U0010ffff") if prefix else len(self.vocab)
+        term_ids = range(lo, hi)
+        if pattern.rstrip("*") != prefix:
+            regex = re.compile(r"\w*".join(re.escape(part) for part in pattern.split("*")))
+            term_ids = [i for i in term_ids if regex.fullmatch(self.vocab[i])]
+        term_ids = list(term_ids)
+        truncated = len(term_ids) > limit
+        if truncated:
+            term_ids = sorted(term_ids, key=lambda i: -self.doc_freq[i])[:limit]
+            term_ids.sort()
+        return [self.vocab[i] for i in term_ids], truncated
+
+    def terms_spans(self, terms, case_sensitive=False, surface_pattern=None):
+        """
+        Return the merged Spans of several vocabulary terms in one lookup.
+
+        With `case_sensitive`, only occurrences whose original spelling
+        fullmatches `surface_pattern` (or equals the term) are kept.
+        """
+        term_ids = [self.term_ids[t] for t in terms if t in self.term_ids]
+        if not term_ids:
+            return Spans()
+        starts, stops = self.offsets[term_ids], self.offsets[np.array(term_ids) + 1]
+        lengths = stops - starts
+        occ = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        if case_sensitive:
+            regex = re.compile(surface_pattern) if surface_pattern else None
+            allowed = [
+                sid
+                for sid, word in enumerate(self.surfaces)
+                if word.lower() in terms and (regex.fullmatch(word) if regex else word in terms)
+            ]
+            occ = occ[np.isin(self.occ_surfaces[occ], allowed)]
+        verses, positions = self.occ_verses[occ], self.occ_positions[occ]
+        if len(term_ids) > 1:
+            order = np.lexsort((positions, verses))
+            verses, positions = verses[order], positions[order]
+        return Spans(verses, positions, positions)
+
+    def build_stem_index(self):
+        """
+        Precompute the stem -> occurrence index.
+
+        Every vocabulary term is mapped to its stem and the occurrence arrays
+        are regrouped stem-major (same CSR layout as the term index), so one
+        stemmed word resolves to a single contiguous slice.
+        """
+        stem_ids = {}
+        stem_terms = []
+        term_stems = np.empty(len(self.vocab), dtype=np.int32)
+        for term_id, term in enumerate(self.vocab):
+            stem_id = stem_ids.setdefault(stem(term, self.term_ids), len(stem_ids))
+            if stem_id == len(stem_terms):
+                stem_terms.append([])
+            stem_terms[stem_id].append(term)
+            term_stems[term_id] = stem_id
+
+        occ_stems = np.repeat(term_stems, np.diff(self.offsets))
+        order = np.lexsort((self.occ_positions, self.occ_verses, occ_stems))
+        self.stem_verses = self.occ_verses[order]
+        self.stem_positions = self.occ_positions[order]
+        self.stem_offsets = np.zeros(len(stem_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(occ_stems, minlength=len(stem_ids)), out=self.stem_offsets[1:])
+        self.stem_terms = stem_terms
+        self.stem_ids = stem_ids
+
+    def stem_spans(self, word, expansions=None):
+        """Return the Spans of every word sharing `word`'s stem (case-insensitive)."""
+        if self.stem_ids is None:
+            self.build_stem_index()
+        stem_id = self.stem_ids.get(stem(word, self.term_ids))
+        if stem_id is None:
+            return Spans()
+        if expansions is not None:
+            expansions[word] = {"terms": self.stem_terms[stem_id], "truncated": False}
+        lo, hi = self.stem_offsets[stem_id], self.stem_offsets[stem_id + 1]
+        positions = self.stem_positions[lo:hi]
+        return Spans(self.stem_verses[lo:hi], positions, positions)
+
+    def is_known(self, word, stemmed=False):
+        """True if `word` (or, when stemming, any word sharing its stem) occurs in this version."""
+        if word.lower() in self.term_ids:
+            return True
+        if stemmed:
+            if self.stem_ids is None:
+                self.build_stem_index()
+            return stem(word, self.term_ids) in self.stem_ids
+        return False
+
+    def suggest(self, word, limit=3):
+        """
+        Return vocabulary terms within a small edit distance of `word`, with the
+        capitalization of `word` carried over to each suggestion.
+        """
+        if self.spelling is None:
+            self.spelling = SymmetricDeleteIndex(self.vocab, self.doc_freq)
+        suggestions = self.spelling.lookup(word, limit)
+        if word[:1].isupper():
+            suggestions = [term[:1].upper() + term[1:] for term in suggestions]
+        return suggestions
+
+    def word_spans(self, word, case_sensitive=False, expansions=None, stemmed=False):
+        """
+        Return the Spans of a word or wildcard, recording wildcard and stem
+        expansions. Stemmed lookups ignore case; wildcards are never stemmed.
+        """
+        if not is_wildcard(word):
+            if stemmed:
+                return self.stem_spans(word, expansions)
+            return self.term_spans(word, case_sensitive)
+        terms, truncated = self.expand(word)
+        if expansions is not None:
+            expansions[word] = {"terms": terms, "truncated": truncated}
+        surface_pattern = r"\w*".join(re.escape(part) for part in word.split("*"))
+        return self.terms_spans(set(terms), case_sensitive, surface_pattern)
+
+    def term_spans(self, word, case_sensitive=False):
+        """Return the Spans of a single word."""
+        term_id = self.term_ids.get(word.lower())
+        if term_id is None:
+            return Spans()
+        lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+        verses = self.occ_verses[lo:hi]
+        positions = self.occ_positions[lo:hi]
+        if case_sensitive:
+            mask = self.occ_surfaces[lo:hi] == self.surface_ids.get(word, -1)
+            verses, positions = verses[mask], positions[mask]
+        return Spans(verses, positions, positions)
+
+    def phrase_spans(self, words, case_sensitive=False, expansions=None, stemmed=False):
+        """
+        Return the Spans of an exact word sequence.
+
+        Each word's occurrences are shifted back by its offset in the phrase and
+        encoded as (verse << 16 | start) keys; the phrase matches where every
+        word agrees on the key. Words are intersected rarest first, so phrases
+        of very common words are bounded by their rarest member.
+        """
+        if not words:
+            return Spans()
+        per_word = [self.word_spans(word, case_sensitive, expansions, stemmed) for word in words]
+        if len(words) == 1:
+            return per_word[0]
+        keys = None
+        for offset in sorted(range(len(words)), key=lambda i: len(per_word[i].verses)):
+            spans = per_word[offset]
+            valid = spans.starts >= offset
+            word_keys = (spans.verses[valid].astype(np.int64) << 16) | (
+                spans.starts[valid] - offset
+            )
+            keys = word_keys if keys is None else np.intersect1d(keys, word_keys, assume_unique=True)
+            if not len(keys):
+                return Spans()
+        verses = (keys >> 16).astype(np.int32)
+        starts = (keys & 0xFFFF).astype(np.int32)
+        return Spans(verses, starts, starts + len(words) - 1)
+
+    def near(self, left, right, distance):
+        """
+        Return verse rows where a span of `left` lies within `distance` words of
+        a span of `right`, in either order.
+        """
+        candidates = np.intersect1d(left.verse_ids(), right.verse_ids(), assume_unique=True)
+        if not len(candidates):
+            return _EMPTY
+        left, right = left.restrict(candidates), right.restrict(candidates)
+        # Pair every left span with every right span in the same verse
+        lo = np.searchsorted(right.verses, left.verses, side="left")
+        hi = np.searchsorted(right.verses, left.verses, side="right")
+        counts = hi - lo
+        left_idx = np.repeat(np.arange(len(left.verses)), counts)
+        first = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        right_idx = np.arange(counts.sum()) + first
+
+        l_start, l_end = left.starts[left_idx], left.ends[left_idx]
+        r_start, r_end = right.starts[right_idx], right.ends[right_idx]
+        gap = np.maximum(r_start - l_end, l_start - r_end)
+        same = (l_start == r_start) & (l_end == r_end)
+        hits = left.verses[left_idx[(gap <= distance) & ~same]]
+        return np.unique(hits)
+
+    def evaluate(
+        self, postfix_tokens, case_sensitive=False, expansions=None, stemmed=False, operands=None
+    ):
+        """
+        Evaluate a postfix expression (words, wildcards, phrases, +, ",", NEAR/n).
+
+        Args:
+            postfix_tokens: list of tokens in postfix order.
+            case_sensitive: if True, matches the original spelling exactly.
+            expansions: optional dict filled with {word: {"terms", "truncated"}}
+                for every wildcard (and, when stemming, every word).
+            stemmed: if True, words match every form sharing their stem.
+            operands: optional dict of operand Spans by token, shared between
+                calls with the same case_sensitive/stemmed so each word,
+                wildcard or phrase is looked up once (see search_batch).
+
+        Returns:
+            A sorted int32 array of matching verse rows.
+        """
+        stack = []
+        for token in postfix_tokens:
+            if operands is not None and token in operands:
+                stack.append(operands[token])
+            elif is_phrase(token):
+                stack.append(
+                    self.phrase_spans(phrase_words(token), case_sensitive, expansions, stemmed)
+                )
+            elif token in ("+", ",") or is_near(token):
+                right = stack.pop()
+                left = stack.pop()
+                if is_near(token):
+                    # NEAR needs positions; set-valued operands degrade to AND
+                    if isinstance(left, Spans) and isinstance(right, Spans):
+                        stack.append(self.near(left, right, int(token[5:])))
+                        continue
+                    token = "+"
+                if token == "," and isinstance(left, Spans) and isinstance(right, Spans):
+                    stack.append(left.union(right))
+                    continue
+                left, right = _verse_ids(left), _verse_ids(right)
+                if token == "+":
+                    stack.append(np.intersect1d(left, right, assume_unique=True))
+                else:
+                    stack.append(np.union1d(left, right))
+            else:
+                stack.append(self.word_spans(token, case_sensitive, expansions, stemmed))
+            if operands is not None and not (token in ("+", ",") or is_near(token)):
+                operands[token] = stack[-1]
+        return _verse_ids(stack[0]) if stack else _EMPTY
+
+    def row_ids(self, rows, keep_missing=False):
+        """
+        Map result rows (dicts with Book/Chapter/Versecount) to verse rows of
+        this index. Rows the index lacks are dropped, or with `keep_missing`
+        mapped to -1 so the ids line up with `rows`.
+        """
+        if not rows:
+            return _EMPTY
+        keys = pack_refs([(row["Book"], row["Chapter"], row["Versecount"]) for row in rows])
+        if not len(self.ref_keys):
+            return np.full(len(keys), -1, dtype=np.int32) if keep_missing else _EMPTY
+        ids = np.minimum(np.searchsorted(self.ref_keys, keys), len(self.ref_keys) - 1)
+        found = self.ref_keys[ids] == keys
+        if keep_missing:
+            return np.where(found, ids, -1).astype(np.int32)
+        return ids[found].astype(np.int32)
+
+    def context_windows(self, verse_ids, size):
+        """
+        Verse rows around each hit: `size` rows before and after, clipped to
+        the hit's chapter, with overlapping windows of a chapter merged.
+
+        Returns:
+            An int64 array of sorted, disjoint [start, stop) row ranges, one
+            row per merged window.
+        """
+        verse_ids = np.unique(np.asarray(verse_ids, dtype=np.int64))
+        if not len(verse_ids):
+            return np.empty((0, 2), dtype=np.int64)
+        chapters = self.ref_keys >> 16
+        hit_chapters = chapters[verse_ids]
+        starts = np.maximum(verse_ids - size, np.searchsorted(chapters, hit_chapters, side="left"))
+        stops = np.minimum(verse_ids + size + 1, np.searchsorted(chapters, hit_chapters, side="right"))
+        # Hits are sorted, so a window opens a new block unless it overlaps or
+        # touches the previous one within the same chapter
+        reach = np.maximum.accumulate(stops)
+        new_block = np.ones(len(verse_ids), dtype=bool)
+        new_block[1:] = (starts[1:] > reach[:-1]) | (hit_chapters[1:] != hit_chapters[:-1])
+        first = np.flatnonzero(new_block)
+        last = np.append(first[1:], len(verse_ids)) - 1
+        return np.stack([starts[first], reach[last]], axis=1)
+
+    def facet_counts(self, verse_ids):
+        """Hit counts per book, section and testament for a set of verse rows."""
+        if self.facets is None:
+            self.facets = FacetIndex(self.refs)
+        return self.facets.counts(verse_ids)
+
+    def verse_tuples(self, verse_ids):
+        """
+        Lazily yield (Book, Chapter, Versecount, verse) tuples for verse rows,
+        decoding each verse's text only when its tuple is reached.
+        """
+        verse_ids = np.asarray(verse_ids, dtype=np.int64)
+        refs = self.refs[verse_ids].tolist()
+        starts = self.text_offsets[verse_ids].tolist()
+        stops = self.text_offsets[verse_ids + 1].tolist()
+        blob = self.text_blob
+        for (book, chapter, verse_num), start, stop in zip(refs, starts, stops):
+            yield book, chapter, verse_num, blob[start:stop].decode("utf-8")
+
+    def chapter_ids(self, book_id, chapter):
+        """Verse rows of one chapter, in verse order (empty if the chapter is absent)."""
+        if not (0 <= book_id < 1 << 15 and 0 <= chapter < 1 << 16):
+            return _EMPTY
+        key = (book_id << 32) | (chapter << 16)
+        start, stop = np.searchsorted(self.ref_keys, [key, key + (1 << 16)]).tolist()
+        return np.arange(start, stop)
+
+    def rows(self, verse_ids):
+        """Materialize verse rows as result dicts in canonical order."""
+        verse_ids = np.asarray(verse_ids, dtype=np.int64)
+        refs = self.refs[verse_ids].tolist()
+        starts = self.text_offsets[verse_ids].tolist()
+        stops = self.text_offsets[verse_ids + 1].tolist()
+        blob = self.text_blob
+        return [
+            {
+                "Book": book,
+                "Chapter": chapter,
+                "Versecount": verse_num,
+                "verse": blob[start:stop].decode("utf-8"),
+            }
+            for (book, chapter, verse_num), start, stop in zip(refs, starts, stops)
+        ]
+
+
+def _verse_ids(value):
+    return value.verse_ids() if isinstance(value, Spans) else value
+
+
+def source_hash(version_name):
+    """
+    Return the content hash of a version database, rehashing only when the
+    file changed. Hashes are remembered in process memory and in
+    SOURCE_FILE, so a read-only index directory does not mean a rehash per call.
+    """
+    path = database_path(version_name)
+    stamp = source_stamp(path)
+    known = _source_hashes.get(path)
+    if known is not None and known[0] == stamp:
+        return known[1]
+    cache_path = os.path.join(index_dir(version_name), SOURCE_FILE)
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["source"] == stamp:
+            _source_hashes[path] = (stamp, cached["content_hash"])
+            return cached["content_hash"]
+    except (OSError, ValueError, KeyError):
+        pass
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        digest = content_hash(db)
+    finally:
+        db.close()
+    _source_hashes[path] = (stamp, digest)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(f"{cache_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"source": stamp, "content_hash": digest}, f)
+        os.replace(f"{cache_path}.tmp", cache_path)
+    except OSError:
+        pass
+    return digest
+
+
+def text_index_path(version_name, digest):
+    """Directory of the saved TextIndex for a database content hash."""
+    return os.path.join(index_dir(version_name), f"text-v{TEXT_INDEX_VERSION}-{digest[:16]}")
+
+
+def load_or_build_text_index(version_name):
+    """
+    Load the saved TextIndex matching the database's current content, or build
+    it from the database and save it for the next process.
+
+    Saved indexes for older contents or schema versions are removed. A
+    read-only index directory just means the index is not saved.
+    """
+    directory = text_index_path(version_name, source_hash(version_name))
+    if os.path.exists(os.path.join(directory, TERMS_FILE)):
+        return TextIndex.load(directory)
+    index = TextIndex.from_database(version_name)
+    try:
+        index.save(directory)
+    except OSError:
+        return index
+    parent = os.path.dirname(directory)
+    for name in os.listdir(parent):
+        stale = os.path.join(parent, name)
+        if name.startswith("text-v") and ".tmp-" not in name and stale != directory:
+            # Processes still mapping these files keep their pages until they swap
+            shutil.rmtree(stale, ignore_errors=True)
+    return index
+
+
+def get_text_index(version_name):
+    """Return the cached TextIndex for a version, loading or building it on first use."""
+    return _loaded.load(database_path(version_name), lambda path: load_or_build_text_index(version_name))
@@ -0,0 +1,161 @@
+import bisect
+import re
+
+import numpy as np
+
+from .bibledata import books, get_book_id
+from .corpus import PathCache, database_path
+from .textindex import get_text_index
+
+# Suggestions returned by default, and at most
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 25
+
+# "<book> <chapter>[:<verse>]" being typed; the book part may be a prefix
+_REFERENCE_RE = re.compile(r"^(?P<book>\d?\s*[A-Za-z][A-Za-z .]*?)\s+(?P<chapter>\d+)(?::(?P<verse>\d*))?$")
+
+# The word being typed at the end of a boolean expression
+_LAST_WORD_RE = re.compile(r"(\w+)$")
+
+# Keyed by database path, rebuilt when the text index is swapped
+_loaded = PathCache()
+
+
+class Typeahead:
+    """
+    Sorted lookup tables for completing search box input of one version.
+
+    Book names (and the same names without their leading number, so "cor"
+    offers both Corinthians) are kept in one sorted list; chapter and verse
+    numbers come from the version's verse references; vocabulary terms are
+    the text index's sorted vocabulary, ranked by document frequency. Every
+    lookup is a bisect plus a slice.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        keys = []
+        for book in books:
+            name = book["text"].lower()
+            keys.append((name.replace(" ", ""), book["id"]))
+            if name[0].isdigit():
+                keys.append((name.split(" ", 1)[1], book["id"]))
+        keys.sort()
+        self.book_keys = [key for key, _ in keys]
+        self.book_ids = [book_id for _, book_id in keys]
+
+        # Chapters of each book and verse numbers of each chapter, as sorted
+        # string lists so a typed digit prefix is a bisect range
+        refs = np.asarray(index.refs)
+        self.chapters = {}
+        self.verses = {}
+        for book_id, chapter, verse_num in np.unique(refs, axis=0).tolist():
+            self.chapters.setdefault(book_id, set()).add(chapter)
+            self.verses.setdefault((book_id, chapter), []).append(verse_num)
+        self.chapters = {book_id: sorted(map(str, chapters)) for book_id, chapters in self.chapters.items()}
+        self.verses = {key: sorted(map(str, numbers)) for key, numbers in self.verses.items()}
+
+    @staticmethod
+    def _prefixed(keys, prefix):
+        """Return the [lo, hi) range of sorted `keys` starting with `prefix`."""
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, prefix + "\U0010ffff")
+        return lo, hi
+
+    def books(self, prefix, limit):
+        """Book ids whose name (or name without its number) starts with `prefix`."""
+        lo, hi = self._prefixed(self.book_keys, re.sub(r"[\s.]+", "", prefix.lower()))
+        found = []
+        for book_id in self.book_ids[lo:hi]:
+            if book_id not in found:
+                found.append(book_id)
+        return sorted(found)[:limit]
+
+    def numbers(self, numbers, prefix, limit):
+        """Numbers (as sorted strings) starting with digit `prefix`, in numeric order."""
+        if numbers is None:
+            return []
+        lo, hi = self._prefixed(numbers, prefix)
+        return sorted(numbers[lo:hi], key=int)[:limit]
+
+    def terms(self, prefix, limit):
+        """Vocabulary terms starting with `prefix`, most frequent first."""
+        index = self.index
+        lo, hi = self._prefixed(index.vocab, prefix.lower())
+        if lo == hi:
+            return []
+        counts = index.doc_freq[lo:hi]
+        if hi - lo > limit:
+            top = np.argpartition(-counts, limit)[:limit]
+        else:
+            top = np.arange(hi - lo)
+        top = top[np.argsort(-counts[top], kind="stable")]
+        return [(index.vocab[lo + i], int(counts[i])) for i in top.tolist()]
+
+    def suggest(self, text, limit=DEFAULT_LIMIT):
+        """
+        Complete the search box contents `text`.
+
+        Returns:
+            A list of {"type": "book" | "chapter" | "verse" | "term", "value",
+            "label"} dicts (terms also carry "count", the number of verses
+            containing them). "value" is the whole completed input.
+        """
+        stripped = text.lstrip()
+        if not stripped:
+            return []
+        # Only the last passage of a "; " separated list is being typed
+        head, _, current = stripped.rpartition(";")
+        head = f"{head}; " if head else ""
+        current = current.strip()
+
+        match = _REFERENCE_RE.match(current)
+        if match:
+            book_id = get_book_id(match.group("book").strip())
+            if book_id is not None:
+                name = books[book_id]["text"]
+                chapter = match.group("chapter")
+                if match.group("verse") is None:
+                    return [
+                        {"type": "chapter", "value": f"{head}{name} {number}", "label": f"{name} {number}"}
+                        for number in self.numbers(self.chapters.get(book_id), chapter, limit)
+                    ]
+                numbers = self.verses.get((book_id, int(chapter)))
+                return [
+                    {"type": "verse", "value": f"{head}{name} {chapter}:{number}", "label": f"{name} {chapter}:{number}"}
+                    for number in self.numbers(numbers, match.group("verse"), limit)
+                ]
+
+        book_id = get_book_id(current) if current and stripped[-1:].isspace() else None
+        if book_id is not None:
+            # A finished book name: offer its chapters
+            name = books[book_id]["text"]
+            return [
+                {"type": "chapter", "value": f"{head}{name} {number}", "label": f"{name} {number}"}
+                for number in self.numbers(self.chapters.get(book_id), "", limit)
+            ]
+
+        suggestions = []
+        if current and re.fullmatch(r"\d?\s*[A-Za-z][A-Za-z .]*", current):
+            for book_id in self.books(current, limit):
+                name = books[book_id]["text"]
+                suggestions.append({"type": "book", "value": f"{head}{name} ", "label": name})
+
+        word = _LAST_WORD_RE.search(stripped)
+        if word and not word.group(1).isdigit():
+            start = word.start(1)
+            for term, count in self.terms(word.group(1), limit - len(suggestions)):
+                suggestions.append(
+                    {"type": "term", "value": stripped[:start] + term, "label": term, "count": count}
+                )
+        return suggestions[:limit]
+
+
+def get_typeahead(version_name):
+    """Return the Typeahead of a version, rebuilding it when its text index changes."""
+    index = get_text_index(version_name)
+    path = database_path(version_name)
+    typeahead = _loaded.get(path)
+    if typeahead is None or typeahead.index is not index:
+        typeahead = _loaded[path] = Typeahead(index)
+    return typeahead
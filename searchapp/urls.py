@@ -5,6 +5,11 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("result/", views.search, name="search"),
     path("ajax/search/", views.search_ajax, name="search_ajax"),
+    path("ajax/batch/", views.search_batch, name="search_batch"),
     path("chapter", views.chapter_text, name="chapter"),
     path("explain", views.explain, name="explain"),
+    path("related", views.related, name="related"),
+    path("concordance", views.concordance, name="concordance"),
+    path("export", views.export, name="export"),
+    path("suggest", views.suggest, name="suggest"),
 ]
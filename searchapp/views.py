@@ -1,6 +1,14 @@
-import re, sqlite3
-from django.shortcuts import render
-from django.http import JsonResponse
+import json, os, re, sqlite3
+from functools import lru_cache
+from html import escape
+
+import numpy as np
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from .bibledata import (
     testaments,
@@ -8,17 +16,63 @@ from .bibledata import (
     books,
     versions,
     sql_select,
-    sql_order,
-    parse_verse_reference,
+    parse_passage_reference,
+    get_book_id,
 )
 import sys
-from .llm_interface import detect_intent, generate_search_expression, validate_and_sanitize_sql, explain_verse
+from .llm_interface import detect_intent, cached_search_expression, explain_verse
+from .concordance import load_concordance
+from .corpus import database_path, pack_refs, passage_key_ranges, table_columns, tokenize
+from .export import CONTENT_TYPES, ENCODERS, EXPORT_CHUNK, chunked, parquet_available
+from .facets import facets_from_book_counts
+from .planner import (
+    MalformedExpression,
+    matcher,
+    normalize,
+    parse_postfix,
+    plan_postfix,
+    refinement,
+    spellings,
+    to_tokens,
+    tree_from_json,
+)
+from .resultcache import DEFAULT_TTL, cache_key, get_or_compute, get_store, pack_entry, unpack_entry
+from .querycost import (
+    MAX_SCAN_PASSES,
+    SEARCH_TIMEOUT,
+    QueryTooExpensive,
+    check_cost,
+    count_terms,
+    estimate_cost,
+)
+from .sandbox import (
+    RESULT_COLUMNS,
+    SandboxError,
+    install_deadline,
+    is_interrupted,
+    is_raw_sql,
+    run_readonly_query,
+)
+from .semantic import semantic_search, related_verses
+from .textindex import (
+    get_text_index,
+    is_near,
+    is_phrase,
+    is_wildcard,
+    needs_text_index,
+    phrase_words,
+    source_hash,
+)
+from .typeahead import DEFAULT_LIMIT, MAX_LIMIT, get_typeahead
 
 try:
     from .gtag_secret import GTAG_ID
 except ImportError:
     GTAG_ID = None
 
+# Searches rejected because of what the user typed: reported, never a 500
+SEARCH_ERRORS = (SandboxError, QueryTooExpensive, MalformedExpression)
+
 
 def index(request, *args, **kwargs):
     """Render homepage or run search if params are in URL (for sharable links)."""
@@ -36,17 +90,31 @@ def search(request, *args, **kwargs):
     )
 
 
-def dict_factory(cursor, row):
-    """Convert database rows into dictionaries keyed by column name."""
-    return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-
-
 def find_version(version_name):
     """Return the version expansion and wiki link for a given short version name."""
     version = next(item for item in versions if item["name"] == version_name)
     return version["expansion"], version["wiki"]
 
 
+def parse_limit(request, default, maximum):
+    """
+    Read the "limit" GET param, clamped to 1..maximum.
+
+    Raises:
+        ValueError if it is not an integer.
+    """
+    return min(max(int(request.GET.get("limit", default)), 1), maximum)
+
+
+def unknown_versions_error(names):
+    """Return a 400 response naming the versions in `names` that are not configured, or None."""
+    known = {item["name"] for item in versions}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        return JsonResponse({"error": f"Unknown version: {', '.join(unknown)}"}, status=400)
+    return None
+
+
 def sort_rows(rows):
     """Sort search result rows by book, chapter, and verse order."""
     return sorted(
@@ -54,32 +122,98 @@ def sort_rows(rows):
     )
 
 
+# Quoted phrases, NEAR/n proximity operators, words (with * wildcards), and the +/,/() operators
+EXPR_TOKEN_RE = re.compile(r'"[^"]*"|\bNEAR/\d+|[\w*]+|[(),+]', re.IGNORECASE)
+
+
 def tokenize_expr(expr):
-    """Split a Boolean keyword expression into tokens (words and operators)."""
-    # Pre-process natural boolean keywords for Standard Mode convenience
-    # Replace " and " with " + " and " or " with " , "
-    expr = re.sub(r"\bAND\b", "+", expr, flags=re.IGNORECASE)
-    expr = re.sub(r"\bOR\b", ",", expr, flags=re.IGNORECASE)
-    return re.findall(r"\w+|[(),+]", expr)
+    """Split a Boolean keyword expression into tokens (words, phrases and operators)."""
+    tokens = []
+    for token in EXPR_TOKEN_RE.findall(expr):
+        # Natural boolean keywords for Standard Mode convenience: AND -> +, OR -> ,
+        upper = token.upper()
+        if upper == "AND":
+            tokens.append("+")
+        elif upper == "OR":
+            tokens.append(",")
+        elif is_near(token):
+            tokens.append(upper)
+        elif is_phrase(token) and not phrase_words(token):
+            continue
+        elif token.strip("*") == "":
+            # A bare * would match the whole vocabulary
+            continue
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def is_operand(token):
+    """True for search terms (words, wildcards or quoted phrases) as opposed to operators."""
+    return token.isalnum() or is_phrase(token) or is_wildcard(token)
+
+
+def highlight_terms(tokens, expansions=None):
+    """
+    Return the words to highlight for a token list.
+
+    Phrases are split into their words, and wildcards (or stemmed words) are
+    replaced by the terms they expanded to (from `expansions`, as filled by
+    TextIndex.evaluate).
+    """
+    expansions = expansions or {}
+    words = []
+    for token in tokens:
+        for word in phrase_words(token) if is_phrase(token) else [token]:
+            if word in expansions:
+                words.extend(expansions[word]["terms"])
+            elif word.isalnum():
+                words.append(word)
+    return words
+
+
+def spelling_suggestions(tokens, index, stem=False):
+    """
+    Suggest corrections for plain words that never occur in the version.
+
+    Returns:
+        A dict mapping each unknown word to its suggestions (best first).
+    """
+    suggestions = {}
+    for token in tokens:
+        if token.isalnum() and not token.isdigit() and token not in suggestions:
+            if not index.is_known(token, stem):
+                suggestions[token] = index.suggest(token)
+    return suggestions
+
+
+def apply_suggestions(expression, suggestions):
+    """Replace each misspelled word in `expression` with its best suggestion."""
+    for word, options in suggestions.items():
+        if options:
+            expression = re.sub(rf"\b{re.escape(word)}\b", options[0], expression)
+    return expression
 
 
 def to_postfix(tokens):
     """
     Convert infix Boolean tokens into postfix (Reverse Polish Notation).
 
-    Uses + as AND, , as OR, and supports parentheses.
+    Uses NEAR/n as proximity (binds tightest), + as AND, , as OR, and supports
+    parentheses.
     """
-    precedence = {"+": 2, ",": 1}
+    precedence = {"NEAR": 3, "+": 2, ",": 1}
     output = []
     stack = []
     for token in tokens:
-        if token.isalnum():
+        if is_operand(token):
             output.append(token)
-        elif token in ("+", ","):
+        elif token in ("+", ",") or is_near(token):
+            op = "NEAR" if is_near(token) else token
             while (
                 stack
-                and stack[-1] in precedence
-                and precedence[stack[-1]] >= precedence[token]
+                and stack[-1] != "("
+                and precedence["NEAR" if is_near(stack[-1]) else stack[-1]] >= precedence[op]
             ):
                 output.append(stack.pop())
             stack.append(token)
@@ -94,6 +228,22 @@ def to_postfix(tokens):
     return output
 
 
+def checked_postfix(tokens):
+    """
+    to_postfix for user input: the result is known to parse.
+
+    Raises:
+        MalformedExpression for an operator without operands ("love +") or
+        an unopened parenthesis ("love )").
+    """
+    try:
+        postfix = to_postfix(tokens)
+        parse_postfix(postfix)
+    except IndexError as e:
+        raise MalformedExpression("Malformed search expression.") from e
+    return postfix
+
+
 def regexp_check(pattern, item, case_sensitive=False):
     """SQLite REGEXP implementation using Python's re module."""
     if item is None:
@@ -102,7 +252,7 @@ def regexp_check(pattern, item, case_sensitive=False):
     return re.search(pattern, str(item), flags) is not None
 
 
-def build_sql_from_postfix(postfix_tokens, case_sensitive=False):
+def build_sql_from_postfix(postfix_tokens, case_sensitive=False, normalized=False):
     """
     Build a safe SQL WHERE clause from postfix Boolean tokens.
     Uses REGEXP with word boundaries for precision.
@@ -110,6 +260,9 @@ def build_sql_from_postfix(postfix_tokens, case_sensitive=False):
     Args:
         postfix_tokens: list of tokens in postfix order.
         case_sensitive: if True, performs case-sensitive search.
+        normalized: if True, matches lowercased terms against the precomputed
+            `verse_lower` column of an optimized database, so REGEXP can run
+            case-sensitively.
 
     Returns:
         A tuple of SQL WHERE clause string and list of values for binding.
@@ -119,8 +272,12 @@ def build_sql_from_postfix(postfix_tokens, case_sensitive=False):
     for token in postfix_tokens:
         if token.isalnum():
             # Use strict word boundaries so 'grace' doesn't match 'disgrace'
-            pattern = f"\\b{re.escape(token)}\\b"
-            stack.append(("verse REGEXP ?", [pattern]))
+            if normalized and not case_sensitive:
+                pattern = f"\\b{re.escape(token.lower())}\\b"
+                stack.append(("verse_lower REGEXP ?", [pattern]))
+            else:
+                pattern = f"\\b{re.escape(token)}\\b"
+                stack.append(("verse REGEXP ?", [pattern]))
         elif token in ("+", ","):
             op = "AND" if token == "+" else "OR"
             right_expr, right_vals = stack.pop()
@@ -130,110 +287,656 @@ def build_sql_from_postfix(postfix_tokens, case_sensitive=False):
     return stack[0] if stack else ("1=0", [])
 
 
-def sql_row_gen(expression, version_name, case_sensitive=False, highlight_context=None):
+def compile_search(
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+    prefer_index=False,
+):
     """
-    Execute the SQL query for a given search expression and Bible version.
+    Work out how a search expression will be answered, without running it.
 
     Args:
         expression: the Boolean search expression (user input).
         version_name: short name of the Bible version (e.g., "ESV").
         case_sensitive: whether to perform a case-sensitive search.
         highlight_context: optional mutable dict to return metadata (keywords, sql).
+        stem: whether words match every inflection sharing their stem
+            (forgive -> forgiven, forgiveth, forgiving). Implies case-insensitive.
+        autocorrect: whether misspelled words are replaced by their best
+            suggestion before searching. Suggestions are always reported in
+            highlight_context["suggestions"] / ["did_you_mean"].
+        prefer_index: answer plain keyword expressions from the text index too.
 
     Returns:
-        A list of result rows as dictionaries.
+        A plan dict: {"kind": "sql", "where": ..., "values": [...]} for a
+        WHERE clause over `bible` ("kind": "ref" for passage references, with
+        the parsed segments and merged key_ranges as well), {"kind": "index", "postfix": [...],
+        "tokens": [...]} for an expression answered by the text index, or
+        {"kind": "raw", "sql": ...} for a user-written SELECT statement.
     """
     if highlight_context is None:
         highlight_context = {}
     
-    # 1. Check for verse reference first
-    ref_data = parse_verse_reference(expression)
-    if ref_data:
-        # It's a verse reference!
+    # 1. Check for verse references first ("John 3:16-4:2; Ps 23")
+    segments = parse_passage_reference(expression)
+    if segments:
         highlight_context["words"] = [] # No highlighting
-        book_id = ref_data["book_id"]
-        chapter = ref_data["chapter"]
-        start_verse = ref_data["start_verse"]
-        end_verse = ref_data["end_verse"]
-        
-        if start_verse is None:
-            # Whole chapter
-            where_clause = "Book = ? AND Chapter = ?"
-            values = [book_id, chapter]
-        elif start_verse == end_verse:
-            # Single verse
-            where_clause = "Book = ? AND Chapter = ? AND Versecount = ?"
-            values = [book_id, chapter, start_verse]
-        else:
-            # Range
-            where_clause = "Book = ? AND Chapter = ? AND Versecount >= ? AND Versecount <= ?"
-            values = [book_id, chapter, start_verse, end_verse]
-
-        sql_command = f"{sql_select} {where_clause} {sql_order}"
+        key_ranges = passage_key_ranges(segments)
+        # Every segment becomes a (Book, Chapter, Versecount) key range, so the
+        # whole list is one query of primary-key range scans
+        where_clause = " OR ".join(
+            "(Book = ? AND (Chapter, Versecount) >= (?, ?) AND (Chapter, Versecount) < (?, ?))"
+            for _ in key_ranges
+        )
+        values = []
+        for lo, hi in key_ranges:
+            values += [lo >> 32, (lo >> 16) & 0xFFFF, lo & 0xFFFF, (hi >> 16) & 0xFFFF, hi & 0xFFFF]
+        return {
+            "kind": "ref",
+            "where": where_clause,
+            "values": values,
+            "segments": segments,
+            "key_ranges": key_ranges,
+        }
 
     # 2. Check correctly for RAW SQL (User edited SQL)
-    elif expression.strip().upper().startswith("SELECT "):
+    if is_raw_sql(expression):
         sys.stderr.write(f"DEBUG: Raw SQL detected: {expression}\n")
-    else:
-        # 2. Check Intent (LLM vs Keyword)
-        intent = detect_intent(expression)
-        sys.stderr.write(f"DEBUG: Query='{expression}', Intent='{intent}'\n")
-        
-        if intent == "LLM":
-            # Generate Boolean Expression via LLM
-            generated_expr, error = generate_search_expression(expression, version_name)
-
-            if error or not generated_expr:
-                # Fallback to standard keyword search if LLM fails
-                sys.stderr.write(f"DEBUG: LLM Error: {error}\n")
-                # Treat original expression as standard keyword search
-                tokens = tokenize_expr(expression)
-                postfix = to_postfix(tokens)
-                where_clause, values = build_sql_from_postfix(postfix, case_sensitive)
-                sql_command = f"{sql_select} {where_clause} {sql_order}"
-                highlight_context["words"] = [t for t in tokens if t.isalnum()]
-            else:
-                 sys.stderr.write(f"DEBUG: Generated Expression: {generated_expr}\n")
-                 
-                 # Store generated expression to show user
-                 highlight_context["generated_sql"] = generated_expr # Reusing existing key for frontend simplicity
-
-                 # Process the GENERATED expression as a standard search
-                 tokens = tokenize_expr(generated_expr)
-                 postfix = to_postfix(tokens)
-                 where_clause, values = build_sql_from_postfix(postfix, case_sensitive)
-                 sql_command = f"{sql_select} {where_clause} {sql_order}"
-                 highlight_context["words"] = [t for t in tokens if t.isalnum()]
+        highlight_context["words"] = []
+        return {"kind": "raw", "sql": expression.strip()}
 
-        else:
-            # 3. Standard Keyword Search
-            # Strip prefixes if present
-            expression = re.sub(r"^(key:|search:)\s*", "", expression, flags=re.IGNORECASE).strip()
-            
-            tokens = tokenize_expr(expression)
-            postfix = to_postfix(tokens)
-            where_clause, values = build_sql_from_postfix(postfix, case_sensitive)
-            sql_command = f"{sql_select} {where_clause} {sql_order}"
-            highlight_context["words"] = [t for t in tokens if t.isalnum()]
-
-    db = sqlite3.connect(f"./databases/{version_name}Bible_Database.db")
-    db.row_factory = dict_factory
-    
-    # Register REGEXP function to support the generated SQL
-    db.create_function("REGEXP", 2, lambda pattern, item: regexp_check(pattern, item, case_sensitive))
+    # 2. Check Intent (LLM vs Keyword)
+    intent = detect_intent(expression)
+    sys.stderr.write(f"DEBUG: Query='{expression}', Intent='{intent}'\n")
     
-    cur = db.cursor()
+    if intent == "LLM":
+        # Generate Boolean Expression via LLM
+        generated_expr, error = cached_search_expression(expression, version_name)
+
+        if error or not generated_expr:
+            # Fallback to standard keyword search if LLM fails
+            sys.stderr.write(f"DEBUG: LLM Error: {error}\n")
+            # Treat original expression as standard keyword search
+            source_expr = expression
+        else:
+             sys.stderr.write(f"DEBUG: Generated Expression: {generated_expr}\n")
+             
+             # Store generated expression to show user
+             highlight_context["generated_sql"] = generated_expr # Reusing existing key for frontend simplicity
+
+             # Process the GENERATED expression as a standard search
+             source_expr = generated_expr
 
+    else:
+        # 3. Standard Keyword Search
+        # Strip prefixes if present
+        source_expr = re.sub(r"^(key:|search:)\s*", "", expression, flags=re.IGNORECASE).strip()
+
+    tokens = tokenize_expr(source_expr)
+
+    # "Did you mean": words missing from the version's vocabulary
+    suggestions = spelling_suggestions(tokens, get_text_index(version_name), stem)
+    if suggestions:
+        highlight_context["suggestions"] = suggestions
+        corrected = apply_suggestions(source_expr, suggestions)
+        # Only offered when some word has a suggestion to replace it with
+        if corrected != source_expr:
+            highlight_context["did_you_mean"] = corrected
+            if autocorrect:
+                tokens = tokenize_expr(corrected)
+
+    postfix = checked_postfix(tokens)
+    highlight_context["words"] = highlight_terms(tokens)
+
+    # Cost guard: reject oversized expressions (as written, before the
+    # planner deduplicates them), send scan-heavy ones to the index
+    terms = count_terms(postfix)
+    check_cost({"terms": terms})
+    # Deduplicated, flattened and ordered by selectivity so rare terms short-circuit
+    index = get_text_index(version_name)
+    postfix = plan_postfix(postfix, index, case_sensitive and not stem)
+    cost = estimate_cost(postfix, index)
+    cost["terms"] = terms
+    highlight_context["cost"] = cost
+    # What was searched, so a later search can narrow these results (refine_search)
+    if postfix:
+        highlight_context["search"] = {
+            "version": version_name,
+            "source": source_hash(version_name),
+            "case": case_sensitive,
+            "stem": stem,
+            "tree": normalize(parse_postfix(postfix), case_sensitive and not stem),
+        }
+
+    if prefer_index or stem or needs_text_index(postfix) or cost["scan_passes"] > MAX_SCAN_PASSES:
+        # Phrases, NEAR/n, wildcards and stems are answered from the in-memory
+        # index (token positions, sorted vocabulary, stem groups) instead of
+        # one REGEXP scan per term
+        return {"kind": "index", "postfix": postfix, "tokens": tokens}
+
+    # Optimized databases carry a lowercase copy of the text (optimize_databases)
+    normalized = not case_sensitive and "verse_lower" in table_columns(version_name)
+    where_clause, values = build_sql_from_postfix(postfix, case_sensitive, normalized)
+    return {"kind": "sql", "where": where_clause, "values": values, "normalized": normalized}
+
+
+def evaluate_index_plan(
+    plan, version_name, case_sensitive=False, highlight_context=None, stem=False, index=None
+):
+    """
+    Evaluate an "index" plan from compile_search on the version's text index.
+
+    Pass `index` to pin the TextIndex instance the verse rows refer to (the
+    cached index may be swapped by a background rebuild between calls).
+
+    Returns:
+        A sorted array of matching verse rows of the text index.
+    """
+    if highlight_context is None:
+        highlight_context = {}
+    if index is None:
+        index = get_text_index(version_name)
+    expansions = {}
+    verse_ids = index.evaluate(
+        plan["postfix"], case_sensitive, expansions, stemmed=stem
+    )
+    highlight_context["words"] = highlight_terms(plan["tokens"], expansions)
+    highlight_context["expansions"] = expansions
+    return verse_ids
+
+
+def open_bible_db(version_name, case_sensitive=False):
+    """Open a version database with the REGEXP function used by compiled searches."""
+    db = sqlite3.connect(database_path(version_name))
+    db.create_function("REGEXP", 2, lambda pattern, item: regexp_check(pattern, item, case_sensitive))
     if case_sensitive:
-        cur.execute("PRAGMA case_sensitive_like = true;")
+        db.execute("PRAGMA case_sensitive_like = true;")
+    return db
+
+
+def sql_row_gen(
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+):
+    """
+    Execute the SQL query for a given search expression and Bible version.
+
+    Takes the same arguments as compile_search.
 
-    cur.execute(sql_command, values)
-    rows = cur.fetchall()
+    Returns:
+        A list of result rows as dictionaries.
+    """
+    if highlight_context is None:
+        highlight_context = {}
+
+    plan = compile_search(
+        expression, version_name, case_sensitive, highlight_context, stem, autocorrect
+    )
+
+    if plan["kind"] == "index":
+        index = get_text_index(version_name)
+        rows = index.rows(
+            evaluate_index_plan(plan, version_name, case_sensitive, highlight_context, stem, index)
+        )
+        sys.stderr.write(f"DEBUG: Text index returned {len(rows)} rows.\n")
+        return rows
+
+    if plan["kind"] == "ref":
+        # References are contiguous row ranges of the (memory-mapped) text index
+        index = get_text_index(version_name)
+        return index.rows(passage_ids(index, plan["key_ranges"]))
+
+    if plan["kind"] == "raw":
+        # Power-user SQL: read-only, SELECT on `bible` only, time and row budgets
+        rows, truncated = run_readonly_query(
+            version_name,
+            plan["sql"],
+            lambda pattern, item: regexp_check(pattern, item, case_sensitive),
+            case_sensitive,
+        )
+        if rows and not all(col in rows[0] for col in RESULT_COLUMNS):
+            raise SandboxError(f"Raw SQL must select {', '.join(RESULT_COLUMNS)}.")
+        # References are packed into int64 keys downstream (see pack_refs)
+        bounds = (("Book", len(books)), ("Chapter", 1 << 16), ("Versecount", 1 << 16))
+        if any(
+            not isinstance(row[col], int) or not 0 <= row[col] < limit for row in rows for col, limit in bounds
+        ):
+            raise SandboxError("Raw SQL must select Book, Chapter and Versecount as verse numbers.")
+        highlight_context["truncated"] = truncated
+        return rows
+
+    # Lowercased patterns against verse_lower need no IGNORECASE
+    db = open_bible_db(version_name, case_sensitive or plan.get("normalized", False))
+    install_deadline(db, SEARCH_TIMEOUT)
+    rows = []
+    try:
+        # No ORDER BY: rows stream in table order, so a scan stopped by the
+        # deadline still returns what it found (callers sort)
+        cur = db.execute(f"{sql_select} {plan['where']}", plan["values"])
+        names = [col[0] for col in cur.description]
+        for row in cur:
+            rows.append(dict(zip(names, row)))
+    except sqlite3.OperationalError as e:
+        if not is_interrupted(e):
+            raise
+        highlight_context["partial"] = True
+    finally:
+        db.close()
     sys.stderr.write(f"DEBUG: SQL returned {len(rows)} rows.\n")
-    cur.close()
     return rows
 
 
+def export_rows(expression, version_name, case_sensitive=False, stem=False, book_ids=None):
+    """
+    Stream every match of a search as (version, Book, Chapter, Versecount,
+    verse) tuples, without building a result list.
+
+    The search is compiled immediately, so errors are raised by this call
+    rather than mid-stream. SQL and reference plans then stream from the
+    database cursor; index plans read their verse rows from the text index
+    in fixed-size slices. Memory use does not grow with the number of matches.
+
+    Returns:
+        An iterator of row tuples.
+
+    Raises:
+        SandboxError for raw SQL, QueryTooExpensive for oversized expressions,
+        MalformedExpression for unparseable ones.
+    """
+    plan = compile_search(expression, version_name, case_sensitive, {}, stem)
+    if plan["kind"] == "raw":
+        raise SandboxError("Raw SQL cannot be exported.")
+
+    if plan["kind"] == "index":
+        index = get_text_index(version_name)
+        verse_ids = evaluate_index_plan(plan, version_name, case_sensitive, None, stem, index)
+        if book_ids is not None:
+            verse_ids = verse_ids[np.isin(index.refs[verse_ids, 0], book_ids)]
+
+        def index_rows():
+            for start in range(0, len(verse_ids), EXPORT_CHUNK):
+                for row in index.rows(verse_ids[start : start + EXPORT_CHUNK]):
+                    yield (version_name, row["Book"], row["Chapter"], row["Versecount"], row["verse"])
+
+        return index_rows()
+
+    where, values = f"({plan['where']})", list(plan["values"])
+    if book_ids is not None:
+        where += f" AND Book IN ({', '.join('?' for _ in book_ids)})"
+        values += list(book_ids)
+
+    def cursor_rows():
+        db = open_bible_db(version_name, case_sensitive or plan.get("normalized", False))
+        try:
+            cur = db.execute(f"{sql_select} {where}", values)
+            while True:
+                batch = cur.fetchmany(EXPORT_CHUNK)
+                if not batch:
+                    break
+                for book_id, chapter, verse_num, verse in batch:
+                    yield (version_name, book_id, chapter, verse_num, verse)
+        finally:
+            db.close()
+
+    return cursor_rows()
+
+
+def passage_ids(index, key_ranges):
+    """Verse rows of `index` inside [lo, hi) packed key ranges, in canonical order."""
+    key_ranges = np.asarray(key_ranges, dtype=np.int64)
+    if not len(key_ranges):
+        return np.empty(0, dtype=np.int64)
+    bounds = np.searchsorted(index.ref_keys, key_ranges.reshape(-1)).reshape(-1, 2)
+    return np.concatenate([np.arange(start, stop) for start, stop in bounds.tolist()]).astype(np.int64)
+
+
+def index_rows_of(index, keys):
+    """Verse rows of `index` for sorted packed verse keys, or None if any is missing."""
+    ids = np.minimum(np.searchsorted(index.ref_keys, keys), max(len(index) - 1, 0))
+    if len(index) and np.array_equal(index.ref_keys[ids], keys):
+        return ids
+    return None
+
+
+def search_hits(
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+    index=None,
+):
+    """
+    sql_row_gen without the rows: the matching verse rows of the text index.
+
+    SQL plans select only the key columns and references are key-range
+    lookups, so no per-hit row is built; the text is read from the index
+    when (and if) a hit is displayed.
+
+    Takes the same arguments as sql_row_gen, plus the TextIndex to answer
+    from (defaults to the version's).
+
+    Returns:
+        A sorted int64 array of verse rows of the index, or None for raw SQL
+        and for SQL hits the index does not have (callers use sql_row_gen).
+    """
+    if highlight_context is None:
+        highlight_context = {}
+    if index is None:
+        index = get_text_index(version_name)
+
+    plan = compile_search(
+        expression, version_name, case_sensitive, highlight_context, stem, autocorrect
+    )
+    if plan["kind"] == "raw":
+        return None
+    if plan["kind"] == "index":
+        return evaluate_index_plan(
+            plan, version_name, case_sensitive, highlight_context, stem, index
+        ).astype(np.int64)
+    if plan["kind"] == "ref":
+        return passage_ids(index, plan["key_ranges"])
+
+    db = open_bible_db(version_name, case_sensitive or plan.get("normalized", False))
+    install_deadline(db, SEARCH_TIMEOUT)
+    refs = []
+    try:
+        cur = db.execute(f"SELECT Book, Chapter, Versecount FROM bible WHERE {plan['where']}", plan["values"])
+        for row in cur:
+            refs.append(row)
+    except sqlite3.OperationalError as e:
+        if not is_interrupted(e):
+            raise
+        highlight_context["partial"] = True
+    finally:
+        db.close()
+    sys.stderr.write(f"DEBUG: SQL returned {len(refs)} rows.\n")
+    return index_rows_of(index, np.sort(pack_refs(refs)))
+
+
+def cached_hits(
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+):
+    """
+    search_hits through the result cache shared by every worker.
+
+    Entries are keyed by the database's content hash, so rebuilding a
+    version invalidates them, and hold the search metadata plus the packed
+    verse keys of the hits. Raw SQL and deadline-truncated searches are
+    never cached. Cached results are named by a token in
+    highlight_context["token"] (see refine_search).
+
+    Takes the same arguments as sql_row_gen.
+
+    Returns:
+        A tuple (index, hits): hits is a sorted array of verse rows of the
+        TextIndex `index`, or, when index is None, a list of row dicts from
+        sql_row_gen (raw SQL).
+    """
+    if highlight_context is None:
+        highlight_context = {}
+    if is_raw_sql(expression):
+        return None, sql_row_gen(expression, version_name, case_sensitive, highlight_context, stem, autocorrect)
+
+    index = get_text_index(version_name)
+    key = cache_key(
+        "search", source_hash(version_name), expression, case_sensitive, stem, autocorrect
+    )
+    computed = {}
+
+    def compute():
+        context = {}
+        ids = search_hits(expression, version_name, case_sensitive, context, stem, autocorrect, index)
+        computed["ids"], computed["context"] = ids, context
+        if ids is None or context.get("partial"):
+            return None
+        return pack_entry(context, index.ref_keys[ids])
+
+    data, hit = get_or_compute(key, compute)
+    entry = unpack_entry(data) if hit else None
+    if entry is not None:
+        meta, keys = entry
+        ids = index_rows_of(index, keys)
+        if ids is not None:
+            highlight_context.update(meta)
+            highlight_context["token"] = key.rsplit(":", 1)[1]
+            return index, ids
+    if not computed:
+        # Entry from another index generation (or foreign data): search directly
+        compute()
+    elif data is not None:
+        highlight_context["token"] = key.rsplit(":", 1)[1]
+    highlight_context.update(computed["context"])
+    if computed["ids"] is None:
+        return None, sql_row_gen(expression, version_name, case_sensitive, highlight_context, stem, autocorrect)
+    return index, computed["ids"]
+
+
+def refine_search(
+    token,
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+):
+    """
+    Answer a search by narrowing an earlier result instead of the whole version.
+
+    `token` names a cached_hits entry (returned to clients as "token").
+    When `expression` is that search plus more AND operands, only the new
+    operands are checked, against the earlier hits: plain words by matching
+    the candidates' text, index plans by intersecting with the new terms'
+    postings. The result is cached like cached_hits's, under the new
+    expression, and its own token is returned in highlight_context.
+    Results cover every book, so a narrower book selection needs no
+    recomputation either.
+
+    Takes the same arguments as cached_hits, plus the token.
+
+    Returns:
+        A tuple (index, hits) as from cached_hits, or None when the token is
+        unknown, expired or from other search options, or the expression is
+        not a refinement.
+    """
+    if highlight_context is None:
+        highlight_context = {}
+    if not re.fullmatch(r"[0-9a-f]{40}", token or "") or is_raw_sql(expression):
+        return None
+    entry = unpack_entry(get_store().get(f"mbab:search:{token}"))
+    previous = entry[0].get("search") if entry is not None else None
+    options = {"version": version_name, "source": source_hash(version_name), "case": case_sensitive, "stem": stem}
+    if previous is None or any(previous.get(name) != value for name, value in options.items()):
+        return None
+
+    context = {}
+    plan = compile_search(expression, version_name, case_sensitive, context, stem, autocorrect)
+    if "search" not in context:
+        return None
+    extra = refinement(tree_from_json(previous["tree"]), context["search"]["tree"])
+    index = get_text_index(version_name)
+    ids = index_rows_of(index, entry[1])
+    if extra is None or ids is None:
+        return None
+
+    if plan["kind"] == "index":
+        expansions = dict(entry[0].get("expansions", {}))
+        postfix = to_tokens(extra, spellings(plan["tokens"], case_sensitive and not stem))
+        ids = np.intersect1d(
+            ids, index.evaluate(postfix, case_sensitive, expansions, stemmed=stem), assume_unique=True
+        )
+        context["words"] = highlight_terms(plan["tokens"], expansions)
+        context["expansions"] = expansions
+    else:
+        match = matcher(extra, case_sensitive)
+        ids = ids[np.array([match(index.text(row)) for row in ids.tolist()], dtype=bool)]
+
+    key = cache_key(
+        "search", source_hash(version_name), expression, case_sensitive, stem, autocorrect
+    )
+    get_store().set(key, pack_entry(context, index.ref_keys[ids]), ex=DEFAULT_TTL)
+    highlight_context.update(context)
+    highlight_context["token"] = key.rsplit(":", 1)[1]
+    highlight_context["refined"] = True
+    return index, ids
+
+
+def search_results(
+    expression,
+    version_name,
+    case_sensitive=False,
+    highlight_context=None,
+    stem=False,
+    autocorrect=False,
+    token="",
+):
+    """
+    The hits of a search as shown by db_refresh and search_ajax: a
+    refinement of the `token` result when possible, else cached_hits.
+
+    Returns:
+        A tuple (index, hits) as from cached_hits, in canonical order.
+    """
+    found = None
+    if token:
+        found = refine_search(
+            token, expression, version_name, case_sensitive, highlight_context, stem, autocorrect
+        )
+    index, hits = found or cached_hits(
+        expression, version_name, case_sensitive, highlight_context, stem, autocorrect
+    )
+    if index is None:
+        # Raw SQL returns rows in whatever order it selected them
+        hits = sort_rows(hits)
+    return index, hits
+
+
+def book_mask_ids(books_param):
+    """
+    Decode a books bitmask (bit i selects book id i) into the list of
+    selected book ids. Bits past the last book are ignored.
+    """
+    mask = int(books_param)
+    return [i for i in range(len(books)) if mask >> i & 1]
+
+
+def select_books(index, hits, book_ids):
+    """Keep the hits (see search_results) in the books `book_ids`."""
+    if index is None:
+        book_ids = set(book_ids)
+        return [row for row in hits if row["Book"] in book_ids]
+    selected = np.zeros(len(books), dtype=bool)
+    selected[list(book_ids)] = True
+    return hits[selected[index.refs[hits, 0]]]
+
+
+def hit_tuples(index, hits):
+    """
+    Lazily yield the hits (see search_results) as (Book, Chapter, Versecount,
+    verse) tuples, with a trailing score for semantic search rows.
+    """
+    if index is not None:
+        return index.verse_tuples(hits)
+    return (
+        (row["Book"], row["Chapter"], row["Versecount"], row["verse"])
+        + ((row["score"],) if "score" in row else ())
+        for row in hits
+    )
+
+
+def highlighter(words, case_sensitive=False):
+    """
+    Compile the highlight pattern for a list of words, or None for no
+    highlighting. The pattern has one capturing group, so re.split returns
+    the matches interleaved with the text between them.
+    """
+    if not words:
+        return None
+    regex = "|".join(f"\\b{re.escape(word)}\\b" for word in words)
+    return re.compile(f"({regex})", 0 if case_sensitive else re.IGNORECASE)
+
+
+def split_highlights(verse_text, pattern):
+    """
+    Split verse text into plain and highlighted parts.
+
+    Args:
+        verse_text: the verse to split; raw SQL may select NULL or a
+            number, which are shown as "" or their string form.
+        pattern: compiled pattern from highlighter, or None.
+
+    Returns:
+        A list of (highlighted, text) tuples.
+    """
+    verse_text = "" if verse_text is None else str(verse_text)
+    if pattern is None:
+        return [(False, verse_text)]
+    # Odd pieces are matches; empty text between adjacent matches is dropped
+    return [(i % 2 == 1, piece) for i, piece in enumerate(pattern.split(verse_text)) if piece]
+
+
+def count_matches(expression, version_name, case_sensitive=False, stem=False, book_ids=None):
+    """
+    Count the verses matching a search expression without materializing rows.
+
+    Keyword expressions are counted from the text index (a popcount over the
+    hit set); references and raw SQL fall back to `SELECT COUNT(*)` with the
+    compiled predicate.
+
+    Returns:
+        A dict with "total" (restricted to `book_ids` when given) and "facets"
+        (hit counts per book, section and testament over all books).
+    """
+    plan = compile_search(
+        expression, version_name, case_sensitive, stem=stem, prefer_index=True
+    )
+    if plan["kind"] == "index":
+        index = get_text_index(version_name)
+        verse_ids = evaluate_index_plan(plan, version_name, case_sensitive, stem=stem, index=index)
+        facets = index.facet_counts(verse_ids)
+    elif plan["kind"] == "raw":
+        # Counted as a subquery: drop a trailing ";", and close the parenthesis
+        # on its own line so a trailing -- comment cannot swallow it
+        sql = re.sub(r"[\s;]+$", "", plan["sql"])
+        rows, _ = run_readonly_query(
+            version_name,
+            f"SELECT Book, COUNT(*) AS hits FROM ({sql}\n) GROUP BY Book",
+            lambda pattern, item: regexp_check(pattern, item, case_sensitive),
+            case_sensitive,
+        )
+        facets = facets_from_book_counts({row["Book"]: row["hits"] for row in rows})
+    else:
+        db = open_bible_db(version_name, case_sensitive)
+        try:
+            cur = db.execute(
+                f"SELECT Book, COUNT(*) FROM bible WHERE {plan['where']} GROUP BY Book",
+                plan["values"],
+            )
+            facets = facets_from_book_counts(dict(cur.fetchall()))
+        finally:
+            db.close()
+    if book_ids is None:
+        total = sum(facets["testaments"].values())
+    else:
+        total = sum(facets["books"].get(books[i]["text"], 0) for i in book_ids)
+    return {"total": total, "facets": facets}
+
+
 def build_context(
     rows,
     version_name,
@@ -282,10 +985,112 @@ def build_context(
     }
 
 
+# Rows rendered per chunk of a streamed result page
+ROW_CHUNK = 200
+
+# Stands in for per-request values in the cached page chrome
+_RESULTS_MARKER = "<!--mbab:results-->"
+_SEARCH_MARKER = "mbab-search-value-6f1d2c"
+
+
+@lru_cache(maxsize=64)
+def page_chrome(version_name, selected_books):
+    """
+    Render `index.html` once per version and book selection, split around
+    the results container.
+
+    The search box value is left as a marker for fill_chrome, so the same
+    rendering serves every query.
+
+    Returns:
+        A tuple (head, tail) of HTML strings.
+    """
+    version_exp, version_wiki = find_version(version_name)
+    context = build_context(
+        rows=[],
+        version_name=version_name,
+        version_exp=version_exp,
+        version_wiki=version_wiki,
+        input_words=_SEARCH_MARKER,
+        selected_books=selected_books,
+        case_sensitive=False,
+    )
+    context["results_marker"] = mark_safe(_RESULTS_MARKER)
+    head, tail = render_to_string("index.html", context).split(_RESULTS_MARKER)
+    return head, tail
+
+
+def fill_chrome(html, input_words):
+    """Put the escaped search expression into a page_chrome fragment."""
+    return html.replace(_SEARCH_MARKER, escape(input_words))
+
+
+@lru_cache(maxsize=1)
+def row_fragments():
+    """
+    Render `includes/result_rows.html` once with marker values and turn it
+    into format strings, so streaming a row is string formatting rather than
+    a template render.
+
+    Returns:
+        A tuple (card, highlight) of str.format templates: card takes book,
+        chapter, verse_num and verse; highlight takes text.
+    """
+    fields = ("book", "chapter", "verse_num", "highlight")
+    marker = {name: f"mbab-row-{name}-6f1d2c" for name in fields}
+    html = render_to_string(
+        "includes/result_rows.html",
+        {
+            "rows": [
+                {
+                    "Book": marker["book"],
+                    "Chapter": marker["chapter"],
+                    "Versecount": marker["verse_num"],
+                    "verse": [{"highlight": marker["highlight"]}],
+                }
+            ]
+        },
+    )
+    html = html.replace("{", "{{").replace("}", "}}")
+    for name in ("book", "chapter", "verse_num"):
+        html = html.replace(marker[name], f"{{{name}}}")
+    # The highlight span is the one element around the verse's marker
+    span_start = html.rindex("<", 0, html.index(marker["highlight"]))
+    span_end = html.index(">", html.index(marker["highlight"])) + 1
+    highlight = html[span_start:span_end].replace(marker["highlight"], "{text}")
+    card = html[:span_start] + "{verse}" + html[span_end:]
+    return card, highlight
+
+
+def render_rows(rows, pattern=None):
+    """
+    Render (Book, Chapter, Versecount, verse) tuples as HTML cards, like
+    result_rows.html, highlighting matches of `pattern` (see highlighter).
+    """
+    card, highlight = row_fragments()
+    names = [escape(book["text"]) for book in books]
+    return "".join(
+        card.format(
+            book=names[book_id],
+            chapter=chapter,
+            verse_num=verse_num,
+            verse="".join(
+                highlight.format(text=escape(text)) if highlighted else escape(text)
+                for highlighted, text in split_highlights(verse, pattern)
+            ),
+        )
+        for book_id, chapter, verse_num, verse, *_ in rows
+    )
+
+
 def db_refresh(request, *args, **kwargs):
     """
     Core dispatcher for handling search and filter logic.
 
+    The page chrome comes from page_chrome and is sent before the search
+    runs; result rows follow in chunks of ROW_CHUNK, so neither the time to
+    first byte nor the rendered page held in memory grows with the result count.
+
     Args:
         request: Django request object.
         kwargs may include:
@@ -297,7 +1102,7 @@ def db_refresh(request, *args, **kwargs):
           - flip_test: testament key to toggle (ot, nt, bib)
 
     Returns:
-        HttpResponse rendered with `index.html` and appropriate context.
+        HttpResponse (blank page) or StreamingHttpResponse (search results).
     """
     blank = kwargs.get("blank", False)
 
@@ -305,144 +1110,217 @@ def db_refresh(request, *args, **kwargs):
     version_name = kwargs.get("version_name") or request.GET.get(
         "version", versions[0]["name"]
     )
-    version_exp, version_wiki = find_version(version_name)
+    all_books = " ".join(book["num"] for book in books)
 
     if blank:
-        return render(
-            request,
-            "index.html",
-            build_context(
-                rows=[],
-                version_name=version_name,
-                version_exp=version_exp,
-                version_wiki=version_wiki,
-                input_words=input_words,
-                selected_books=" ".join(book["num"] for book in books),
-                case_sensitive=False,
-            ),
-        )
+        head, tail = page_chrome(version_name, all_books)
+        empty = render_to_string("includes/empty_state.html")
+        return HttpResponse(fill_chrome(head, input_words) + empty + tail)
 
     case_sensitive = request.GET.get("case", "False") == "True"
     books_param = request.GET.get("books", "")
     selected_books = ""
 
     if books_param.isdigit():
-        bits = f"{int(books_param):066b}"[::-1]
-        selected_books = " ".join(f"{i:02}" for i, bit in enumerate(bits) if bit == "1")
+        selected_books = " ".join(f"{i:02}" for i in book_mask_ids(books_param))
 
-    highlight_context = {}
-    raw_rows = sort_rows(sql_row_gen(input_words, version_name, case_sensitive, highlight_context))
-    highlight_words = highlight_context.get("words", [])
-    generated_sql = highlight_context.get("generated_sql", None)
+    stem = request.GET.get("stem", "False") == "True"
+    head, tail = page_chrome(version_name, selected_books)
 
-    rows = []
-    for row in raw_rows:
-        if f"{row['Book']:02}" in selected_books:
-            book_text = next(b for b in books if b["id"] == row["Book"])["text"]
-            rows.append(
-                {
-                    "Book": book_text,
-                    "Chapter": row["Chapter"],
-                    "Versecount": row["Versecount"],
-                    "verse": row["verse"],
-                }
-            )
+    def stream():
+        yield fill_chrome(head, input_words)
 
-    for row in rows:
-        if highlight_words:
-            regex = "|".join(f"\\b{re.escape(word)}\\b" for word in highlight_words)
-            verse_text = row["verse"]
-            matches = list(
-                re.finditer(
-                    regex, verse_text, flags=0 if case_sensitive else re.IGNORECASE
-                )
-            )
+        highlight_context = {}
+        message = "No matches found."
+        try:
+            index, hits = search_results(input_words, version_name, case_sensitive, highlight_context, stem)
+        except SEARCH_ERRORS as e:
+            # The page is already being sent: report it in place of results
+            sys.stderr.write(f"DEBUG: Search rejected: {e}\n")
+            index, hits, message = None, [], str(e)
+        hits = select_books(index, hits, [int(num) for num in selected_books.split()])
+        pattern = highlighter(highlight_context.get("words", []), case_sensitive)
+
+        count = 0
+        for chunk in chunked(hit_tuples(index, hits), ROW_CHUNK):
+            yield render_rows(chunk, pattern)
+            count += len(chunk)
+
+        yield render_to_string(
+            "includes/empty_state.html",
+            {"hidden": count > 0, "message": message},
+        )
+        yield tail
 
-            parts = []
-            last_idx = 0
-            for match in matches:
-                start, end = match.span()
-                if start > last_idx:
-                    parts.append({"text": verse_text[last_idx:start]})
-                parts.append({"highlight": verse_text[start:end]})
-                last_idx = end
-            if last_idx < len(verse_text):
-                parts.append({"text": verse_text[last_idx:]})
-
-            row["verse"] = parts
-        else:
-            row["verse"] = [{"text": row["verse"]}]
+    return StreamingHttpResponse(stream(), content_type="text/html; charset=utf-8")
 
-    response = render(
-        request,
-        "index.html",
-        build_context(
-            rows=rows,
-            version_name=version_name,
-            version_exp=version_exp,
-            version_wiki=version_wiki,
-            input_words=input_words,
-            selected_books=selected_books,
-            case_sensitive=case_sensitive,
-            keywords=highlight_words,
-            generated_sql=generated_sql,
-        ),
-    )
 
-    return response
+# Most verses of context search_ajax returns on each side of a hit
+MAX_CONTEXT = 10
+
+# Most verses a semantic search returns
+MAX_SEMANTIC_RESULTS = 1000
+
+
+def build_context_blocks(index, hit_ids, size):
+    """
+    Gather the context windows of search hits (see TextIndex.context_windows).
+
+    Args:
+        index: the TextIndex the hit rows refer to.
+        hit_ids: verse rows of the hits, in result order.
+        size: verses of context before and after each hit.
+
+    Returns:
+        A tuple (blocks, block_of): blocks is a list of {"Book", "Chapter",
+        "verses": [{"Versecount", "verse", "hit"}]} dicts, one per merged
+        window in canonical order; block_of gives each hit's block.
+    """
+    windows = index.context_windows(hit_ids, size)
+    if not len(windows):
+        return [], []
+    verse_ids = np.concatenate([np.arange(start, stop) for start, stop in windows.tolist()])
+    verses = index.rows(verse_ids)
+    hits = set(np.asarray(hit_ids).tolist())
+    blocks = []
+    position = 0
+    for start, stop in windows.tolist():
+        block = verses[position : position + stop - start]
+        blocks.append(
+            {
+                "Book": books[block[0]["Book"]]["text"],
+                "Chapter": block[0]["Chapter"],
+                "verses": [
+                    {"Versecount": verse["Versecount"], "verse": verse["verse"], "hit": row in hits}
+                    for row, verse in zip(range(start, stop), block)
+                ],
+            }
+        )
+        position += stop - start
+    block_of = (np.searchsorted(windows[:, 0], np.asarray(hit_ids), side="right") - 1).tolist()
+    return blocks, block_of
 
 
 def search_ajax(request):
     keyword = request.GET.get("search", "")
     version = request.GET.get("version", "ESV")
     case = request.GET.get("case", "False") == "True"
+    stem = request.GET.get("stem", "False") == "True"
+    fuzzy = request.GET.get("fuzzy", "False") == "True"
     books_param = request.GET.get("books", "")
+    mode = request.GET.get("mode", "keyword")
+    token = request.GET.get("token", "")
+    context_param = request.GET.get("context", "0")
+    if not context_param.isdigit() or int(context_param) > MAX_CONTEXT:
+        return JsonResponse(
+            {"error": f"context must be a whole number of verses from 0 to {MAX_CONTEXT}."}, status=400
+        )
+    context_size = int(context_param)
 
-    bits = f"{int(books_param):066b}"[::-1]
-    selected_books = " ".join(f"{i:02}" for i, bit in enumerate(bits) if bit == "1")
+    selected_books = " ".join(f"{i:02}" for i in book_mask_ids(books_param))
 
+    error = unknown_versions_error([version])
+    if error:
+        return error
     version_exp, version_wiki = find_version(version)
-    
+
+    if request.GET.get("count", "0") == "1":
+        # Count-only mode: totals per version from the index (or COUNT(*)), no rows
+        names = [name for name in request.GET.get("versions", version).split(",") if name]
+        error = unknown_versions_error(names)
+        if error:
+            return error
+        book_ids = [int(num) for num in selected_books.split()]
+        try:
+            counts = {
+                name: count_matches(keyword, name, case, stem, book_ids) for name in names
+            }
+        except SEARCH_ERRORS as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(
+            {
+                "total": sum(item["total"] for item in counts.values()),
+                "versions": counts,
+            }
+        )
+
     highlight_context = {}
-    raw_rows = sort_rows(sql_row_gen(keyword, version, case, highlight_context))
-    highlight_words = highlight_context.get("words", [])
+    if mode == "semantic":
+        try:
+            limit = parse_limit(request, 100, MAX_SEMANTIC_RESULTS)
+        except ValueError:
+            return JsonResponse({"error": "limit must be an integer"}, status=400)
+        # Meaning-based ranking from the offline LSA index; rows stay in score order
+        semantic_rows = semantic_search(
+            keyword,
+            version,
+            limit=limit,
+            book_ids=[int(num) for num in selected_books.split()],
+        )
+        if semantic_rows is None:
+            return JsonResponse(
+                {"error": f"Semantic index for {version} has not been built. Run `manage.py build_semantic_index {version}`."},
+                status=503,
+            )
+        index, hits = None, semantic_rows
+        highlight_context["words"] = highlight_terms(tokenize_expr(keyword))
+    else:
+        try:
+            # With the token of an earlier result, a narrower search filters that result
+            index, hits = search_results(keyword, version, case, highlight_context, stem, fuzzy, token)
+        except SEARCH_ERRORS as e:
+            return JsonResponse({"error": str(e)}, status=400)
     generated_sql = highlight_context.get("generated_sql", None)
+    # The index the hits refer to, should a rebuild have swapped it meanwhile
+    text_index = index if index is not None else get_text_index(version)
 
-    rows = []
-    for row in raw_rows:
-        if f"{row['Book']:02}" in selected_books:
-             book_text = next(b for b in books if b["id"] == row["Book"])["text"]
-             rows.append(
-                 {
-                     "Book": book_text,
-                     "Chapter": row["Chapter"],
-                     "Versecount": row["Versecount"],
-                     "verse": row["verse"],
-                 }
-             )
-
-    for row in rows:
-        if highlight_words:
-            regex = "|".join(f"\\b{re.escape(word)}\\b" for word in highlight_words)
-            verse_text = row["verse"]
-            matches = list(
-                re.finditer(regex, verse_text, flags=0 if case else re.IGNORECASE)
-            )
-            parts = []
-            last_idx = 0
-            for match in matches:
-                start, end = match.span()
-                if start > last_idx:
-                    parts.append({"text": verse_text[last_idx:start]})
-                parts.append({"highlight": verse_text[start:end]})
-                last_idx = end
-            if last_idx < len(verse_text):
-                parts.append({"text": verse_text[last_idx:]})
-            row["verse"] = parts
-        else:
-            row["verse"] = [{"text": row["verse"]}]
+    # Facet counts cover every hit, including books outside the current selection
+    facets = text_index.facet_counts(hits if index is not None else text_index.row_ids(hits))
+    hits = select_books(index, hits, [int(num) for num in selected_books.split()])
 
-    return JsonResponse({"results": rows, "generated_sql": generated_sql})
+    pattern = highlighter(highlight_context.get("words", []), case)
+    names = [book["text"] for book in books]
+    rows = []
+    for book_id, chapter, verse_num, verse, *score in hit_tuples(index, hits):
+        rows.append(
+            {
+                "Book": names[book_id],
+                "Chapter": chapter,
+                "Versecount": verse_num,
+                "verse": [
+                    {"highlight": text} if highlighted else {"text": text}
+                    for highlighted, text in split_highlights(verse, pattern)
+                ],
+            }
+        )
+        if score:
+            rows[-1]["score"] = score[0]
+
+    context_blocks = []
+    if context_size:
+        # Surrounding verses of every listed hit, read in one batch from the index
+        # Raw SQL may list verses the index lacks: those rows get no context
+        hit_ids = np.asarray(hits if index is not None else text_index.row_ids(hits, keep_missing=True))
+        listed = np.flatnonzero(hit_ids >= 0)
+        context_blocks, block_of = build_context_blocks(text_index, hit_ids[listed], context_size)
+        for position, block in zip(listed.tolist(), block_of):
+            rows[position]["context"] = block
+
+    return JsonResponse(
+        {
+            "results": rows,
+            "generated_sql": generated_sql,
+            "expansions": highlight_context.get("expansions", {}),
+            "suggestions": highlight_context.get("suggestions", {}),
+            "did_you_mean": highlight_context.get("did_you_mean"),
+            "facets": facets,
+            "context": context_blocks,
+            "truncated": highlight_context.get("truncated", False),
+            "partial": highlight_context.get("partial", False),
+            "token": highlight_context.get("token"),
+            "refined": highlight_context.get("refined", False),
+        }
+    )
 
 
 def explain(request):
@@ -464,6 +1342,59 @@ def explain(request):
     return JsonResponse({"explanation": explanation})
 
 
+# Most related verses /related returns
+MAX_RELATED = 100
+
+
+def related(request):
+    """
+    Return the precomputed thematically related verses for a reference.
+    GET params: book (name or id), chapter, verse, version, limit
+    """
+    book = request.GET.get("book", "")
+    chapter = request.GET.get("chapter", "")
+    verse = request.GET.get("verse", "")
+    version = request.GET.get("version", "ESV")
+
+    if not book or not chapter.isdigit() or not verse.isdigit():
+        return JsonResponse({"error": "Missing book, chapter or verse"}, status=400)
+
+    book_id = int(book) if book.isdigit() else get_book_id(book)
+    if book_id is None or book_id >= len(books):
+        return JsonResponse({"error": f"Invalid book: {book}"}, status=400)
+
+    error = unknown_versions_error([version])
+    if error:
+        return error
+    try:
+        limit = parse_limit(request, 10, MAX_RELATED)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    rows = related_verses(version, book_id, int(chapter), int(verse), limit)
+    if rows is None:
+        return JsonResponse(
+            {"error": f"Related-verse table for {version} has not been built. Run `manage.py build_semantic_index {version}`."},
+            status=503,
+        )
+
+    return JsonResponse({
+        "book": books[book_id]["text"],
+        "chapter": int(chapter),
+        "verse": int(verse),
+        "version": version,
+        "related": [
+            {
+                "Book": books[row["Book"]]["text"],
+                "Chapter": row["Chapter"],
+                "Versecount": row["Versecount"],
+                "verse": row["verse"],
+            }
+            for row in rows
+        ],
+    })
+
+
 def chapter_text(request):
     """
     Fetch the full text of a chapter.
@@ -501,13 +1432,25 @@ def chapter_text(request):
     if version not in valid_versions:
          version = "ESV"
          
+    if chapter.isdigit() and os.path.exists(database_path(version)):
+        # A chapter is a contiguous row range of the (memory-mapped) text index
+        index = get_text_index(version)
+        return JsonResponse({
+            "book": book,
+            "chapter": chapter,
+            "version": version,
+            "verses": [
+                {"verse": verse_num, "text": text}
+                for _, _, verse_num, text in index.verse_tuples(index.chapter_ids(book_id, int(chapter)))
+            ],
+        })
+
     # Path is relative to project root usually
-    import os
-    db_path = os.path.join("databases", f"{version}Bible_Database.db")
+    db_path = database_path(version)
     
     if not os.path.exists(db_path):
          # Try backup or default
-         db_path = os.path.join("databases", "ESVBible_Database.db")
+         db_path = database_path("ESV")
 
     try:
         conn = sqlite3.connect(db_path)
@@ -535,4 +1478,225 @@ def chapter_text(request):
             "verses": verses
         })
     except Exception as e:
-         return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+         return JsonResponse({"error": str(e)}, status=500)
+
+
+# Most co-occurring terms /concordance returns per version
+MAX_COOCCURRING = 100
+
+
+def concordance(request):
+    """
+    Return frequency statistics for a word across one or more versions.
+    GET params: term, versions (comma-separated, defaults to version), version, limit
+    """
+    term = request.GET.get("term", "")
+    names = [
+        name
+        for name in request.GET.get("versions", request.GET.get("version", "ESV")).split(",")
+        if name
+    ]
+
+    words = tokenize(term)
+    if len(words) != 1:
+        return JsonResponse({"error": "Provide a single word as term"}, status=400)
+    error = unknown_versions_error(names)
+    if error:
+        return error
+
+    try:
+        limit = parse_limit(request, 10, MAX_COOCCURRING)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    stats = {}
+    for name in names:
+        index = load_concordance(name)
+        if index is None:
+            return JsonResponse(
+                {"error": f"Concordance for {name} has not been built. Run `manage.py build_concordance {name}`."},
+                status=503,
+            )
+        stats[name] = index.distribution(words[0])
+        stats[name]["cooccurring"] = index.cooccurring(words[0], limit)
+
+    # Side-by-side book counts in canonical book order
+    comparison = [
+        {
+            "book": book["text"],
+            "counts": {name: stats[name]["books"].get(book["text"], 0) for name in names},
+        }
+        for book in books
+        if any(book["text"] in stats[name]["books"] for name in names)
+    ]
+
+    return JsonResponse({"term": words[0], "versions": stats, "comparison": comparison})
+
+
+@cache_control(public=True, max_age=3600)
+def suggest(request):
+    """
+    Complete the search box as the user types: book names, valid chapter and
+    verse numbers, and vocabulary terms ranked by frequency.
+    GET params: q, version, limit
+    """
+    text = request.GET.get("q", "")
+    version = request.GET.get("version", "ESV")
+    try:
+        limit = parse_limit(request, DEFAULT_LIMIT, MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    error = unknown_versions_error([version])
+    if error:
+        return error
+    if not os.path.exists(database_path(version)):
+        return JsonResponse({"error": f"Database not installed: {version}"}, status=503)
+    if not text.strip():
+        return JsonResponse({"q": text, "suggestions": []})
+
+    return JsonResponse({"q": text, "suggestions": get_typeahead(version).suggest(text, limit)})
+
+
+# Most expressions a single search_batch request may contain
+MAX_BATCH = 500
+
+# Most verses a search_batch response lists, over all of its expressions
+MAX_BATCH_VERSES = 20000
+
+
+@csrf_exempt
+@require_POST
+def search_batch(request):
+    """
+    Evaluate many search expressions against one version in a single pass.
+
+    Every expression is parsed with tokenize_expr/to_postfix (or as a passage
+    reference) and evaluated on the version's text index. Words, wildcards
+    and phrases shared between expressions are looked up once, and each
+    expression only combines the shared operand matches, so N queries cost
+    about one lookup per distinct term. Natural-language (LLM) rewriting and
+    raw SQL are not applied.
+
+    POST JSON body: {"expressions": [...], "version": "ESV", "case": false,
+    "stem": false, "books": <66-bit mask>, "text": false}
+
+    Returns:
+        {"version": ..., "results": [{"expression", "total", "verses"} or
+        {"expression", "error"}], "truncated": ...}, in request order.
+        Verses carry Book, Chapter and Versecount, plus verse when "text" is
+        true. At most MAX_BATCH_VERSES verses are listed in all: a result
+        whose list was cut short has "truncated": true, and "total" always
+        counts every match.
+    """
+    try:
+        body = json.loads(request.body)
+        expressions = body["expressions"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Body must be JSON with an \"expressions\" list."}, status=400)
+    if not isinstance(expressions, list) or not all(isinstance(expr, str) for expr in expressions):
+        return JsonResponse({"error": "\"expressions\" must be a list of strings."}, status=400)
+    if len(expressions) > MAX_BATCH:
+        return JsonResponse({"error": f"At most {MAX_BATCH} expressions per batch."}, status=400)
+
+    version = body.get("version", "ESV")
+    error = unknown_versions_error([version])
+    if error:
+        return error
+    case = bool(body.get("case", False))
+    stem = bool(body.get("stem", False))
+    with_text = bool(body.get("text", False))
+
+    books_param = str(body.get("books", ""))
+    if books_param and not books_param.isdigit():
+        return JsonResponse({"error": "\"books\" must be a book bitmask."}, status=400)
+
+    index = get_text_index(version)
+    selected = None
+    if books_param:
+        selected = np.zeros(len(books), dtype=bool)
+        selected[book_mask_ids(books_param)] = True
+
+    operands = {}
+    results = []
+    budget = MAX_BATCH_VERSES
+    for expression in expressions:
+        source_expr = re.sub(r"^(key:|search:)\s*", "", expression, flags=re.IGNORECASE).strip()
+        segments = parse_passage_reference(source_expr)
+        try:
+            if segments:
+                verse_ids = passage_ids(index, passage_key_ranges(segments))
+            elif is_raw_sql(source_expr):
+                raise SandboxError("Raw SQL is not supported in batch searches.")
+            else:
+                postfix = checked_postfix(tokenize_expr(source_expr))
+                check_cost({"terms": count_terms(postfix)})
+                postfix = plan_postfix(postfix, index, case and not stem)
+                verse_ids = index.evaluate(postfix, case, stemmed=stem, operands=operands)
+        except SEARCH_ERRORS as e:
+            results.append({"expression": expression, "error": str(e)})
+            continue
+
+        if selected is not None and len(verse_ids):
+            verse_ids = verse_ids[selected[index.refs[verse_ids, 0]]]
+        total = len(verse_ids)
+        verse_ids = verse_ids[:budget]
+        budget -= len(verse_ids)
+        if with_text:
+            verses = index.rows(verse_ids)
+            for verse in verses:
+                verse["Book"] = books[verse["Book"]]["text"]
+        else:
+            verses = [
+                {"Book": books[book]["text"], "Chapter": chapter, "Versecount": verse_num}
+                for book, chapter, verse_num in index.refs[verse_ids].tolist()
+            ]
+        result = {"expression": expression, "total": total, "verses": verses}
+        if len(verses) < total:
+            result["truncated"] = True
+        results.append(result)
+
+    truncated = any(result.get("truncated") for result in results)
+    return JsonResponse({"version": version, "results": results, "truncated": truncated})
+
+
+def export(request):
+    """
+    Stream every match of a search as CSV, NDJSON or Parquet.
+    GET params: search, versions (comma-separated, defaults to version),
+    version, case, stem, books, format (csv, ndjson or parquet)
+    """
+    keyword = request.GET.get("search", "")
+    names = [
+        name
+        for name in request.GET.get("versions", request.GET.get("version", "ESV")).split(",")
+        if name
+    ]
+    case = request.GET.get("case", "False") == "True"
+    stem = request.GET.get("stem", "False") == "True"
+    books_param = request.GET.get("books", "")
+    fmt = request.GET.get("format", "csv")
+
+    error = unknown_versions_error(names)
+    if error:
+        return error
+    if fmt not in ENCODERS:
+        return JsonResponse({"error": f"format must be one of {', '.join(ENCODERS)}"}, status=400)
+    if fmt == "parquet" and not parquet_available():
+        return JsonResponse({"error": "Parquet export needs pyarrow (`pip install pyarrow`)."}, status=503)
+    missing = [name for name in names if not os.path.exists(database_path(name))]
+    if missing:
+        return JsonResponse({"error": f"Database not installed: {', '.join(missing)}"}, status=503)
+    book_ids = None
+    if books_param.isdigit():
+        book_ids = book_mask_ids(books_param)
+
+    try:
+        streams = [export_rows(keyword, name, case, stem, book_ids) for name in names]
+    except SEARCH_ERRORS as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows = (row for stream in streams for row in stream)
+    response = StreamingHttpResponse(ENCODERS[fmt](rows), content_type=CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="mbab-export.{fmt}"'
+    return response
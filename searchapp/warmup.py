@@ -0,0 +1,43 @@
+import gc
+import os
+import sys
+import time
+
+from .bibledata import versions
+from .concordance import load_concordance
+from .corpus import database_path
+from .semantic import load_semantic_index
+from .textindex import get_text_index
+
+
+def installed_versions():
+    """Return the short names of every version whose database is present."""
+    return [v["name"] for v in versions if os.path.exists(database_path(v["name"]))]
+
+
+def warm_up(version_names=None, freeze=True):
+    """
+    Build every per-version search structure up front, before workers fork.
+
+    Text indexes (with their stem, spelling and facet indexes) are built and
+    the memory-mapped concordance and semantic files are opened, so forked
+    workers inherit them instead of each building its own copy on first
+    request. With `freeze`, the objects that survive a collection are
+    moved to the permanent generation (gc.freeze), so the garbage collector
+    in the workers never writes to their pages and they stay shared
+    copy-on-write.
+
+    Returns:
+        The list of versions that were warmed.
+    """
+    names = installed_versions() if version_names is None else list(version_names)
+    for name in names:
+        started = time.monotonic()
+        get_text_index(name).warm()
+        load_concordance(name)
+        load_semantic_index(name)
+        sys.stderr.write(f"Warmed {name} in {time.monotonic() - started:.2f}s\n")
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return names
@@ -5,3 +5,4 @@ curl -L https://github.com/aaronjohnsabu1999/bible-databases/archive/refs/heads/
 unzip -q /tmp/bible.zip -d /tmp
 cp /tmp/bible-databases-main/DB/*.db databases/
 echo "✅ Bible databases copied to ./databases/"
+echo "ℹ️  Optional: run 'python manage.py optimize_databases' for faster lookups."